@@ -0,0 +1,229 @@
+"""
+Population analytics over every user: screen-time percentiles per cluster,
+risk-level distribution over time, and where one user stands in their cohort.
+
+Everything is derived from the daily rollups rather than raw user_data. The
+engine keeps the rollup rows of the last COHORT_WINDOW_DAYS in a DataFrame
+(one row per user and day) and refreshes it incrementally: each refresh only
+fetches rollups whose updated_at moved since the previous one (with
+COHORT_REFRESH_OVERLAP_S of slack for writers with skewed clocks) and
+replaces those rows, so a dashboard refresh costs an index range scan over
+recent changes instead of a scan of the whole collection. The per-user
+table the views are computed from is rebuilt with vectorized groupby/NumPy
+only when something changed. The merge and the views run in the threadpool
+so pandas never blocks the event loop.
+
+A user's cohort is the users whose most frequent cluster_label in the
+window is the same as theirs; metrics are per-user means over the window.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from .metrics import analytics_stage
+from .queries import changed_rollups_query
+from .rollups import DAILY_COLLECTION, day_key
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+COHORT_WINDOW_DAYS = int(os.getenv("COHORT_WINDOW_DAYS", "30"))
+COHORT_REFRESH_INTERVAL_S = float(os.getenv("COHORT_REFRESH_INTERVAL_S", "60"))
+COHORT_REFRESH_OVERLAP_S = float(os.getenv("COHORT_REFRESH_OVERLAP_S", "5"))
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Per-user means exposed by the views, from the rollup sums
+USER_METRICS = {
+    "screen_time": "daily_screen_time_hours",
+    "mood": "mood_rating",
+    "sleep": "sleep_duration_hours",
+}
+
+
+def percentile_rank(values: np.ndarray, value: float) -> float:
+    """Share of values below `value` (ties count half), in percent"""
+    if values.size == 0:
+        return 0.0
+    below = np.count_nonzero(values < value)
+    equal = np.count_nonzero(values == value)
+    return float((below + 0.5 * equal) / values.size * 100)
+
+
+class CohortEngine:
+    """Incrementally refreshed rollup window plus the cohort views computed from it"""
+
+    def __init__(self, window_days: int = COHORT_WINDOW_DAYS, refresh_interval_s: float = COHORT_REFRESH_INTERVAL_S,
+                 overlap_s: float = COHORT_REFRESH_OVERLAP_S):
+        self.window_days = window_days
+        self.refresh_interval = refresh_interval_s
+        self.overlap = timedelta(seconds=overlap_s)
+        self._rows: Optional["pd.DataFrame"] = None
+        self._users: Optional["pd.DataFrame"] = None
+        self._high_water: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+
+        self.refreshes = 0
+        self.fetched_rows = 0
+
+    # -------------------------------
+    # Incremental refresh
+    # -------------------------------
+    async def refresh(self, db) -> int:
+        """Pull rollups changed since the last refresh; returns how many rows were fetched"""
+        since_day = day_key(datetime.now() - timedelta(days=self.window_days))
+        changed_since = self._high_water - self.overlap if self._high_water is not None else None
+        with analytics_stage("cohort_fetch"):
+            docs = await db[DAILY_COLLECTION].find(
+                changed_rollups_query(since_day, changed_since), {"_id": 0}
+            ).to_list(length=None)
+        await run_in_threadpool(self._merge, docs, since_day)
+
+        self._last_refresh = time.monotonic()
+        self.refreshes += 1
+        self.fetched_rows += len(docs)
+        return len(docs)
+
+    def _merge(self, docs: List[dict], since_day: datetime):
+        """Fold fetched rollups into the window and drop days that fell out of it"""
+        import pandas as pd
+
+        with analytics_stage("cohort_merge"):
+            rows = self._rows
+            if docs:
+                fetched = pd.json_normalize(docs)
+                # Rollup documents hold running totals, so a newer copy replaces the old row
+                rows = fetched if rows is None else pd.concat([rows, fetched], ignore_index=True)
+                rows = rows.drop_duplicates(["user_id", "day"], keep="last")
+                latest = fetched["updated_at"].max().to_pydatetime()
+                self._high_water = latest if self._high_water is None else max(self._high_water, latest)
+            if rows is not None:
+                in_window = rows["day"] >= since_day
+                if not in_window.all() or docs:
+                    # The window moved or rows changed: the per-user table is stale
+                    rows = rows[in_window].reset_index(drop=True)
+                    self._users = None
+            self._rows = rows
+
+    async def ensure_fresh(self, db):
+        """Refresh at most once per refresh interval; concurrent callers share one refresh"""
+        if self._rows is not None and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        async with self._lock:
+            if self._rows is None or time.monotonic() - self._last_refresh >= self.refresh_interval:
+                await self.refresh(db)
+
+    @staticmethod
+    def _columns(rows: "pd.DataFrame", prefix: str) -> List[str]:
+        return sorted(c for c in rows.columns if c.startswith(prefix))
+
+    def users(self) -> "pd.DataFrame":
+        """One row per user: window means of USER_METRICS, reading count and dominant cluster"""
+        import pandas as pd
+
+        if self._users is not None:
+            return self._users
+        # A refresh may swap _rows while this runs in the threadpool; work on one snapshot
+        rows = self._rows
+        if rows is None or rows.empty:
+            return pd.DataFrame(columns=["count", "cluster", *USER_METRICS])
+        with analytics_stage("cohort_users"):
+            cluster_columns = self._columns(rows, "cluster.")
+            sum_columns = [f"sums.{field}" for field in USER_METRICS.values()]
+            totals = rows.fillna(0).groupby("user_id", sort=False)[
+                ["count", *sum_columns, *cluster_columns]
+            ].sum()
+            counts = totals["count"].to_numpy(dtype=np.float64)
+            users = pd.DataFrame({"count": counts.astype(np.int64)}, index=totals.index)
+            for name, field in USER_METRICS.items():
+                users[name] = totals[f"sums.{field}"].to_numpy(dtype=np.float64) / np.maximum(counts, 1)
+            # Columns are sorted, so argmax breaks ties towards the smallest label (like Series.mode)
+            labels = np.array([c[len("cluster."):] for c in cluster_columns], dtype=object)
+            users["cluster"] = labels[totals[cluster_columns].to_numpy().argmax(axis=1)] if len(labels) else "Unknown"
+            users = users[users["count"] > 0]
+        if rows is self._rows:
+            self._users = users
+        return users
+
+    # -------------------------------
+    # Views
+    # -------------------------------
+    def screen_time_percentiles(self, percentiles=PERCENTILES) -> dict:
+        """Percentiles of per-user mean daily screen time, for everyone and per cluster"""
+        users = self.users()
+
+        def summary(values: np.ndarray) -> dict:
+            points = np.percentile(values, percentiles).tolist() if values.size else [None] * len(percentiles)
+            return {"users": int(values.size), "percentiles": dict(zip((f"p{p}" for p in percentiles), points))}
+
+        return {
+            "all": summary(users["screen_time"].to_numpy(dtype=np.float64)),
+            "by_cluster": {
+                cluster: summary(values.to_numpy(dtype=np.float64))
+                for cluster, values in users.groupby("cluster")["screen_time"]
+            },
+        }
+
+    def risk_over_time(self, period: str = "day") -> List[dict]:
+        """Risk-level counts over all users per day or per ISO week (keyed by the week's Monday)"""
+        import pandas as pd
+
+        rows = self._rows
+        if rows is None or rows.empty:
+            return []
+        risk_columns = self._columns(rows, "risk.")
+        keys = rows["day"]
+        if period == "week":
+            keys = keys - pd.to_timedelta(keys.dt.weekday, unit="D")
+        counts = rows[risk_columns].fillna(0).groupby(keys).sum().sort_index()
+        levels = [c[len("risk."):] for c in risk_columns]
+        return [
+            {
+                "period": key.strftime("%Y-%m-%d"),
+                "total": int(values.sum()),
+                "risk_levels": dict(zip(levels, values.astype(int).tolist())),
+            }
+            for key, values in zip(counts.index, counts.to_numpy())
+        ]
+
+    def user_position(self, user_id: str) -> Optional[dict]:
+        """The user's window means and their percentile rank within their cluster cohort and overall"""
+        users = self.users()
+        if user_id not in users.index:
+            return None
+        user = users.loc[user_id]
+        cohort = users[users["cluster"] == user["cluster"]]
+        return {
+            "user_id": user_id,
+            "cluster_label": user["cluster"],
+            "cohort_size": int(len(cohort)),
+            "population_size": int(len(users)),
+            "metrics": {
+                name: {
+                    "value": float(user[name]),
+                    "cohort_median": float(np.median(cohort[name].to_numpy(dtype=np.float64))),
+                    "cohort_percentile": percentile_rank(cohort[name].to_numpy(dtype=np.float64), user[name]),
+                    "population_percentile": percentile_rank(users[name].to_numpy(dtype=np.float64), user[name]),
+                }
+                for name in USER_METRICS
+            },
+        }
+
+    def stats(self) -> dict:
+        return {
+            "window_days": self.window_days,
+            "rows": 0 if self._rows is None else int(len(self._rows)),
+            "users": int(len(self.users())) if self._rows is not None else 0,
+            "refreshes": self.refreshes,
+            "fetched_rows": self.fetched_rows,
+            "high_water": self._high_water.isoformat() if self._high_water is not None else None,
+        }
+
+
+engine = CohortEngine()
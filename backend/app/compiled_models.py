@@ -0,0 +1,331 @@
+"""
+Array-backed model format and a pure-NumPy runtime for it.
+
+`export_bundle` flattens a pickled ModelBundle (StandardScalers, KMeans,
+LabelEncoder, RandomForestClassifier, XGBRegressor) into one .npy file per
+array plus a manifest.json. `load_components` reads them back into small
+objects with the same predict()/classes_/mean_ surface the pipeline uses,
+so serving needs neither scikit-learn, XGBoost nor joblib.
+
+Parity with the original estimators:
+  * forest: inputs are cast to float32 and compared with `<=` against the
+    float64 thresholds; per-tree class fractions are summed in tree order
+    and divided by the tree count, as RandomForestClassifier.predict_proba does
+  * boosted trees: float32 inputs compared with `<` against float32 split
+    values (NaN follows default_left); leaf values are accumulated in float32
+    in tree order starting from base_score
+  * KMeans: argmin of ||c||^2 - 2 x.c, the same expansion sklearn uses
+
+Export with `python -m ml_training.ml4.export_models` and serve with
+MODEL_FORMAT=compiled.
+
+Loaded with mmap_mode="r" the arrays stay views of the read-only file
+mapping: every worker process serving the same export shares one copy in
+the page cache instead of holding its own. The runtime only reads them
+(take/gather, never in-place), and export_bundle replaces files by rename
+so a re-export never rewrites pages a running worker has mapped.
+"""
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+# -------------------------------
+# Runtime
+# -------------------------------
+class ArrayScaler:
+    """StandardScaler parameters; FeaturePlan only reads mean_/scale_"""
+
+    with_mean = True
+    with_std = True
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+
+class ArrayLabelEncoder:
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def inverse_transform(self, encoded):
+        return self.classes_[np.asarray(encoded)]
+
+
+class TreeEnsemble:
+    """
+    All trees of an ensemble as flat node arrays with global node ids.
+
+    children holds (right, left) per node and leaves point to themselves, so
+    walking every tree for every row is a fixed `depth` rounds of flat
+    gathers: next = children[2 * node + goes_left], with no per-node branching.
+    """
+
+    def __init__(self, roots, feature, threshold, children, depth):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children.reshape(-1)
+        self.depth = int(depth)
+
+    def _descend(self, X, goes_left):
+        n_rows, n_cols = X.shape
+        values_flat = np.ascontiguousarray(X).reshape(-1)
+        row_offsets = (np.arange(n_rows, dtype=np.int32) * n_cols)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.roots.shape[0]))
+        for _ in range(self.depth):
+            values = values_flat.take(row_offsets + self.feature.take(node))
+            node = self.children.take(2 * node + goes_left(values, node))
+        return node
+
+
+class ForestClassifier(TreeEnsemble):
+    """RandomForestClassifier.predict over exported node arrays"""
+
+    def __init__(self, roots, feature, threshold, children, depth, value, classes):
+        super().__init__(roots, feature, threshold, children, depth)
+        self.value = value
+        self.classes_ = classes
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        leaves = self._descend(X, lambda values, node: values <= self.threshold.take(node))
+        # Tree-order running sum, like ForestClassifier's sequential accumulation
+        proba = np.cumsum(self.value[leaves], axis=1)[:, -1]
+        proba /= self.roots.shape[0]
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class BoostedRegressor(TreeEnsemble):
+    """XGBRegressor (gbtree, reg:squarederror) prediction over exported node arrays"""
+
+    def __init__(self, roots, feature, threshold, children, depth, leaf_value, default_left, base_score):
+        super().__init__(roots, feature, threshold, children, depth)
+        self.leaf_value = leaf_value
+        self.default_left = default_left
+        self.base_score = np.float32(base_score)
+
+    def _goes_left(self, values, node):
+        return np.where(np.isnan(values), self.default_left.take(node), values < self.threshold.take(node))
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        leaves = self._descend(X, self._goes_left)
+        contributions = np.empty((X.shape[0], leaves.shape[1] + 1), dtype=np.float32)
+        contributions[:, 0] = self.base_score
+        contributions[:, 1:] = self.leaf_value.take(leaves)
+        return np.cumsum(contributions, axis=1, dtype=np.float32)[:, -1]
+
+
+class CentroidClassifier:
+    """KMeans.predict: nearest cluster center"""
+
+    def __init__(self, centers):
+        self.cluster_centers_ = centers
+        self._center_sq_norms = np.einsum("ij,ij->i", centers, centers)
+
+    def predict(self, X):
+        distances = self._center_sq_norms - 2 * np.asarray(X, dtype=np.float64) @ self.cluster_centers_.T
+        return np.argmin(distances, axis=1).astype(np.int32)
+
+
+def _load(model_dir, name, mmap_mode=None):
+    array = np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+    # Plain ndarray view of the mapping: results of take()/ufuncs on it are
+    # ordinary arrays rather than file-less np.memmap instances
+    return np.asarray(array)
+
+
+def read_manifest(model_dir: str) -> dict:
+    with open(os.path.join(model_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"{model_dir} holds compiled format {manifest.get('format_version')}, expected {FORMAT_VERSION}; "
+            "re-run the export"
+        )
+    return manifest
+
+
+def model_files(model_dir: str):
+    """Every file a compiled bundle consists of (for change detection)"""
+    return [MANIFEST] + [f"{name}.npy" for name in read_manifest(model_dir)["arrays"]]
+
+
+def load_components(model_dir: str, mmap_mode=None) -> dict:
+    """ModelBundle components (same keys as model_registry.MODEL_FILES) from a compiled directory"""
+    manifest = read_manifest(model_dir)
+    arrays = {name: _load(model_dir, name, mmap_mode) for name in manifest["arrays"]}
+
+    def tree_arrays(prefix):
+        return [arrays[f"{prefix}_{part}"] for part in ("roots", "feature", "threshold", "children")]
+
+    artifacts = dict(manifest["artifacts"])
+    if "cluster_name_map" in artifacts:
+        artifacts["cluster_name_map"] = {int(k): v for k, v in artifacts["cluster_name_map"].items()}
+
+    return {
+        "clf_model": ForestClassifier(
+            *tree_arrays("risk"), manifest["risk_depth"], arrays["risk_value"], arrays["risk_classes"]
+        ),
+        "reg_model": BoostedRegressor(
+            *tree_arrays("mood"), manifest["mood_depth"], arrays["mood_leaf_value"],
+            arrays["mood_default_left"], manifest["mood_base_score"]
+        ),
+        "cluster_model": CentroidClassifier(arrays["cluster_centers"]),
+        "scaler_clf": ArrayScaler(arrays["scaler_clf_mean"], arrays["scaler_clf_scale"]),
+        "scaler_reg": ArrayScaler(arrays["scaler_reg_mean"], arrays["scaler_reg_scale"]),
+        "scaler_cluster": ArrayScaler(arrays["scaler_cluster_mean"], arrays["scaler_cluster_scale"]),
+        "le": ArrayLabelEncoder(np.array(manifest["label_classes"], dtype=object)),
+        "artifacts": artifacts,
+    }
+
+
+# -------------------------------
+# Export (needs the fitted estimators, i.e. scikit-learn/XGBoost installed)
+# -------------------------------
+def _max_depth(left, right, roots):
+    depth, frontier = 0, np.asarray(roots)
+    while True:
+        children = np.concatenate([left[frontier], right[frontier]])
+        children = children[children != np.concatenate([frontier, frontier])]
+        if children.size == 0:
+            return depth
+        frontier, depth = children, depth + 1
+
+
+def _flatten(trees):
+    """Concatenate (feature, threshold, left, right, is_leaf) per tree into global-id arrays"""
+    roots, features, thresholds, lefts, rights = [], [], [], [], []
+    offset = 0
+    for feature, threshold, left, right, is_leaf in trees:
+        n = len(feature)
+        ids = np.arange(n) + offset
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, feature))
+        thresholds.append(threshold)
+        lefts.append(np.where(is_leaf, ids, left + offset))
+        rights.append(np.where(is_leaf, ids, right + offset))
+        offset += n
+    left, right = np.concatenate(lefts).astype(np.int32), np.concatenate(rights).astype(np.int32)
+    roots = np.array(roots, dtype=np.int32)
+    return {
+        "roots": roots,
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds),
+        # Column 1 is taken when a row goes left (see TreeEnsemble._descend)
+        "children": np.stack([right, left], axis=1),
+    }, _max_depth(left, right, roots)
+
+
+def export_forest(forest):
+    trees = []
+    values = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        trees.append((tree.feature, tree.threshold.astype(np.float64), tree.children_left, tree.children_right, is_leaf))
+        # scikit-learn < 1.4 stores per-class sample counts and normalizes in
+        # predict_proba; later versions store fractions. Export fractions either way.
+        value = tree.value[:, 0, :].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        values.append(value / totals)
+    arrays, depth = _flatten(trees)
+    arrays["value"] = np.concatenate(values)
+    arrays["classes"] = np.asarray(forest.classes_)
+    return arrays, depth
+
+
+def export_booster(model):
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "reg:squarederror" or learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError(f"Only gbtree reg:squarederror boosters can be exported, got {objective}")
+
+    trees = []
+    leaf_values, default_lefts = [], []
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.array(tree["left_children"])
+        is_leaf = left == -1
+        split = np.array(tree["split_conditions"], dtype=np.float32)
+        trees.append((np.array(tree["split_indices"]), np.where(is_leaf, np.float32(0), split),
+                      left, np.array(tree["right_children"]), is_leaf))
+        # Leaf values are stored in split_conditions (learning rate already applied)
+        leaf_values.append(np.where(is_leaf, split, np.float32(0)))
+        default_lefts.append(np.array(tree["default_left"], dtype=bool))
+    arrays, depth = _flatten(trees)
+    arrays["threshold"] = arrays["threshold"].astype(np.float32)
+    arrays["leaf_value"] = np.concatenate(leaf_values).astype(np.float32)
+    arrays["default_left"] = np.concatenate(default_lefts)
+
+    # "[5.591E0]" in XGBoost >= 2, "5.591E0" before
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+    return arrays, depth, base_score
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _replace_file(path, write):
+    """
+    Write to a temp file and rename it over path. Workers that memory-mapped
+    the old file keep reading the old inode; truncating it in place would
+    make their next page fault a SIGBUS.
+    """
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def export_bundle(components: dict, out_dir: str, source_version: str = None) -> dict:
+    """
+    Write compiled arrays and manifest.json for fitted estimators keyed like
+    model_registry.MODEL_FILES (clf_model, scaler_clf, ..., artifacts).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {}
+
+    risk, risk_depth = export_forest(components["clf_model"])
+    arrays.update({f"risk_{k}": v for k, v in risk.items()})
+    mood, mood_depth, base_score = export_booster(components["reg_model"])
+    arrays.update({f"mood_{k}": v for k, v in mood.items()})
+    arrays["cluster_centers"] = np.ascontiguousarray(components["cluster_model"].cluster_centers_, dtype=np.float64)
+    for name in ("scaler_clf", "scaler_reg", "scaler_cluster"):
+        scaler = components[name]
+        n = scaler.n_features_in_
+        arrays[f"{name}_mean"] = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(n), dtype=np.float64)
+        arrays[f"{name}_scale"] = np.asarray(scaler.scale_ if scaler.with_std else np.ones(n), dtype=np.float64)
+
+    for name, array in arrays.items():
+        _replace_file(os.path.join(out_dir, f"{name}.npy"),
+                      lambda f, a=array: np.save(f, np.ascontiguousarray(a), allow_pickle=False))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "source_version": source_version,
+        "arrays": sorted(arrays),
+        "risk_depth": risk_depth,
+        "mood_depth": mood_depth,
+        "mood_base_score": base_score,
+        "label_classes": _jsonable(components["le"].classes_),
+        "artifacts": _jsonable(components["artifacts"]),
+    }
+    _replace_file(os.path.join(out_dir, MANIFEST), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    return manifest
@@ -0,0 +1,81 @@
+import os
+
+# -------------------------------
+# MongoDB settings
+# -------------------------------
+# URIs starting with this prefix get an in-process stand-in instead of a server
+MOCK_URI_PREFIX = "mongomock://"
+
+_settings = None
+_client = None
+
+
+def settings() -> dict:
+    """
+    MongoDB settings from the environment, read on first use; a .env file
+    is loaded then rather than as a side effect of importing this module
+    """
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _settings = {
+            "uri": os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+            "db_name": os.getenv("MONGODB_DB", "screenaware_db"),
+            # Connection pool sizing and timeouts (passed straight to the Motor client)
+            "client_options": {
+                "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+                "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+                "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+                "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+                "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+                "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+                "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+            },
+        }
+    return _settings
+
+
+def create_client(uri: str = None):
+    """Create an asyncio-native client: Motor for real servers, mongomock-motor for mongomock:// URIs"""
+    uri = uri or settings()["uri"]
+    if uri.startswith(MOCK_URI_PREFIX):
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError as e:
+            raise RuntimeError(
+                "MONGODB_URI uses mongomock:// but mongomock-motor is not installed "
+                "(pip install mongomock-motor)"
+            ) from e
+        return AsyncMongoMockClient()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from .metrics import MongoCommandTimer
+    return AsyncIOMotorClient(uri, event_listeners=[MongoCommandTimer()], **settings()["client_options"])
+
+
+def get_client():
+    """Shared client, created lazily on first use so it binds to the running event loop"""
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+def set_client(client):
+    """Swap in another client (e.g. an in-process stand-in for tests and benchmarks)"""
+    global _client
+    _client = client
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def get_db():
+    """FastAPI dependency returning the application database"""
+    return get_client()[settings()["db_name"]]
@@ -0,0 +1,168 @@
+import numpy as np
+
+# -------------------------------
+# Raw inputs (UserInput field order)
+# -------------------------------
+RAW_FEATURES = [
+    "daily_screen_time_hours",
+    "sleep_duration_hours",
+    "stress_level",
+    "sleep_quality",
+    "physical_activity_hours_per_week",
+    "social_media_hours",
+    "gaming_hours",
+    "entertainment_hours",
+    "work_related_hours",
+]
+RAW_INDEX = {name: i for i, name in enumerate(RAW_FEATURES)}
+
+SCREEN_CATEGORIES = {
+    "social_media_hours": "Social Media",
+    "gaming_hours": "Gaming",
+    "entertainment_hours": "Entertainment",
+    "work_related_hours": "Work"
+}
+
+# Dominant activity of a cluster center -> label returned by the API
+CLUSTER_LABELS = {
+    "social_media_hours": "Social Media Dominant",
+    "gaming_hours": "Gaming Heavy",
+    "entertainment_hours": "Entertainment Focused",
+    "work_related_hours": "Work Related Usage",
+}
+
+# -------------------------------
+# Engineered features (SAME AS TRAINING)
+# Each takes the raw (n, 9) matrix and returns an (n,) column.
+# -------------------------------
+def _col(raw, name):
+    return raw[:, RAW_INDEX[name]]
+
+ENGINEERED_FEATURES = {
+    "screen_sleep_ratio": lambda raw: _col(raw, "daily_screen_time_hours") / (_col(raw, "sleep_duration_hours") + 1),
+    "stress_x_sleep": lambda raw: _col(raw, "stress_level") * _col(raw, "sleep_quality"),
+    "activity_balance": lambda raw: _col(raw, "physical_activity_hours_per_week") / (_col(raw, "daily_screen_time_hours") + 1),
+    "wellness_score": lambda raw: (
+        (_col(raw, "sleep_quality") + _col(raw, "physical_activity_hours_per_week")) / 2
+        - (_col(raw, "stress_level") + _col(raw, "daily_screen_time_hours") / 2)
+    ),
+}
+
+
+# -------------------------------
+# Rule-based labels (SAME AS TRAINING)
+# -------------------------------
+def assign_risk(raw):
+    """Risk level per row of the raw (n, 9) matrix: the ml4 notebook's assign_risk_rule, vectorized"""
+    stress = _col(raw, "stress_level")
+    sleep = _col(raw, "sleep_duration_hours")
+    return np.select(
+        [(stress > 7) | (sleep < 5), (stress < 4) & (sleep >= 7)], ["High", "Low"], default="Medium"
+    )
+
+
+def _scaler_params(scaler, n):
+    """mean_/scale_ as float64 arrays; identity values when centering/scaling is off"""
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) else None
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) else None
+    mean = np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+class PlannedFeatures:
+    """Result of FeaturePlan.build: one scaled matrix per model, mostly views of a shared one"""
+
+    def __init__(self, raw, matrices, dominant_category):
+        self.raw = raw
+        self.risk = matrices["risk"]
+        self.mood = matrices["mood"]
+        self.cluster = matrices["cluster"]
+        self.dominant_category = dominant_category
+
+
+class FeaturePlan:
+    """
+    Precompiled UserInput -> model matrices mapping for one ModelBundle.
+
+    The union of clf/reg/cluster features is laid out once so that each
+    model's columns are a contiguous run, engineered features are computed
+    once, and scaling (StandardScaler semantics: subtract mean_, divide by
+    scale_, float64) is applied once per column. Models whose scaler agrees
+    with the shared column parameters get a zero-copy slice; a model whose
+    scaler was fitted differently gets its own scaled copy of its slice.
+    """
+
+    def __init__(self, clf_features, scaler_clf, reg_features, scaler_reg, cluster_features, scaler_cluster):
+        specs = {
+            "risk": (list(clf_features), scaler_clf),
+            "mood": (list(reg_features), scaler_reg),
+            "cluster": (list(cluster_features), scaler_cluster),
+        }
+        for name, (features, _) in specs.items():
+            unknown = [f for f in features if f not in RAW_INDEX and f not in ENGINEERED_FEATURES]
+            if unknown:
+                raise KeyError(f"No recipe for {name} features: {unknown}")
+
+        # Lay out the union, longest list first, so subsets stay contiguous
+        columns = []
+        for name in sorted(specs, key=lambda n: -len(specs[n][0])):
+            columns.extend(f for f in specs[name][0] if f not in columns)
+        position = {f: i for i, f in enumerate(columns)}
+        self.columns = columns
+
+        raw_columns = [f for f in columns if f in RAW_INDEX]
+        self.raw_positions = np.array([position[f] for f in raw_columns])
+        self.raw_index = np.array([RAW_INDEX[f] for f in raw_columns])
+        self.engineered = [
+            (position[f], ENGINEERED_FEATURES[f]) for f in columns if f not in RAW_INDEX
+        ]
+
+        # Shared per-column scaling; the first model to claim a column sets it
+        self.mean = np.full(len(columns), np.nan)
+        self.scale = np.full(len(columns), np.nan)
+        self.selectors = {}
+        self.own_params = {}
+        for name, (features, scaler) in specs.items():
+            idx = np.array([position[f] for f in features])
+            mean, scale = _scaler_params(scaler, len(features))
+            unclaimed = np.isnan(self.mean[idx])
+            self.mean[idx[unclaimed]] = mean[unclaimed]
+            self.scale[idx[unclaimed]] = scale[unclaimed]
+
+            contiguous = len(idx) > 0 and np.array_equal(idx, np.arange(idx[0], idx[0] + len(idx)))
+            self.selectors[name] = slice(int(idx[0]), int(idx[0]) + len(idx)) if contiguous else idx
+            if not (np.array_equal(mean, self.mean[idx]) and np.array_equal(scale, self.scale[idx])):
+                self.own_params[name] = (mean, scale)
+
+        self.category_index = np.array([RAW_INDEX[c] for c in SCREEN_CATEGORIES])
+        self.category_names = np.array(list(SCREEN_CATEGORIES.values()))
+
+    @staticmethod
+    def raw_matrix(users):
+        """Stack UserInput objects into an (n, 9) float64 matrix in RAW_FEATURES order"""
+        return np.array(
+            [[getattr(user, name) for name in RAW_FEATURES] for user in users],
+            dtype=np.float64
+        ).reshape(-1, len(RAW_FEATURES))
+
+    def build(self, raw):
+        """Build every model's scaled input from one (n, 9) raw matrix"""
+        union = np.empty((raw.shape[0], len(self.columns)))
+        union[:, self.raw_positions] = raw[:, self.raw_index]
+        for i, fn in self.engineered:
+            union[:, i] = fn(raw)
+
+        scaled = (union - self.mean) / self.scale
+        matrices = {}
+        for name, selector in self.selectors.items():
+            if name in self.own_params:
+                mean, scale = self.own_params[name]
+                matrices[name] = (union[:, selector] - mean) / scale
+            else:
+                matrices[name] = scaled[:, selector]
+        return PlannedFeatures(raw, matrices, self.dominant_category(raw))
+
+    def dominant_category(self, raw):
+        # argmax keeps the first column on ties, like max() over the dict
+        return self.category_names[np.argmax(raw[:, self.category_index], axis=1)]
@@ -0,0 +1,140 @@
+"""
+Conditional requests and compact, compressed JSON for the analytics endpoints.
+
+A user's analytics only change when a reading is added or when the 30-day
+window slides past one. The ETag covers the newest reading, the oldest one
+in the window and the window's document count, which also moves when a
+back-dated reading lands between the two. All three are answered from the
+user_id/timestamp index (two single-document lookups and a count), so
+validators() is far cheaper than the query and pandas work it lets a
+request skip: a dashboard refresh with an unchanged validator gets 304
+Not Modified. Responses built from the daily rollups also fold in the
+newest updated_at of the user's rollups in the window: rollups are
+written after the raw document, and a request landing in between must
+not cache rollup data under the raw reading's ETag.
+
+The ETag is weak (W/"..."): the body is the same JSON whether or not it
+is compressed. Last-Modified is the newest timestamp; stored timestamps
+are naive server-local times (UserDataPoint defaults to datetime.now()),
+so it is converted to UTC for the header. If-None-Match wins when both
+are sent, since Last-Modified can't see back-dated readings.
+
+json_response() validates the payload into the response model once and
+serializes it with pydantic-core (no jsonable_encoder and second
+validation pass), then gzip- or, with the optional `brotli` package,
+brotli-compresses bodies of at least ANALYTICS_COMPRESS_MIN_BYTES.
+"""
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from . import queries
+from .rollups import DAILY_COLLECTION, daily_rollup_query, day_key
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ANALYTICS_COMPRESS_MIN_BYTES = int(os.getenv("ANALYTICS_COMPRESS_MIN_BYTES", "1024"))
+ANALYTICS_GZIP_LEVEL = int(os.getenv("ANALYTICS_GZIP_LEVEL", "6"))
+ANALYTICS_BROTLI_QUALITY = int(os.getenv("ANALYTICS_BROTLI_QUALITY", "5"))
+
+# Bump when a response's shape changes, so clients drop their cached copies
+RESPONSE_FORMAT = 1
+
+
+class Validators:
+    """ETag and Last-Modified for one user's analytics response"""
+
+    def __init__(self, etag: str, last_modified: datetime):
+        self.etag = etag
+        # Naive timestamps are server-local; aware ones convert as they are
+        self.last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+
+    def headers(self) -> dict:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            # Keep a copy, but ask us before using it
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+    def matches(self, request: Request) -> bool:
+        """Whether the client's cached copy (If-None-Match, else If-Modified-Since) is current"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison: W/"x" and "x" name the same representation
+            return "*" in tags or any(tag.removeprefix("W/") == self.etag.removeprefix("W/") for tag in tags)
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+
+async def validators(db, user_id: str, since: datetime, *variant, with_rollups: bool = False) -> Optional[Validators]:
+    """
+    Validators for a user's window starting at `since`, or None when the
+    user has no data. `variant` (endpoint, settings) is folded into the ETag,
+    and with_rollups the version of the user's daily rollups in the window.
+    """
+    fields = queries.projection(queries.VALIDATOR_FIELDS)
+    newest = await db.user_data.find_one({"user_id": user_id}, fields, sort=queries.NEWEST_FIRST)
+    if newest is None:
+        return None
+    window = queries.user_window(user_id, since)
+    oldest = await db.user_data.find_one(window, fields, sort=queries.OLDEST_FIRST)
+    count = await db.user_data.count_documents(window) if oldest else 0
+    rollup_version = None
+    if with_rollups:
+        latest_rollup = await db[DAILY_COLLECTION].find_one(
+            daily_rollup_query(user_id, since), queries.projection(["updated_at"]), sort=queries.LATEST_UPDATE_FIRST
+        )
+        rollup_version = latest_rollup["updated_at"] if latest_rollup else None
+    key = (
+        RESPONSE_FORMAT, variant, user_id, day_key(since),
+        newest["timestamp"], newest["_id"],
+        (oldest["timestamp"], oldest["_id"]) if oldest else None,
+        count, rollup_version,
+    )
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+    return Validators(f'W/"{digest}"', newest["timestamp"])
+
+
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def json_response(model: Type[BaseModel], payload: dict, request: Request, headers: dict = None) -> Response:
+    """payload validated once into `model`, serialized by alias and compressed when the client accepts it"""
+    body = model.model_validate(payload).model_dump_json(by_alias=True).encode()
+    headers = dict(headers or {})
+    if len(body) >= ANALYTICS_COMPRESS_MIN_BYTES:
+        accepted = _accepted_encodings(request)
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=ANALYTICS_BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=ANALYTICS_GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,105 @@
+"""
+Index provisioning and query-plan checks for the analytics collections.
+
+Indexes are created at API startup (see main.py). The query-plan check
+runs every router query through explain() against a real MongoDB and
+fails if any of them falls back to a collection scan:
+
+    python -m backend.app.indexes --check-plans
+"""
+import argparse
+import asyncio
+import sys
+from typing import List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from . import queries
+from .rollups import DAILY_COLLECTION
+
+INDEXES = {
+    "user_data": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_id_timestamp_desc"),
+        # Keyset-paginated exports sort on (timestamp, _id)
+        IndexModel([("user_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+                   name="user_id_timestamp_id"),
+        # ml_training/ml4/refresh.py streams new documents in (ingested_at, _id) order
+        IndexModel([("ingested_at", ASCENDING), ("_id", ASCENDING)], name="ingested_at_id"),
+    ],
+    DAILY_COLLECTION: [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_id_day", unique=True),
+        # Cohort refreshes read every user's rollups inside the window, the
+        # incremental ones only those updated since the last refresh
+        IndexModel([("day", ASCENDING), ("updated_at", ASCENDING)], name="day_updated_at"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """Create any missing indexes; existing ones with the same spec are left alone"""
+    for collection, models in INDEXES.items():
+        await db[collection].create_indexes(models)
+
+
+def _plan_stages(explained):
+    """Every plan stage name in an explain document, ignoring rejected plans"""
+    if isinstance(explained, dict):
+        if "stage" in explained:
+            yield explained["stage"]
+        for key, value in explained.items():
+            if key != "rejectedPlans":
+                yield from _plan_stages(value)
+    elif isinstance(explained, list):
+        for item in explained:
+            yield from _plan_stages(item)
+
+
+async def collection_scans(db) -> List[str]:
+    """Names of router queries whose winning plan contains a COLLSCAN"""
+    since = queries.analytics_window_start()
+    offenders = []
+    for name, spec in queries.router_queries("explain-check-user", since).items():
+        if "pipeline" in spec:
+            command = {"aggregate": spec["collection"], "pipeline": spec["pipeline"], "cursor": {}}
+        else:
+            command = {"find": spec["collection"], "filter": spec["filter"]}
+            if spec.get("sort"):
+                command["sort"] = dict(spec["sort"])
+            if spec.get("projection"):
+                command["projection"] = spec["projection"]
+        explained = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        if "COLLSCAN" in _plan_stages(explained):
+            offenders.append(name)
+    return offenders
+
+
+async def _run(check_plans: bool) -> int:
+    from .database import close_client, get_db
+
+    db = get_db()
+    try:
+        await ensure_indexes(db)
+        print("✅ Indexes ensured")
+        if not check_plans:
+            return 0
+        offenders = await collection_scans(db)
+        if offenders:
+            print(f"❌ Collection scans in: {', '.join(offenders)}")
+            return 1
+        print("✅ All router queries use an index")
+        return 0
+    finally:
+        close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create analytics indexes")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="Fail if any router query's winning plan is a collection scan")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args.check_plans)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+
+from .metrics import stage
+
+TARGETS = ("risk", "mood", "cluster")
+
+# -------------------------------
+# Mood scaling function (SAME AS TRAINING)
+# -------------------------------
+def map_to_1_5_scale(pred, min_pred, max_pred):
+    if max_pred == min_pred:
+        return 3
+    scaled = 1 + (pred - min_pred) * 4 / (max_pred - min_pred)
+    return int(round(np.clip(scaled, 1, 5)))
+
+def map_to_1_5_scale_array(preds, min_pred, max_pred):
+    """Vectorized map_to_1_5_scale for a whole batch of raw mood predictions."""
+    preds = np.asarray(preds)
+    if max_pred == min_pred:
+        return np.full(preds.shape, 3, dtype=int)
+    scaled = 1 + (preds - min_pred) * 4 / (max_pred - min_pred)
+    return np.rint(np.clip(scaled, 1, 5)).astype(int)
+
+# -------------------------------
+# Shared prediction stage
+# -------------------------------
+def predict_arrays(models, raw, targets=TARGETS):
+    """
+    Run the requested models over an (n, 9) raw matrix.
+
+    Every endpoint (single, batch, sub-endpoints) goes through here, so the
+    feature plan and post-processing can't drift apart between them.
+    """
+    with stage("features"):
+        features = models.plan.build(raw)
+    results = {"dominant_category": features.dominant_category}
+    if "risk" in targets:
+        with stage("risk_predict"):
+            results["risk_encoded"] = models.clf_model.predict(features.risk)
+        with stage("risk_decode"):
+            results["risk_level"] = models.le.classes_[results["risk_encoded"]]
+    if "mood" in targets:
+        with stage("mood_predict"):
+            results["mood_raw"] = models.reg_model.predict(features.mood)
+        with stage("mood_scale"):
+            results["mood_rating"] = map_to_1_5_scale_array(
+                results["mood_raw"], models.mood_min_range, models.mood_max_range
+            )
+    if "cluster" in targets:
+        with stage("cluster_predict"):
+            results["cluster_id"] = models.cluster_model.predict(features.cluster)
+        with stage("cluster_label"):
+            results["cluster_label"] = np.array(
+                [models.cluster_name_map.get(c, "Unknown") for c in results["cluster_id"]], dtype=object
+            )
+    return results
+
+def report_rows(results):
+    """Turn predict_arrays output into the /predict_report response dicts, in input order"""
+    return [
+        {
+            "risk_level": str(risk),
+            "mood_rating": int(mood),
+            "cluster_label": cluster,
+            "dominant_category": str(category)
+        }
+        for risk, mood, cluster, category in zip(
+            results["risk_level"], results["mood_rating"],
+            results["cluster_label"], results["dominant_category"]
+        )
+    ]
@@ -0,0 +1,327 @@
+"""
+Bounded, micro-batching executor for model inference.
+
+With INFERENCE_EXECUTOR=inline (the default) handlers score on their own
+request thread as before. With "thread" or "process" every scoring call is
+handed to one dispatcher thread instead: requests arriving within
+INFERENCE_BATCH_WINDOW_MS of each other (up to INFERENCE_BATCH_MAX_ROWS
+rows) are stacked into a single predict_arrays call and run on a pool of
+INFERENCE_WORKERS threads, or processes that each load the models once at
+start-up and so never hold the API's GIL. While every worker is busy the
+next batch keeps growing, so throughput rises with load instead of latency.
+
+At most INFERENCE_QUEUE_MAX requests wait for a batch; one more is shed
+with InferenceOverloaded (HTTP 503) rather than queued behind them, and a
+request not answered within INFERENCE_TIMEOUT_MS raises InferenceTimeout
+(HTTP 504). A process worker whose models on disk are not the version the
+API is serving fails the batch with ModelVersionMismatch (HTTP 503).
+pipeline_stage_seconds only covers thread workers; process workers keep
+their own metrics.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Optional
+
+import numpy as np
+
+from .inference import TARGETS, predict_arrays
+from .logging_config import get_logger
+from .metrics import INFERENCE_BATCH_ROWS, INFERENCE_QUEUE_SECONDS
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "inline")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_MAX = int(os.getenv("INFERENCE_QUEUE_MAX", "1000"))
+INFERENCE_TIMEOUT_MS = int(os.getenv("INFERENCE_TIMEOUT_MS", "5000"))
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "2"))
+INFERENCE_BATCH_MAX_ROWS = int(os.getenv("INFERENCE_BATCH_MAX_ROWS", "256"))
+
+logger = get_logger("inference_executor")
+
+_STOP = object()
+
+
+class InferenceOverloaded(Exception):
+    """The inference queue is full (or shutting down); the request was not accepted"""
+
+
+class InferenceTimeout(Exception):
+    """The request was accepted but not scored within the timeout"""
+
+
+class ModelVersionMismatch(Exception):
+    """A process worker could not load the model version the API asked for"""
+
+
+# -------------------------------
+# Process workers
+# -------------------------------
+_worker_registry = None
+
+
+def _init_process(model_dir: str, model_format: str, mmap: bool):
+    global _worker_registry
+    from .model_registry import ModelRegistry
+
+    _worker_registry = ModelRegistry(model_dir, model_format=model_format, mmap=mmap)
+    _worker_registry.load()
+
+
+def _score_in_process(version: str, raw):
+    models = _worker_registry.get()
+    if models.version != version:
+        # The API reloaded; catch up if the files on disk changed (a stat when
+        # they didn't), then refuse to score with anything but its version
+        _worker_registry.reload_if_changed()
+        models = _worker_registry.get()
+        if models.version != version:
+            raise ModelVersionMismatch(
+                f"Worker {os.getpid()} has models {models.version} on disk, the API asked for {version}"
+            )
+    return predict_arrays(models, raw)
+
+
+def _ready():
+    return os.getpid()
+
+
+# -------------------------------
+# Dispatcher
+# -------------------------------
+class _Request:
+    __slots__ = ("models", "raw", "future", "enqueued")
+
+    def __init__(self, models, raw):
+        self.models = models
+        self.raw = raw
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class InferenceExecutor:
+    """Bounded request queue, micro-batching dispatcher thread and a worker pool"""
+
+    def __init__(self, kind="thread", registry=None, workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_MAX,
+                 timeout_ms=INFERENCE_TIMEOUT_MS, batch_window_ms=INFERENCE_BATCH_WINDOW_MS,
+                 batch_max_rows=INFERENCE_BATCH_MAX_ROWS):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor {kind!r}, expected one of {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.workers = workers
+        self.timeout = timeout_ms / 1000
+        self.batch_window = batch_window_ms / 1000
+        self.batch_max_rows = batch_max_rows
+        self._queue = queue.Queue(maxsize=max_queue)
+        # One batch in flight per worker; the dispatcher waits for a free one
+        self._slots = threading.Semaphore(workers)
+        self._carry: Optional[_Request] = None
+        # Held while checking _closing and enqueueing, so nothing lands behind the stop marker
+        self._accepting = threading.Lock()
+        self._closing = False
+
+        if kind == "process":
+            # spawn: forking a process that runs threads (and holds locks) is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(registry.model_dir, registry.model_format, registry.mmap),
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._thread = threading.Thread(target=self._run, name="inference-dispatcher", daemon=True)
+
+        self.batches = 0
+        self.batched_rows = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def start(self):
+        self._thread.start()
+        if self.kind == "process":
+            # Start the workers (and their model loads) now rather than on the first request
+            for _ in range(self.workers):
+                self._pool.submit(_ready)
+
+    def close(self):
+        """Stop accepting requests, score what is queued and shut the pool down"""
+        with self._accepting:
+            self._closing = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def submit(self, models, raw) -> Future:
+        """Queue an (n, 9) raw matrix; the future resolves to predict_arrays output for those rows"""
+        request = _Request(models, raw)
+        with self._accepting:
+            if self._closing:
+                raise InferenceOverloaded("Inference is shutting down")
+            try:
+                self._queue.put_nowait(request)
+            except queue.Full:
+                self.rejected += 1
+                raise InferenceOverloaded(f"Inference queue full ({self._queue.maxsize} requests)")
+        return request.future
+
+    def predict(self, models, raw) -> dict:
+        """submit() and wait for the result, up to the request timeout"""
+        future = self.submit(models, raw)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued: dropped from its batch. Already running: the result is discarded.
+            future.cancel()
+            self.timeouts += 1
+            raise InferenceTimeout(f"Inference did not finish within {self.timeout * 1000:.0f} ms")
+
+    def _take(self, timeout=None):
+        """Next request: a carried-over one first, then the queue (None blocks, <= 0 doesn't wait)"""
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        if timeout is None:
+            return self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait()
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self, batch, rows, deadline):
+        """Add requests scored by the same bundle until the batch is full or the deadline passes"""
+        while rows < self.batch_max_rows:
+            try:
+                request = self._take(deadline - time.perf_counter())
+            except queue.Empty:
+                break
+            if request is _STOP or request.models is not batch[0].models:
+                # Stopping, or a reload happened: leave it for the next round
+                self._carry = request
+                break
+            batch.append(request)
+            rows += len(request.raw)
+        return rows
+
+    def _run(self):
+        while True:
+            first = self._take()
+            if first is _STOP:
+                break
+            batch, rows = [first], len(first.raw)
+            if self.batch_window > 0:
+                rows = self._collect(batch, rows, time.perf_counter() + self.batch_window)
+            self._slots.acquire()
+            # Whatever arrived while every worker was busy joins this batch
+            self._collect(batch, rows, time.perf_counter())
+            self._dispatch(batch)
+        self._carry = None
+
+        # Draining: score everything still queued behind the stop marker
+        leftover = []
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if request is not _STOP:
+                leftover.append(request)
+        for request in leftover:
+            self._slots.acquire()
+            self._dispatch([request])
+
+    def _dispatch(self, batch):
+        live = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not live:
+            self._slots.release()
+            return
+        now = time.perf_counter()
+        for request in live:
+            INFERENCE_QUEUE_SECONDS.observe(now - request.enqueued)
+        raw = live[0].raw if len(live) == 1 else np.concatenate([request.raw for request in live])
+        INFERENCE_BATCH_ROWS.observe(len(raw))
+        self.batches += 1
+        self.batched_rows += len(raw)
+
+        models = live[0].models
+        try:
+            if self.kind == "process":
+                future = self._pool.submit(_score_in_process, models.version, raw)
+            else:
+                future = self._pool.submit(predict_arrays, models, raw)
+        except Exception as e:
+            # e.g. BrokenProcessPool: fail these requests, keep the dispatcher alive
+            self._slots.release()
+            logger.exception("Could not submit an inference batch of %d requests", len(live))
+            for request in live:
+                request.future.set_exception(e)
+            return
+        future.add_done_callback(lambda done: self._complete(live, done))
+
+    def _complete(self, batch, done: Future):
+        self._slots.release()
+        try:
+            results = done.result()
+        except ModelVersionMismatch as e:
+            # Disk and API disagree (a reload in progress, or a failed one); no traceback needed
+            logger.warning("Inference batch of %d requests failed: %s", len(batch), e)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        except Exception as e:
+            logger.exception("Inference batch of %d requests failed", len(batch))
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        start = 0
+        for request in batch:
+            end = start + len(request.raw)
+            request.future.set_result({key: value[start:end] for key, value in results.items()})
+            start = end
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.kind,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "batches": self.batches,
+            "avg_batch_rows": round(self.batched_rows / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+executor: Optional[InferenceExecutor] = None
+
+
+def start_executor(registry):
+    """Start the pool when INFERENCE_EXECUTOR is thread or process"""
+    global executor
+    if INFERENCE_EXECUTOR not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown INFERENCE_EXECUTOR {INFERENCE_EXECUTOR!r}, expected one of {EXECUTOR_KINDS}")
+    if INFERENCE_EXECUTOR != "inline" and executor is None:
+        executor = InferenceExecutor(INFERENCE_EXECUTOR, registry)
+        executor.start()
+
+
+def stop_executor():
+    global executor
+    if executor is not None:
+        executor.close()
+        executor = None
+
+
+def stats() -> dict:
+    return executor.stats() if executor is not None else {"mode": "inline"}
+
+
+def predict(models, raw, targets=TARGETS) -> dict:
+    """
+    predict_arrays through the executor when one is running. Batched calls
+    score every target, so the result may hold more keys than requested.
+    """
+    if executor is None:
+        return predict_arrays(models, raw, targets)
+    return executor.predict(models, raw)
@@ -0,0 +1,258 @@
+"""
+Persistence for POST /api/user-data.
+
+In the default "direct" mode every submission is written with insert_one
+(plus its rollup updates) before the response goes out. In "buffered"
+mode submissions are queued in memory and a background task writes them
+with insert_many / bulk_write, flushing whenever INGEST_BATCH_SIZE
+documents are waiting or INGEST_FLUSH_INTERVAL_MS has passed. A full
+queue makes callers wait up to INGEST_ENQUEUE_TIMEOUT_MS and then raises
+IngestQueueFull (HTTP 503), and shutdown drains whatever is still queued.
+
+Either way the response is built from the validated UserDataPoint, so
+there is no read-back round-trip. Every document is stamped with
+ingested_at just before it is written, so incremental readers can resume
+from the last one they saw.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from . import rollups
+from .logging_config import get_logger
+from .models.user_data import UserDataPoint, UserDataResponse
+
+USER_DATA_WRITE_MODE = os.getenv("USER_DATA_WRITE_MODE", "direct")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_FLUSH_INTERVAL_MS = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "200"))
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "10000"))
+INGEST_ENQUEUE_TIMEOUT_MS = int(os.getenv("INGEST_ENQUEUE_TIMEOUT_MS", "1000"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+
+logger = get_logger("ingest")
+
+_STOP = object()
+
+
+class IngestQueueFull(Exception):
+    """The write-behind queue stayed full for longer than the enqueue timeout"""
+
+
+def stamp_ingested(docs, now: datetime = None):
+    """
+    Set ingested_at (naive UTC, the writer's clock) on documents about to be
+    inserted; ml_training/ml4/refresh.py resumes from it
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    for doc in docs:
+        doc["ingested_at"] = now
+
+
+def prepare_document(data: UserDataPoint) -> dict:
+    """Mongo document for a validated submission, with timestamp truncated to BSON's millisecond precision"""
+    doc = data.dict(by_alias=True)
+    ts = doc["timestamp"]
+    doc["timestamp"] = ts.replace(microsecond=ts.microsecond // 1000 * 1000)
+    return doc
+
+
+def response_from_document(doc: dict) -> UserDataResponse:
+    return UserDataResponse(**{**doc, "_id": str(doc["_id"])})
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory queue of user_data documents flushed in bulk by one background task"""
+
+    def __init__(self, db_getter, batch_size=INGEST_BATCH_SIZE, flush_interval_ms=INGEST_FLUSH_INTERVAL_MS,
+                 max_queue=INGEST_QUEUE_MAX, enqueue_timeout_ms=INGEST_ENQUEUE_TIMEOUT_MS,
+                 max_retries=INGEST_MAX_RETRIES):
+        self.db_getter = db_getter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.max_retries = max_retries
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._batch_ready = asyncio.Event()
+        # 1 while the flusher holds a batch's first document and waits for the rest
+        self._held = 0
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.flushes = 0
+        self.flushed_documents = 0
+        self.failed_documents = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, doc: dict):
+        if self._closing:
+            raise IngestQueueFull("Ingestion is shutting down")
+        try:
+            await asyncio.wait_for(self._queue.put(doc), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise IngestQueueFull(f"Ingestion queue full ({self._queue.maxsize} documents)")
+        if self._queue.qsize() + self._held >= self.batch_size:
+            self._batch_ready.set()
+
+    async def drain(self):
+        """Stop accepting submissions, flush everything queued and stop the flusher"""
+        self._closing = True
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            self._held = 1
+            # Wait for a full batch or the flush interval, whichever comes first
+            if self._queue.qsize() + 1 < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._held = 0
+            await self._flush(batch)
+
+        # Draining: write out anything still queued behind the stop marker
+        leftover = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            await self._flush(leftover[start:start + self.batch_size])
+
+    async def _flush(self, batch):
+        db = self.db_getter()
+        started = time.perf_counter()
+
+        stamp_ingested(batch)
+        pending = batch
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await db.user_data.insert_many(pending, ordered=False)
+                pending = []
+                break
+            except Exception:
+                logger.exception("user_data flush of %d documents failed (attempt %d)", len(pending), attempt)
+                # Documents that made it in before the error are not retried
+                pending = await self._unwritten(db, pending)
+                if not pending or attempt == self.max_retries:
+                    break
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+        failed_ids = {doc["_id"] for doc in pending}
+        written = [doc for doc in batch if doc["_id"] not in failed_ids]
+        self.failed_documents += len(pending)
+
+        rollup_ops = {}
+        for doc in written:
+            for collection, query, update in rollups.rollup_updates(doc):
+                rollup_ops.setdefault(collection, []).append(UpdateOne(query, update, upsert=True))
+        try:
+            for collection, ops in rollup_ops.items():
+                await db[collection].bulk_write(ops, ordered=False)
+        except Exception:
+            # Raw data is safe; `python -m backend.app.rollups` rebuilds the buckets
+            logger.exception("Rollup update for %d documents failed", len(written))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.flushed_documents += len(written)
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _unwritten(self, db, batch):
+        ids = [doc["_id"] for doc in batch]
+        try:
+            found = await db.user_data.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(length=None)
+        except Exception:
+            return batch
+        written = {doc["_id"] for doc in found}
+        return [doc for doc in batch if doc["_id"] not in written]
+
+    def stats(self) -> dict:
+        return {
+            "mode": "buffered",
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "flushes": self.flushes,
+            "flushed_documents": self.flushed_documents,
+            "failed_documents": self.failed_documents,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+buffer: Optional[WriteBehindBuffer] = None
+
+
+def start_buffer(db_getter):
+    """Start the write-behind flusher when USER_DATA_WRITE_MODE=buffered (call from the running loop)"""
+    global buffer
+    if USER_DATA_WRITE_MODE == "buffered" and buffer is None:
+        buffer = WriteBehindBuffer(db_getter)
+        buffer.start()
+
+
+async def stop_buffer():
+    global buffer
+    if buffer is not None:
+        await buffer.drain()
+        buffer = None
+
+
+def stats() -> dict:
+    return buffer.stats() if buffer is not None else {"mode": "direct"}
+
+
+async def persist_document(db, doc: dict):
+    """Write a prepared document directly or hand it to the write-behind buffer"""
+    if buffer is not None:
+        await buffer.submit(doc)
+    else:
+        stamp_ingested([doc])
+        await db.user_data.insert_one(doc)
+        await rollups.record(db, doc)
+
+
+async def persist_in_background(db, doc: dict):
+    """persist_document for use after the response has gone out; failures are only logged"""
+    try:
+        await persist_document(db, doc)
+    except Exception:
+        logger.exception("Background persist of user_data %s failed", doc["_id"])
+
+
+async def persist(db, data: UserDataPoint) -> UserDataResponse:
+    """Store one submission (directly or via the write-behind buffer) and return its response model"""
+    doc = prepare_document(data)
+    await persist_document(db, doc)
+    return response_from_document(doc)
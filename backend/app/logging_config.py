@@ -0,0 +1,225 @@
+"""
+Structured, non-blocking logging for the API.
+
+Handlers only put records on an in-memory queue; a QueueListener thread
+formats and writes them, so request threads never block on stdout.
+
+Settings:
+  LOG_LEVEL                 root level for the "screenaware" loggers (INFO)
+  LOG_FORMAT                json | text (json)
+  LOG_ENDPOINT_LEVELS       per-endpoint overrides, e.g. "predict_report=DEBUG,analytics=WARNING"
+  PREDICTION_TRACE_SAMPLE   emit the verbose prediction trace for 1 in N requests (0 = never)
+  PREDICTION_TRACE_SLOW_MS  always emit it for requests slower than this (0 = off)
+
+Every record carries the request ID set by RequestIdMiddleware (taken from
+an incoming X-Request-ID header or generated).
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "screenaware"
+REQUEST_ID_HEADER = "x-request-id"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_ENDPOINT_LEVELS = os.getenv("LOG_ENDPOINT_LEVELS", "")
+PREDICTION_TRACE_SAMPLE = int(os.getenv("PREDICTION_TRACE_SAMPLE", "0"))
+PREDICTION_TRACE_SLOW_MS = float(os.getenv("PREDICTION_TRACE_SLOW_MS", "0"))
+
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the screenaware namespace, e.g. get_logger("predict_report")"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class RequestIdFilter(logging.Filter):
+    # Runs on the emitting thread, so the request's context is still current
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def parse_endpoint_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(stream=None, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                      endpoint_levels: str = LOG_ENDPOINT_LEVELS):
+    """Route the screenaware loggers through a queue to one writer thread (idempotent)"""
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    root.propagate = False
+
+    for name, endpoint_level in parse_endpoint_levels(endpoint_levels).items():
+        get_logger(name).setLevel(endpoint_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+# -------------------------------
+# Request IDs
+# -------------------------------
+class RequestIdMiddleware:
+    """Pure ASGI middleware binding a request ID to the logging context and echoing it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+# -------------------------------
+# Sampled prediction traces
+# -------------------------------
+class TraceSampler:
+    """Decides which requests get a verbose trace: every Nth one, plus any slower than slow_ms"""
+
+    def __init__(self, sample_every: int = PREDICTION_TRACE_SAMPLE, slow_ms: float = PREDICTION_TRACE_SLOW_MS):
+        self.sample_every = sample_every
+        self.slow_ms = slow_ms
+        self._counter = itertools.count(1)
+
+    def start(self, logger: logging.Logger) -> "Trace":
+        sampled = self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+        if not sampled and not self.slow_ms:
+            return NULL_TRACE
+        if not logger.isEnabledFor(logging.INFO):
+            return NULL_TRACE
+        return Trace(logger, sampled, self.slow_ms)
+
+
+class Trace:
+    """
+    Collects fields for one request and logs them as a single record when
+    finished. A callable field value is only called if the record is logged,
+    so expensive fields cost nothing on requests that are not traced.
+    """
+
+    def __init__(self, logger, sampled: bool, slow_ms: float):
+        self.logger = logger
+        self.sampled = sampled
+        self.slow_ms = slow_ms
+        self.fields = {}
+        self.started = time.perf_counter()
+
+    def add(self, **fields):
+        self.fields.update(fields)
+
+    def finish(self, **fields):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        slow = bool(self.slow_ms) and elapsed_ms >= self.slow_ms
+        if self.sampled or slow:
+            self.fields.update(fields)
+            self.fields = {name: value() if callable(value) else value for name, value in self.fields.items()}
+            self.fields["elapsed_ms"] = round(elapsed_ms, 3)
+            self.fields["trace_reason"] = "slow" if slow else "sampled"
+            self.logger.info("prediction trace", extra={"fields": self.fields})
+
+
+class _NullTrace:
+    def add(self, **fields):
+        pass
+
+    def finish(self, **fields):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+tracer = TraceSampler()
@@ -1,82 +1,189 @@
 import os
-import joblib
-import pandas as pd
 import numpy as np
-from fastapi import FastAPI
-from pydantic import BaseModel
+import asyncio
+import csv
+import hmac
+import io
+import json
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
 from fastapi.middleware.cors import CORSMiddleware  
-import traceback
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .logging_config import RequestIdMiddleware, configure_logging, get_logger, tracer
+from .model_registry import ModelRegistry
+from .database import close_client, get_db
+from .indexes import ensure_indexes
+from . import inference_executor, ingest, metrics, synthetic
+from .models.user_data import UserDataPoint
+from .features import RAW_FEATURES, RAW_INDEX
+from .inference import predict_arrays, report_rows
+from .prediction_cache import create_cache
+
+configure_logging()
+logger = get_logger("main")
+report_logger = get_logger("predict_report")
 
 # -------------------------------
 # Paths
 # -------------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "models")
+# MODEL_FORMAT=compiled serves the NumPy export (see compiled_models.py)
+# from models/compiled instead of unpickling scikit-learn/XGBoost objects
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "pickle")
+MODEL_DIR = os.getenv(
+    "MODEL_DIR",
+    os.path.join(BASE_DIR, "models", "compiled") if MODEL_FORMAT == "compiled" else os.path.join(BASE_DIR, "models")
+)
+# Compiled arrays are memory-mapped read-only, so uvicorn --workers N keeps
+# one copy of the model state in the page cache; MODEL_MMAP=0 reads them
+# into each process instead
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") != "0"
 
-# -------------------------------
-# Mood scaling function (SAME AS TRAINING)
-# -------------------------------
-def map_to_1_5_scale(pred, min_pred, max_pred):
-    if max_pred == min_pred:
-        return 3
-    scaled = 1 + (pred - min_pred) * 4 / (max_pred - min_pred)
-    return int(round(np.clip(scaled, 1, 5)))
+# Upper bound on rows accepted by /predict_report/batch in a single request
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "10000"))
+# Upper bound on its body, enforced while reading (default: 512 bytes per allowed row)
+PREDICT_BATCH_MAX_BYTES = int(os.getenv("PREDICT_BATCH_MAX_BYTES", str(PREDICT_BATCH_MAX_SIZE * 512)))
+# Upper bound on grid points scored by one /predict_what_if request
+WHAT_IF_MAX_GRID = int(os.getenv("WHAT_IF_MAX_GRID", "2500"))
 
 # -------------------------------
 # Load Models & Artifacts
 # -------------------------------
-try:
-    clf_model = joblib.load(os.path.join(MODEL_DIR, "risk_model.pkl"))
-    scaler_clf = joblib.load(os.path.join(MODEL_DIR, "scaler_clf.pkl"))
+# Everything is deserialized once into the registry; handlers take the current
+# bundle by reference. Set MODEL_RELOAD_INTERVAL (seconds) to pick up new
+# .pkl files automatically, or call POST /admin/reload-models (enabled only
+# when ADMIN_TOKEN is set; send it as X-Admin-Token).
+registry = ModelRegistry(
+    MODEL_DIR,
+    check_interval=float(os.getenv("MODEL_RELOAD_INTERVAL", "0")),
+    model_format=MODEL_FORMAT,
+    mmap=MODEL_MMAP
+)
 
-    reg_model = joblib.load(os.path.join(MODEL_DIR, "mood_model.pkl"))
-    scaler_reg = joblib.load(os.path.join(MODEL_DIR, "scaler_reg.pkl"))
+# When the models are loaded:
+#   eager       while importing this module; a missing file stops the worker
+#   background  in a thread started by the lifespan hook, so the worker
+#               accepts connections immediately and /health/ready turns 200
+#               once loading finished
+#   lazy        on the first request that needs them
+MODEL_STARTUP_MODES = ("eager", "background", "lazy")
+MODEL_STARTUP = os.getenv("MODEL_STARTUP", "eager")
+if MODEL_STARTUP not in MODEL_STARTUP_MODES:
+    raise ValueError(f"Unknown MODEL_STARTUP {MODEL_STARTUP!r}, expected one of {MODEL_STARTUP_MODES}")
 
-    cluster_model = joblib.load(os.path.join(MODEL_DIR, "cluster_model.pkl"))
-    scaler_cluster = joblib.load(os.path.join(MODEL_DIR, "scaler_cluster.pkl"))
+def log_loaded(models):
+    logger.info("Loaded models", extra={"fields": {
+        "model_version": models.version,
+        "mood_range": [round(models.mood_min_range, 4), round(models.mood_max_range, 4)],
+    }})
 
-    artifacts = joblib.load(os.path.join(MODEL_DIR, "artifacts.pkl"))
-    clf_features = artifacts["clf_features"]
-    reg_features = artifacts["reg_features"]
-    cluster_features = artifacts["cluster_features"]
-    
-    # Load label encoder
-    le = joblib.load(os.path.join(MODEL_DIR, "label_encoder_clf.pkl"))
-    
-    # 🔥 FIX: Use fallback values if mood ranges don't exist
-    MOOD_MIN_RANGE = artifacts.get("mood_min_range", 1.65)  # From your training output
-    MOOD_MAX_RANGE = artifacts.get("mood_max_range", 9.005) # From your training output
-    
-    print(f"✅ Loaded mood range: {MOOD_MIN_RANGE:.4f} to {MOOD_MAX_RANGE:.4f}")
-    
-except FileNotFoundError as e:
-    print("-" * 50)
-    print(f"FATAL STARTUP ERROR: Failed to load model file: {e}")
-    print("Please ensure the 'models' directory exists and contains all required .pkl files.")
-    print("-" * 50)
-    raise
-except KeyError as e:
-    print("-" * 50)
-    print(f"WARNING: Missing key in artifacts: {e}")
-    print("Using fallback mood range values.")
-    print("Please retrain your models with the updated training script.")
-    print("-" * 50)
-    # Fallback values based on your training output
-    MOOD_MIN_RANGE = 1.65
-    MOOD_MAX_RANGE = 9.005
+def warm_up():
+    """Load the models and run one prediction so the first request doesn't pay for it"""
+    try:
+        models = registry.get()
+        predict_arrays(models, np.ones((1, len(RAW_FEATURES))))
+    except Exception:
+        # Readiness stays false; requests retry the load through registry.get()
+        logger.exception("Background model warm-up failed")
+        return
+    log_loaded(models)
+    # The analytics fallback paths need pandas; import it off the request path
+    import pandas  # noqa: F401
+
+if MODEL_STARTUP == "eager":
+    try:
+        log_loaded(registry.load())
+
+    except FileNotFoundError as e:
+        logger.critical(
+            "Failed to load model file: %s. Please ensure the 'models' directory exists "
+            "and contains all required .pkl files (or the compiled export for MODEL_FORMAT=compiled).", e
+        )
+        raise
+    except KeyError as e:
+        logger.critical("Missing key in artifacts: %s. Please retrain your models with the updated training script.", e)
+        raise
+else:
+    logger.info("Deferring model load", extra={"fields": {"model_startup": MODEL_STARTUP}})
+
+# Identical inputs scored by the same model version are served from here
+# (see prediction_cache.py for PREDICTION_CACHE_* settings)
+prediction_cache = create_cache()
+
+metrics.registry.callback(
+    "prediction_cache_lookups_total", "counter", "Prediction cache lookups by result",
+    lambda: {("hit",): prediction_cache.hits, ("miss",): prediction_cache.misses}, ("result",)
+)
+metrics.registry.callback(
+    "prediction_cache_entries", "gauge", "Entries in the prediction cache",
+    lambda: prediction_cache.stats()["size"]
+)
+metrics.registry.callback(
+    "ingest_queue_depth", "gauge", "Documents waiting in the write-behind buffer",
+    lambda: ingest.stats().get("queue_depth", 0)
+)
+metrics.registry.callback(
+    "inference_queue_depth", "gauge", "Requests waiting for an inference batch",
+    lambda: inference_executor.stats().get("queue_depth", 0)
+)
+metrics.registry.callback(
+    "inference_rejected_total", "counter", "Inference requests refused by the executor",
+    lambda: {("overloaded",): inference_executor.stats().get("rejected", 0),
+             ("timeout",): inference_executor.stats().get("timeouts", 0)}, ("reason",)
+)
+metrics.registry.callback(
+    "model_info", "gauge", "Currently served model version",
+    lambda: {(models.version,): 1} if (models := registry.current()) else {}, ("version",)
+)
 
 # -------------------------------
 # FastAPI Setup
 # -------------------------------
+# Set MONGO_ENSURE_INDEXES=0 to skip index provisioning (e.g. read-only users)
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "1") != "0"
+
+async def provision_indexes():
+    if not MONGO_ENSURE_INDEXES:
+        return
+    try:
+        await ensure_indexes(get_db())
+    except Exception as e:
+        # The API still serves predictions without MongoDB
+        logger.warning("Could not ensure MongoDB indexes: %s", e)
+
+@asynccontextmanager
+async def lifespan(app):
+    await provision_indexes()
+    ingest.start_buffer(get_db)
+    # Bounded, micro-batching inference pool (INFERENCE_EXECUTOR, see inference_executor.py)
+    inference_executor.start_executor(registry)
+    warmup = None
+    if MODEL_STARTUP == "background":
+        warmup = asyncio.ensure_future(run_in_threadpool(warm_up))
+    yield
+    if warmup is not None and not warmup.done():
+        # The load itself can't be interrupted; don't block shutdown on it
+        warmup.cancel()
+    await run_in_threadpool(inference_executor.stop_executor)
+    # Drain buffered user_data writes before the client goes away
+    await ingest.stop_buffer()
+    close_client()
+
 app = FastAPI(
     title="Digital Wellness ML API",
     description="API for predicting risk level, mood rating, and addiction clusters",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
-# Include analytics router
-from .routers import analytics
+# Include analytics, cohort and export routers
+from .routers import analytics, cohorts, export
 app.include_router(analytics.router, prefix="/api", tags=["analytics"])
+app.include_router(cohorts.router, prefix="/api", tags=["cohorts"])
+app.include_router(export.router, prefix="/api", tags=["export"])
 
 app.add_middleware(
     CORSMiddleware,
@@ -84,7 +191,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Next-Cursor", "Link"],
 )
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(inference_executor.InferenceOverloaded)
+async def inference_overloaded(request: Request, exc: inference_executor.InferenceOverloaded):
+    # Shed load early; the client should back off and retry
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(inference_executor.InferenceTimeout)
+async def inference_timeout(request: Request, exc: inference_executor.InferenceTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(inference_executor.ModelVersionMismatch)
+async def model_version_mismatch(request: Request, exc: inference_executor.ModelVersionMismatch):
+    # Usually a reload racing the workers; retrying shortly gets a consistent version
+    return JSONResponse(status_code=503, content={"detail": "Models are being reloaded"}, headers={"Retry-After": "1"})
 
 @app.get("/")
 def read_root():
@@ -92,7 +216,50 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "mood_range": f"{MOOD_MIN_RANGE:.4f} to {MOOD_MAX_RANGE:.4f}"}
+    """Liveness: answers as soon as the worker serves HTTP, whether or not models are loaded"""
+    models = registry.current()
+    health = {
+        "status": "healthy",
+        "ready": models is not None,
+        "model_startup": MODEL_STARTUP,
+    }
+    if models is not None:
+        health["mood_range"] = f"{models.mood_min_range:.4f} to {models.mood_max_range:.4f}"
+        health["model_version"] = models.version
+    health["ingest"] = ingest.stats()
+    health["inference"] = inference_executor.stats()
+    health["prediction_cache"] = prediction_cache.stats()
+    return health
+
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: 503 until the models are loaded (for load balancer / readinessProbe checks)"""
+    models = registry.current()
+    if models is None:
+        raise HTTPException(status_code=503, detail="Models are still loading")
+    return {"status": "ready", "model_version": models.version}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/reload-models")
+def reload_models(x_admin_token: Optional[str] = Header(default=None)):
+    """Reload every model artifact from disk and swap it in atomically"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        # No token configured: the endpoint doesn't exist
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    previous = registry.get().version
+    try:
+        models = registry.load()
+    except Exception:
+        logger.exception("Model reload failed")
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving {previous}")
+    return {"previous_version": previous, "model_version": models.version}
 
 @app.post("/send-data")
 def send_data(data: dict):
@@ -118,139 +285,271 @@ class UserInput(BaseModel):
 
 @app.post("/predict_report")
 def predict_report(user: UserInput):
-    print(f"\n🔍 PREDICT_REPORT - Received user input:")
-    print(f"   Screen Time: {user.daily_screen_time_hours}h")
-    print(f"   Sleep: {user.sleep_duration_hours}h")
-    print(f"   Stress: {user.stress_level}/10")
-    print(f"   Sleep Quality: {user.sleep_quality}/10")
-    print(f"   Physical Activity: {user.physical_activity_hours_per_week}h/week")
-    
-    df = pd.DataFrame([user.dict()])
-    
-    # Load artifacts
-    artifacts = joblib.load(os.path.join(MODEL_DIR, "artifacts.pkl"))
-    cluster_name_map = artifacts["cluster_name_map"]
-    
-    # Risk Prediction
-    X_risk = scaler_clf.transform(df[clf_features])
-    risk_pred_encoded = clf_model.predict(X_risk)[0]
-    risk_pred_label = le.inverse_transform([risk_pred_encoded])[0]
-    print(f"✅ RISK PREDICTION: Encoded={risk_pred_encoded}, Label='{risk_pred_label}'")
-    
-    # Mood Prediction with PROPER scaling
-    df_mood = df.copy()
-    df_mood["screen_sleep_ratio"] = df_mood["daily_screen_time_hours"] / (df_mood["sleep_duration_hours"] + 1)
-    df_mood["stress_x_sleep"] = df_mood["stress_level"] * df_mood["sleep_quality"]
-    df_mood["activity_balance"] = df_mood["physical_activity_hours_per_week"] / (df_mood["daily_screen_time_hours"] + 1)
-    
-    X_mood = scaler_reg.transform(df_mood[reg_features])
-    mood_pred_raw = reg_model.predict(X_mood)[0]
-    
-    # Use the mood range values
-    mood_mapped = map_to_1_5_scale(mood_pred_raw, MOOD_MIN_RANGE, MOOD_MAX_RANGE)
-    
-    print(f"🎯 MOOD PREDICTION:")
-    print(f"   Raw Prediction: {mood_pred_raw:.4f}")
-    print(f"   Mapped to 1-5 Scale: {mood_mapped}")
-    
-    # Cluster Prediction
-    X_cluster = scaler_cluster.transform(df[cluster_features])
-    cluster_pred = cluster_model.predict(X_cluster)[0]
-    cluster_name = cluster_name_map.get(cluster_pred, "Unknown")
-    print(f"📊 CLUSTER PREDICTION: ID={cluster_pred}, Name='{cluster_name}'")
-    
-    # Determine dominant category
-    screen_categories = {
-        "social_media_hours": "Social Media",
-        "gaming_hours": "Gaming", 
-        "entertainment_hours": "Entertainment",
-        "work_related_hours": "Work"
-    }
-    dominant_category = max(screen_categories.keys(), 
-                           key=lambda x: user.dict()[x])
-    
-    print(f"📦 FINAL RESPONSE:")
-    print(f"   Risk Level: {risk_pred_label}")
-    print(f"   Mood Rating: {mood_mapped}/5")
-    print(f"   Cluster Label: {cluster_name}")
-    print(f"   Dominant Category: {screen_categories[dominant_category]}")
-    print("-" * 50)
-    
-    return {
-        "risk_level": risk_pred_label,
-        "mood_rating": mood_mapped,
-        "cluster_label": cluster_name,
-        "dominant_category": screen_categories[dominant_category]
-    }
+    # Verbose trace only for sampled or slow requests (PREDICTION_TRACE_SAMPLE / _SLOW_MS)
+    trace = tracer.start(report_logger)
+    # user.dict is only called if the trace is logged
+    trace.add(input=user.dict, cache="hit")
+    models = registry.get()
+    report = prediction_cache.get_or_compute(
+        "report", user, models.version, lambda: score_report(models, user, trace)
+    )
+    trace.finish(model_version=models.version, response=report)
+    return report
+
+def score_report(models, user: UserInput, trace=None) -> dict:
+    # One feature plan feeds risk, mood and cluster
+    results = inference_executor.predict(models, models.plan.raw_matrix([user]))
+    report = report_rows(results)[0]
+    if trace is not None:
+        trace.add(
+            risk_encoded=int(results["risk_encoded"][0]),
+            mood_raw=round(float(results["mood_raw"][0]), 4),
+            cluster_id=int(results["cluster_id"][0]),
+            cache="miss"
+        )
+    return report
 
 @app.post("/predict_risk")
 def predict_risk(user: UserInput):
-    df = pd.DataFrame([user.dict()])
-    X = scaler_clf.transform(df[clf_features])
-    pred_encoded = clf_model.predict(X)[0]
-    pred_label = le.inverse_transform([pred_encoded])[0]
-    return {"risk_level": pred_label}
+    models = registry.get()
+
+    def compute():
+        results = inference_executor.predict(models, models.plan.raw_matrix([user]), targets=("risk",))
+        return {"risk_level": str(results["risk_level"][0])}
+
+    return prediction_cache.get_or_compute("risk", user, models.version, compute)
 
 @app.post("/predict_mood")
 def predict_mood(user: UserInput):
-    df = pd.DataFrame([user.dict()])
+    models = registry.get()
 
-    # feature engineering
-    df["screen_sleep_ratio"] = df["daily_screen_time_hours"] / (df["sleep_duration_hours"] + 1)
-    df["stress_x_sleep"] = df["stress_level"] * df["sleep_quality"]
-    df["activity_balance"] = df["physical_activity_hours_per_week"] / (df["daily_screen_time_hours"] + 1)
+    def compute():
+        results = inference_executor.predict(models, models.plan.raw_matrix([user]), targets=("mood",))
+        return {"mood_rating": int(results["mood_rating"][0])}
 
-    X = scaler_reg.transform(df[reg_features])
-    pred_raw = reg_model.predict(X)[0]
-    
-    mood_mapped = map_to_1_5_scale(pred_raw, MOOD_MIN_RANGE, MOOD_MAX_RANGE)
-    
-    return {"mood_rating": mood_mapped}
+    return prediction_cache.get_or_compute("mood", user, models.version, compute)
 
 @app.post("/predict_cluster")
 def predict_cluster(user: UserInput):
-    df = pd.DataFrame([user.dict()])
-    X = scaler_cluster.transform(df[cluster_features])
-    cluster_pred = cluster_model.predict(X)[0]
-    
-    artifacts = joblib.load(os.path.join(MODEL_DIR, "artifacts.pkl"))
-    cluster_name_map = artifacts["cluster_name_map"]
-    cluster_name = cluster_name_map.get(cluster_pred, "Unknown")
-    
-    return {"cluster_label": cluster_name}
+    models = registry.get()
+
+    def compute():
+        results = inference_executor.predict(models, models.plan.raw_matrix([user]), targets=("cluster",))
+        return {"cluster_label": results["cluster_label"][0]}
+
+    return prediction_cache.get_or_compute("cluster", user, models.version, compute)
+
+# -------------------------------
+# Batch Scoring
+# -------------------------------
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_CONTENT_TYPES = {"text/csv", "application/csv"}
+
+def parse_batch_body(body: bytes, content_type: str) -> List[dict]:
+    """Decode a batch request body (JSON array, NDJSON or CSV) into raw rows"""
+    text = body.decode("utf-8-sig")
+    if content_type in NDJSON_CONTENT_TYPES:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if content_type in CSV_CONTENT_TYPES:
+        return list(csv.DictReader(io.StringIO(text)))
+    rows = json.loads(text)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of inputs")
+    return rows
+
+def score_report_batch(users: List[UserInput]) -> List[dict]:
+    """Score many inputs with one transform/predict call per model, preserving order"""
+    models = registry.get()
+    return report_rows(inference_executor.predict(models, models.plan.raw_matrix(users)))
+
+def parse_and_score_batch(body: bytes, content_type: str) -> dict:
+    """Decode, validate and score a batch body; runs in the threadpool, off the event loop"""
+    try:
+        rows = parse_batch_body(body, content_type)
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse batch body: {e}")
+
+    if not rows:
+        return {"count": 0, "results": []}
+    if len(rows) > PREDICT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(rows)} rows exceeds the limit of {PREDICT_BATCH_MAX_SIZE}"
+        )
+
+    users = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise HTTPException(status_code=422, detail={"index": index, "error": "Row must be an object"})
+        try:
+            users.append(UserInput(**row))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail={"index": index, "error": str(e)})
+
+    results = score_report_batch(users)
+    return {"count": len(results), "results": results}
+
+@app.post("/predict_report/batch")
+async def predict_report_batch(request: Request):
+    """Score a JSON array, NDJSON or CSV body of UserInput rows in one pass"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await read_limited_body(request, PREDICT_BATCH_MAX_BYTES)
+    return await run_in_threadpool(parse_and_score_batch, body, content_type)
+
+async def read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """The request body, or 413 as soon as Content-Length or the bytes read exceed max_bytes"""
+    too_large = HTTPException(status_code=413, detail=f"Batch body exceeds the limit of {max_bytes} bytes")
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise too_large
+    chunks, received = [], 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+# -------------------------------
+# What-if Sensitivity
+# -------------------------------
+
+# Screen-time categories; with shift_screen_time their changes also move the daily total
+CATEGORY_FIELDS = ("social_media_hours", "gaming_hours", "entertainment_hours", "work_related_hours")
+
+class WhatIfAxis(BaseModel):
+    field: Literal[tuple(RAW_FEATURES)]
+    start: float
+    stop: float
+    steps: int = Field(5, ge=1)
+    relative: bool = Field(False, description="start/stop are offsets from the base value")
+
+class WhatIfInput(BaseModel):
+    base: UserInput
+    axes: List[WhatIfAxis] = Field(..., min_length=1, max_length=2)
+    shift_screen_time: bool = Field(
+        True, description="Apply changes to the category hours to daily_screen_time_hours as well"
+    )
+
+def what_if_grid(models, request: WhatIfInput):
+    """(axis values, (n, 9) raw matrix) for every combination of axis values, base row last"""
+    base = models.plan.raw_matrix([request.base])[0]
+    values = []
+    for axis in request.axes:
+        points = np.linspace(axis.start, axis.stop, axis.steps)
+        if axis.relative:
+            points = points + base[RAW_INDEX[axis.field]]
+        # Hours and 1-10 ratings are never negative
+        values.append(np.round(np.maximum(points, 0), 6))
+
+    mesh = np.meshgrid(*values, indexing="ij")
+    raw = np.tile(base, (mesh[0].size + 1, 1))
+    for axis, column in zip(request.axes, mesh):
+        index = RAW_INDEX[axis.field]
+        raw[:-1, index] = column.ravel()
+        if request.shift_screen_time and axis.field in CATEGORY_FIELDS:
+            raw[:-1, RAW_INDEX["daily_screen_time_hours"]] += column.ravel() - base[index]
+    raw[:, RAW_INDEX["daily_screen_time_hours"]] = np.maximum(raw[:, RAW_INDEX["daily_screen_time_hours"]], 0)
+    return values, raw
+
+@app.post("/predict_what_if")
+def predict_what_if(request: WhatIfInput):
+    """
+    Score a grid over one or two input fields around a base input in one
+    vectorized pass per model and return the risk/mood/cluster surfaces
+    """
+    fields = [axis.field for axis in request.axes]
+    if len(set(fields)) != len(fields):
+        raise HTTPException(status_code=422, detail="Each field can only be varied by one axis")
+    if "daily_screen_time_hours" in fields and request.shift_screen_time and set(fields) & set(CATEGORY_FIELDS):
+        raise HTTPException(
+            status_code=422,
+            detail="daily_screen_time_hours can't be an axis together with a category while shift_screen_time is on"
+        )
+    size = int(np.prod([axis.steps for axis in request.axes]))
+    if size > WHAT_IF_MAX_GRID:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Grid of {size} points exceeds the limit of {WHAT_IF_MAX_GRID}"
+        )
+
+    models = registry.get()
+    values, raw = what_if_grid(models, request)
+    results = inference_executor.predict(models, raw)
+    shape = [len(v) for v in values]
+
+    def surface(array):
+        return np.asarray(array[:-1]).reshape(shape).tolist()
+
+    return {
+        "model_version": models.version,
+        "base": report_rows({key: value[-1:] for key, value in results.items()})[0],
+        "axes": [{"field": field, "values": v.tolist()} for field, v in zip(fields, values)],
+        "shape": shape,
+        "risk_level": surface(results["risk_level"].astype(str)),
+        "mood_rating": surface(results["mood_rating"]),
+        "mood_score": surface(np.round(np.asarray(results["mood_raw"], dtype=np.float64), 4)),
+        "cluster_label": surface(results["cluster_label"]),
+    }
+
+# -------------------------------
+# Predict + Store
+# -------------------------------
+
+class PredictAndStoreInput(UserInput):
+    user_id: str
+
+@app.post("/predict_and_store")
+async def predict_and_store(
+    payload: PredictAndStoreInput,
+    background_tasks: BackgroundTasks,
+    persist: str = Query("sync", pattern="^(sync|background)$"),
+    db=Depends(get_db)
+):
+    """
+    Run the predict_report pipeline and store the resulting UserDataPoint in one call.
+
+    persist=background writes to MongoDB after the response has been sent.
+    """
+    models = registry.get()
+    report = await run_in_threadpool(
+        prediction_cache.get_or_compute, "report", payload, models.version, lambda: score_report(models, payload)
+    )
+    data = UserDataPoint(
+        **payload.dict(),
+        risk_level=report["risk_level"],
+        mood_rating=report["mood_rating"],
+        cluster_label=report["cluster_label"]
+    )
+
+    doc = ingest.prepare_document(data)
+    try:
+        if persist == "background":
+            background_tasks.add_task(ingest.persist_in_background, db, doc)
+        else:
+            await ingest.persist_document(db, doc)
+    except ingest.IngestQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.exception("predict_and_store failed to persist")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"prediction": report, "stored": ingest.response_from_document(doc)}
 
 # -------------------------------
 # Analytics Endpoints
 # -------------------------------
 
-from datetime import datetime, timedelta
-import random
+from datetime import date
 
 def generate_mock_data(days=30):
-    """Generate mock analytics data for demo purposes"""
-    today = datetime.now()
-    data = []
-    
-    base_screen_time = 6.0  # Base daily screen time
-    base_mood = 3.5        # Base mood rating
-    
-    for i in range(days):
-        date = today - timedelta(days=i)
-        # Add some random variation
-        screen_time = max(0, base_screen_time + random.uniform(-2, 2))
-        mood = max(1, min(5, base_mood + random.uniform(-1, 1)))
-        
-        data.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "screen_time": round(screen_time, 1),
-            "mood_rating": round(mood, 1),
-            "social_media": round(screen_time * random.uniform(0.2, 0.4), 1),
-            "gaming": round(screen_time * random.uniform(0.1, 0.3), 1),
-            "entertainment": round(screen_time * random.uniform(0.2, 0.4), 1),
-            "work": round(screen_time * random.uniform(0.2, 0.4), 1)
-        })
-    
-    return sorted(data, key=lambda x: x["date"])
+    """
+    Demo analytics data: one synthetic user's last `days` days (see
+    synthetic.py), seeded with MOCK_DATA_SEED and cached for the day, so
+    every call returns the same data
+    """
+    return synthetic.mock_daily_data(days, date.today())
 
 @app.get("/analytics/overview")
 def get_analytics_overview():
@@ -0,0 +1,245 @@
+"""
+In-process metrics served as Prometheus text on GET /metrics.
+
+Histograms are fixed-bucket counters behind a lock, so an observation is
+one perf_counter() pair plus a bisect - cheap enough to leave on for every
+request and pipeline stage. Values are per worker process; scrape each
+worker (or run a single worker) when running several.
+
+    http_request_duration_seconds{endpoint,method,status}
+    pipeline_stage_seconds{stage}        feature plan, predict and decode steps
+    analytics_stage_seconds{stage}       fetch / aggregate / DataFrame / groupby
+    db_command_seconds{command,outcome}  every MongoDB round-trip (pymongo monitoring)
+    model_load_seconds                   each full artifact load
+    inference_queue_seconds              wait before a request joins an inference batch
+    inference_batch_rows                 rows scored per micro-batch
+plus gauges/counters registered as callbacks (prediction cache, ingest queue).
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Tuple
+
+from pymongo import monitoring
+
+PREFIX = "screenaware_"
+
+# Seconds; covers sub-millisecond pipeline stages up to slow analytics requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+LOAD_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple, _HistogramChild] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = _HistogramChild(self.buckets)
+
+    def labels(self, *values) -> _HistogramChild:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, _HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._children[()])
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class CallbackMetric:
+    """Gauge or counter whose value(s) are read from a callback at scrape time"""
+
+    def __init__(self, name: str, kind: str, documentation: str, callback: Callable, labelnames: Iterable[str] = ()):
+        self.name = PREFIX + name
+        self.kind = kind
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            if value is not None:
+                yield f"{self.name}{_format_labels(self.labelnames, key)} {float(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def callback(self, name: str, kind: str, documentation: str, callback: Callable, labelnames=()) -> CallbackMetric:
+        return self.register(CallbackMetric(name, kind, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # A failing callback must not break the whole scrape
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint", ("endpoint", "method", "status")
+)
+PIPELINE_STAGE_SECONDS = registry.histogram(
+    "pipeline_stage_seconds", "Time spent in each prediction pipeline stage", ("stage",)
+)
+ANALYTICS_STAGE_SECONDS = registry.histogram(
+    "analytics_stage_seconds", "Time spent in each analytics stage", ("stage",)
+)
+DB_COMMAND_SECONDS = registry.histogram(
+    "db_command_seconds", "MongoDB command round-trip latency", ("command", "outcome")
+)
+MODEL_LOAD_SECONDS = registry.histogram(
+    "model_load_seconds", "Time to load the full set of model artifacts", buckets=LOAD_BUCKETS
+)
+INFERENCE_QUEUE_SECONDS = registry.histogram(
+    "inference_queue_seconds", "Time a request waited in the inference queue before being batched"
+)
+INFERENCE_BATCH_ROWS = registry.histogram(
+    "inference_batch_rows", "Rows scored per inference micro-batch", buckets=BATCH_ROW_BUCKETS
+)
+
+
+def stage(name: str) -> _Timer:
+    """Context manager timing one prediction pipeline stage"""
+    return PIPELINE_STAGE_SECONDS.labels(name).time()
+
+
+def analytics_stage(name: str) -> _Timer:
+    return ANALYTICS_STAGE_SECONDS.labels(name).time()
+
+
+# -------------------------------
+# HTTP and MongoDB instrumentation
+# -------------------------------
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency labelled by the matched endpoint function"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched endpoint in the (shared) scope;
+            # using its name keeps path parameters like user IDs out of the labels
+            endpoint = scope.get("endpoint")
+            name = getattr(endpoint, "__name__", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(name, scope["method"], status["code"]).observe(
+                time.perf_counter() - started
+            )
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding db_command_seconds; pass via event_listeners"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        DB_COMMAND_SECONDS.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        DB_COMMAND_SECONDS.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from . import compiled_models
+from .features import FeaturePlan
+from .logging_config import get_logger
+from .metrics import MODEL_LOAD_SECONDS
+
+logger = get_logger("model_registry")
+
+# -------------------------------
+# Artifact files (relative to the model directory)
+# -------------------------------
+MODEL_FILES = {
+    "clf_model": "risk_model.pkl",
+    "scaler_clf": "scaler_clf.pkl",
+    "reg_model": "mood_model.pkl",
+    "scaler_reg": "scaler_reg.pkl",
+    "cluster_model": "cluster_model.pkl",
+    "scaler_cluster": "scaler_cluster.pkl",
+    "le": "label_encoder_clf.pkl",
+    "artifacts": "artifacts.pkl",
+}
+
+# "pickle" loads MODEL_FILES with joblib; "compiled" loads the array export
+# written by compiled_models.export_bundle (no scikit-learn/XGBoost needed)
+MODEL_FORMATS = ("pickle", "compiled")
+
+# Fallback mood range from the training output, used when artifacts.pkl has none
+DEFAULT_MOOD_MIN_RANGE = 1.65
+DEFAULT_MOOD_MAX_RANGE = 9.005
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """One consistent, fully loaded set of models. Never mutated after load."""
+    clf_model: Any
+    scaler_clf: Any
+    reg_model: Any
+    scaler_reg: Any
+    cluster_model: Any
+    scaler_cluster: Any
+    le: Any
+    artifacts: Dict[str, Any]
+    clf_features: List[str]
+    reg_features: List[str]
+    cluster_features: List[str]
+    cluster_name_map: Dict[int, str]
+    mood_min_range: float
+    mood_max_range: float
+    plan: FeaturePlan
+    version: str
+    loaded_at: float
+    file_stamps: Dict[str, tuple] = field(default_factory=dict)
+
+
+def _model_files(model_dir: str, model_format: str) -> List[str]:
+    if model_format == "compiled":
+        return compiled_models.model_files(model_dir)
+    return list(MODEL_FILES.values())
+
+
+def _file_stamps(model_dir: str, model_format: str = "pickle") -> Dict[str, tuple]:
+    """(mtime_ns, size) per artifact file; raises FileNotFoundError if one is missing"""
+    stamps = {}
+    for filename in _model_files(model_dir, model_format):
+        st = os.stat(os.path.join(model_dir, filename))
+        stamps[filename] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+
+def _version_from_stamps(stamps: Dict[str, tuple]) -> str:
+    digest = hashlib.sha1(repr(sorted(stamps.items())).encode()).hexdigest()
+    return digest[:12]
+
+
+def overlay_model_dir(search_dirs: List[str]) -> str:
+    """
+    Temporary directory linking each MODEL_FILES entry from the first of
+    search_dirs that has it (e.g. ml4 notebook outputs completed from
+    backend/app/models); raises FileNotFoundError if a file is in none of them.
+    """
+    import tempfile
+
+    overlay = tempfile.mkdtemp(prefix="screenaware-models-")
+    for filename in MODEL_FILES.values():
+        for directory in search_dirs:
+            source = os.path.abspath(os.path.join(directory, filename))
+            if os.path.exists(source):
+                os.symlink(source, os.path.join(overlay, filename))
+                break
+        else:
+            raise FileNotFoundError(f"{filename} not found in any of {search_dirs}")
+    return overlay
+
+
+def load_components(model_dir: str, model_format: str = "pickle", mmap: bool = False) -> Dict[str, Any]:
+    """
+    Estimators and artifacts keyed like MODEL_FILES, in the requested on-disk
+    format. mmap=True maps compiled arrays read-only instead of reading them
+    into private memory (ignored for pickles).
+    """
+    if model_format == "compiled":
+        return compiled_models.load_components(model_dir, mmap_mode="r" if mmap else None)
+    if model_format != "pickle":
+        raise ValueError(f"Unknown model format {model_format!r}, expected one of {MODEL_FORMATS}")
+
+    import joblib
+    return {
+        name: joblib.load(os.path.join(model_dir, filename))
+        for name, filename in MODEL_FILES.items()
+    }
+
+
+def load_bundle(model_dir: str, model_format: str = "pickle", mmap: bool = False) -> ModelBundle:
+    """Load every artifact from model_dir into a new ModelBundle"""
+    stamps = _file_stamps(model_dir, model_format)
+    with MODEL_LOAD_SECONDS.time():
+        loaded = load_components(model_dir, model_format, mmap)
+    artifacts = loaded["artifacts"]
+    return ModelBundle(
+        **loaded,
+        clf_features=artifacts["clf_features"],
+        reg_features=artifacts["reg_features"],
+        cluster_features=artifacts["cluster_features"],
+        cluster_name_map=artifacts.get("cluster_name_map", {}),
+        mood_min_range=artifacts.get("mood_min_range", DEFAULT_MOOD_MIN_RANGE),
+        mood_max_range=artifacts.get("mood_max_range", DEFAULT_MOOD_MAX_RANGE),
+        plan=FeaturePlan(
+            artifacts["clf_features"], loaded["scaler_clf"],
+            artifacts["reg_features"], loaded["scaler_reg"],
+            artifacts["cluster_features"], loaded["scaler_cluster"],
+        ),
+        version=_version_from_stamps(stamps),
+        loaded_at=time.time(),
+        file_stamps=stamps,
+    )
+
+
+class ModelRegistry:
+    """
+    Holds the current ModelBundle and swaps it atomically on reload.
+
+    Handlers call get() once per request and keep using that bundle, so a
+    reload never changes models underneath an in-flight request. When
+    check_interval > 0, get() also polls file mtimes at most once per
+    interval and reloads if any artifact changed on disk. With mmap=True a
+    compiled bundle is served straight from the page cache, shared by every
+    worker process mapping the same files.
+    """
+
+    def __init__(self, model_dir: str, check_interval: float = 0.0, model_format: str = "pickle",
+                 mmap: bool = False):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self.model_format = model_format
+        self.mmap = mmap
+        self._bundle: Optional[ModelBundle] = None
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+
+    def load(self) -> ModelBundle:
+        """Load (or reload) all artifacts and publish them as the current bundle"""
+        with self._reload_lock:
+            bundle = load_bundle(self.model_dir, self.model_format, self.mmap)
+            self._bundle = bundle
+            self._last_check = time.monotonic()
+            return bundle
+
+    def get(self) -> ModelBundle:
+        if self._bundle is None:
+            return self._load_once()
+        if self.check_interval > 0 and time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed()
+        return self._bundle
+
+    def _load_once(self) -> ModelBundle:
+        # First use racing a warm-up (or another first request) waits for that
+        # load instead of starting its own
+        with self._reload_lock:
+            if self._bundle is None:
+                self._bundle = load_bundle(self.model_dir, self.model_format, self.mmap)
+                self._last_check = time.monotonic()
+            return self._bundle
+
+    def current(self) -> Optional[ModelBundle]:
+        """The published bundle, or None while nothing has loaded yet (never triggers a load)"""
+        return self._bundle
+
+    def reload_if_changed(self) -> bool:
+        """Reload when any artifact's mtime/size changed. Returns True if a new bundle was published."""
+        # Only one caller polls; everyone else keeps serving the current bundle
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            try:
+                stamps = _file_stamps(self.model_dir, self.model_format)
+            except (FileNotFoundError, ValueError):
+                # Mid-swap on disk; try again on the next poll
+                return False
+            if self._bundle is not None and stamps == self._bundle.file_stamps:
+                return False
+            try:
+                self._bundle = load_bundle(self.model_dir, self.model_format, self.mmap)
+            except Exception as e:
+                # Half-written files etc. - keep serving the previous bundle
+                logger.warning("Model reload failed, keeping version %s: %s", self._bundle.version, e)
+                return False
+            return True
+        finally:
+            self._reload_lock.release()
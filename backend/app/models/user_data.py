@@ -1,18 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from pymongo import MongoClient
 from bson import ObjectId
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# MongoDB connection
-MONGO_URI = os.getenv("MONGODB_URI")
-client = MongoClient(MONGO_URI)
-db = client.screenaware_db
 
 class PyObjectId(ObjectId):
     @classmethod
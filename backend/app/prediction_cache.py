@@ -0,0 +1,171 @@
+"""
+Memoization for the prediction endpoints.
+
+Keys are the endpoint name, the loaded model version and the nine
+UserInput floats in canonical form (optionally snapped to a grid of
+PREDICTION_CACHE_QUANTUM), so a model reload never serves stale results.
+
+Backends:
+  memory  - per-process LRU with TTL (default)
+  redis   - shared across workers via REDIS_URL; "memory://" gives an
+            in-process stand-in with the same interface for tests
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from .features import RAW_FEATURES
+
+PREDICTION_CACHE_BACKEND = os.getenv("PREDICTION_CACHE_BACKEND", "memory")
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))  # 0 disables caching
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))   # seconds, 0 = no expiry
+PREDICTION_CACHE_QUANTUM = float(os.getenv("PREDICTION_CACHE_QUANTUM", "0"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = "screenaware:predict:"
+
+
+def canonical_inputs(user, quantum: float = 0.0) -> str:
+    values = []
+    for name in RAW_FEATURES:
+        value = float(getattr(user, name))
+        if quantum > 0:
+            value = round(value / quantum) * quantum
+        # repr round-trips exactly; +0.0 folds -0.0 into 0.0
+        values.append(repr(round(value, 9) + 0.0))
+    return ",".join(values)
+
+
+class LRUTTLCache:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else 0
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InProcessKV:
+    """Minimal stand-in for the redis-py get/set(ex=...) calls used by RedisCache"""
+
+    def __init__(self):
+        self._cache = LRUTTLCache(max_size=PREDICTION_CACHE_SIZE or 1, ttl=0)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ex=None):
+        self._cache.set(key, value, ttl=ex or 0)
+
+
+class RedisCache:
+    """Shared cache; eviction is left to Redis (maxmemory-policy allkeys-lru) plus the TTL"""
+
+    def __init__(self, client, ttl: float):
+        self.client = client
+        self.ttl = ttl
+        self.evictions = 0
+
+    def get(self, key):
+        raw = self.client.get(REDIS_KEY_PREFIX + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(REDIS_KEY_PREFIX + key, json.dumps(value), ex=int(self.ttl) or None)
+
+
+def create_backend(name: str = PREDICTION_CACHE_BACKEND):
+    if name == "redis":
+        if REDIS_URL.startswith("memory://"):
+            return RedisCache(InProcessKV(), PREDICTION_CACHE_TTL)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("PREDICTION_CACHE_BACKEND=redis needs the redis package (pip install redis)") from e
+        return RedisCache(redis.Redis.from_url(REDIS_URL), PREDICTION_CACHE_TTL)
+    return LRUTTLCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+
+class PredictionCache:
+    def __init__(self, backend, enabled: bool = True, quantum: float = 0.0, backend_name: str = "memory"):
+        self.backend = backend
+        self.enabled = enabled
+        self.quantum = quantum
+        self.backend_name = backend_name
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get_or_compute(self, endpoint: str, user, model_version: str, compute: Callable[[], dict]) -> dict:
+        if not self.enabled:
+            return compute()
+        key = f"{endpoint}:{model_version}:{canonical_inputs(user, self.quantum)}"
+        try:
+            cached = self.backend.get(key)
+        except Exception:
+            # A flaky shared backend must never take predictions down with it
+            self.errors += 1
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = compute()
+        try:
+            self.backend.set(key, result)
+        except Exception:
+            self.errors += 1
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "backend": self.backend_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "evictions": self.backend.evictions,
+        }
+        # The Redis database may hold other keys, so only the in-process LRU reports a size
+        stats["size"] = len(self.backend) if isinstance(self.backend, LRUTTLCache) else None
+        return stats
+
+
+def create_cache() -> PredictionCache:
+    return PredictionCache(
+        create_backend(),
+        enabled=PREDICTION_CACHE_SIZE > 0,
+        quantum=PREDICTION_CACHE_QUANTUM,
+        backend_name=PREDICTION_CACHE_BACKEND,
+    )
@@ -0,0 +1,182 @@
+"""
+Filters, sorts and projections used by the analytics router.
+
+Kept in one place so the router and the explain-plan check in
+indexes.py can't disagree about what the queries look like.
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from .rollups import DAILY_COLLECTION, DAILY_PROJECTION, daily_rollup_query, day_key
+
+# Days of history behind the overview and detailed analytics
+ANALYTICS_WINDOW_DAYS = 30
+
+NEWEST_FIRST = [("timestamp", -1)]
+OLDEST_FIRST = [("timestamp", 1)]
+# Total order for exports: _id breaks timestamp ties so keyset pages never overlap
+EXPORT_ORDER = [("timestamp", 1), ("_id", 1)]
+# Newest daily rollup first (the rollup version in analytics ETags)
+LATEST_UPDATE_FIRST = [("updated_at", -1)]
+
+# Columns the overview aggregates; everything else stays on the server
+OVERVIEW_FIELDS = [
+    "timestamp",
+    "daily_screen_time_hours",
+    "mood_rating",
+    "sleep_duration_hours",
+    "risk_level",
+    "cluster_label",
+    "social_media_hours",
+    "gaming_hours",
+    "entertainment_hours",
+    "work_related_hours",
+]
+
+# Everything UserDataResponse serializes (daily_data, latest)
+RESPONSE_FIELDS = [
+    "_id",
+    "user_id",
+    "timestamp",
+    "daily_screen_time_hours",
+    "sleep_duration_hours",
+    "stress_level",
+    "sleep_quality",
+    "physical_activity_hours_per_week",
+    "social_media_hours",
+    "gaming_hours",
+    "entertainment_hours",
+    "work_related_hours",
+    "risk_level",
+    "mood_rating",
+    "cluster_label",
+]
+
+TREND_FIELDS = ["timestamp", "daily_screen_time_hours"]
+
+# What analytics ETags are derived from (see http_cache.py)
+VALIDATOR_FIELDS = ["_id", "timestamp"]
+
+
+def projection(fields) -> dict:
+    """Inclusion projection for fields; _id is dropped unless listed"""
+    spec = {field: 1 for field in fields}
+    spec.setdefault("_id", 0)
+    return spec
+
+
+def user_window(user_id: str, since: datetime) -> dict:
+    return {"user_id": user_id, "timestamp": {"$gte": since}}
+
+
+def export_filter(user_id: str, start: datetime = None, end: datetime = None,
+                  resume: tuple = None, stop: tuple = None) -> dict:
+    """
+    One user's documents with start <= timestamp < end, in EXPORT_ORDER from
+    the (timestamp, _id) key `resume` (inclusive) up to `stop` (exclusive)
+    """
+    query = {"user_id": user_id}
+    window = {}
+    if start is not None:
+        window["$gte"] = start
+    if end is not None:
+        window["$lt"] = end
+    if window:
+        query["timestamp"] = window
+    keyset = []
+    if resume is not None:
+        timestamp, _id = resume
+        keyset.append({"$or": [{"timestamp": {"$gt": timestamp}}, {"timestamp": timestamp, "_id": {"$gte": _id}}]})
+    if stop is not None:
+        timestamp, _id = stop
+        keyset.append({"$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "_id": {"$lt": _id}}]})
+    if keyset:
+        query["$and"] = keyset
+    return query
+
+
+def changed_rollups_query(since_day: datetime, changed_since: datetime = None) -> dict:
+    """Daily rollups of every user inside the window, optionally only those updated after changed_since"""
+    query = {"day": {"$gte": since_day}}
+    if changed_since is not None:
+        query["updated_at"] = {"$gte": changed_since}
+    return query
+
+
+def overview_pipeline(user_id: str, since: datetime) -> list:
+    """
+    Aggregation that computes the whole analytics overview server-side.
+
+    Ordering mirrors the pandas path: risk levels most frequent first,
+    cluster ties broken by smallest label (Series.mode), trend = the last
+    seven readings.
+    """
+    by_count = {"$sort": {"count": -1, "_id": 1}}
+    return [
+        {"$match": user_window(user_id, since)},
+        {"$facet": {
+            "summary": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "average_screen_time": {"$avg": "$daily_screen_time_hours"},
+                "average_mood": {"$avg": "$mood_rating"},
+                "average_sleep": {"$avg": "$sleep_duration_hours"},
+                "social_media": {"$avg": "$social_media_hours"},
+                "gaming": {"$avg": "$gaming_hours"},
+                "entertainment": {"$avg": "$entertainment_hours"},
+                "work": {"$avg": "$work_related_hours"},
+            }}],
+            "risk_levels": [{"$group": {"_id": "$risk_level", "count": {"$sum": 1}}}, by_count],
+            "clusters": [{"$group": {"_id": "$cluster_label", "count": {"$sum": 1}}}, by_count, {"$limit": 1}],
+            "trend": [
+                {"$sort": dict(NEWEST_FIRST)},
+                {"$limit": 7},
+                {"$project": projection(TREND_FIELDS)},
+            ],
+        }},
+    ]
+
+
+def analytics_window_start(now: datetime = None) -> datetime:
+    """
+    Start of the analytics window: midnight ANALYTICS_WINDOW_DAYS ago, so
+    raw documents and daily rollups cover exactly the same days
+    """
+    return day_key((now or datetime.now()) - timedelta(days=ANALYTICS_WINDOW_DAYS))
+
+
+def router_queries(user_id: str, since: datetime) -> dict:
+    """Every query the analytics router issues, keyed by purpose"""
+    window = user_window(user_id, since)
+    return {
+        "overview": {"collection": "user_data", "filter": window,
+                     "sort": NEWEST_FIRST, "projection": projection(OVERVIEW_FIELDS)},
+        "overview_trend": {"collection": "user_data", "filter": window,
+                           "sort": NEWEST_FIRST, "projection": projection(TREND_FIELDS)},
+        "overview_aggregate": {"collection": "user_data",
+                               "pipeline": overview_pipeline(user_id, since)},
+        "detailed": {"collection": "user_data", "filter": window,
+                     "sort": NEWEST_FIRST, "projection": projection(RESPONSE_FIELDS)},
+        "latest": {"collection": "user_data", "filter": {"user_id": user_id},
+                   "sort": NEWEST_FIRST, "projection": projection(RESPONSE_FIELDS)},
+        "validator_newest": {"collection": "user_data", "filter": {"user_id": user_id},
+                             "sort": NEWEST_FIRST, "projection": projection(VALIDATOR_FIELDS)},
+        "validator_oldest": {"collection": "user_data", "filter": window,
+                             "sort": OLDEST_FIRST, "projection": projection(VALIDATOR_FIELDS)},
+        # count_documents() runs as this pipeline
+        "validator_count": {"collection": "user_data",
+                            "pipeline": [{"$match": window}, {"$group": {"_id": 1, "n": {"$sum": 1}}}]},
+        "export": {"collection": "user_data",
+                   "filter": export_filter(user_id, since, resume=(since, ObjectId("0" * 24))),
+                   "sort": EXPORT_ORDER, "projection": projection(RESPONSE_FIELDS)},
+        "validator_rollups": {"collection": DAILY_COLLECTION, "filter": daily_rollup_query(user_id, since),
+                              "sort": LATEST_UPDATE_FIRST, "projection": projection(["updated_at"])},
+        "daily_rollups": {"collection": DAILY_COLLECTION, "filter": daily_rollup_query(user_id, since),
+                          "sort": [("day", 1)], "projection": DAILY_PROJECTION},
+        # A cohort engine's first refresh reads the whole window; later ones only what changed
+        "cohort_first_refresh": {"collection": DAILY_COLLECTION, "filter": changed_rollups_query(since),
+                                 "sort": None, "projection": None},
+        "cohort_changes": {"collection": DAILY_COLLECTION, "filter": changed_rollups_query(since, since),
+                           "sort": None, "projection": None},
+    }
@@ -0,0 +1,220 @@
+"""
+Incremental per-user rollups of user_data.
+
+store_user_data bumps one daily rollup document per submission ($inc on
+sums, counts and risk/cluster histograms), so the analytics endpoints can
+aggregate a handful of rollup rows instead of refetching and re-aggregating
+30 days of raw documents. Weekly and monthly averages are folded from the
+daily rows of the window, so no coarser rollups are kept.
+
+Existing data is backfilled with:
+
+    python -m backend.app.rollups [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional
+
+DAILY_COLLECTION = "user_daily_rollups"
+
+# Fields the analytics endpoints read back from a daily rollup
+DAILY_PROJECTION = {"_id": 0, "day": 1, "count": 1, "sums": 1, "risk": 1, "cluster": 1}
+
+# Numeric user_data fields whose sums are kept per rollup bucket
+SUM_FIELDS = [
+    "daily_screen_time_hours",
+    "mood_rating",
+    "sleep_duration_hours",
+    "social_media_hours",
+    "gaming_hours",
+    "entertainment_hours",
+    "work_related_hours",
+]
+
+# Averages reported by /analytics/detailed for each week/month
+PERIOD_FIELDS = ["daily_screen_time_hours", "mood_rating", "sleep_duration_hours"]
+
+
+def day_key(timestamp: datetime) -> datetime:
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+def _label_key(label) -> str:
+    # Mongo field names can't contain '.' or start with '$'
+    return str(label).replace(".", "_").lstrip("$")
+
+
+def rollup_increment(doc: dict) -> dict:
+    """$inc document adding one user_data record to a rollup bucket"""
+    inc = {"count": 1}
+    for field in SUM_FIELDS:
+        inc[f"sums.{field}"] = float(doc[field])
+    inc[f"risk.{_label_key(doc['risk_level'])}"] = 1
+    inc[f"cluster.{_label_key(doc['cluster_label'])}"] = 1
+    return inc
+
+
+def rollup_updates(doc: dict):
+    """(collection, filter, update) triples that fold one user_data record into its rollups"""
+    inc = rollup_increment(doc)
+    update = {"$inc": inc, "$set": {"updated_at": datetime.now()}}
+    return [
+        (DAILY_COLLECTION, {"user_id": doc["user_id"], "day": day_key(doc["timestamp"])}, update),
+    ]
+
+
+async def record(db, doc: dict):
+    """Fold a freshly stored user_data document into its daily rollup"""
+    for collection, query, update in rollup_updates(doc):
+        await db[collection].update_one(query, update, upsert=True)
+
+
+def daily_rollup_query(user_id: str, since: datetime) -> dict:
+    return {"user_id": user_id, "day": {"$gte": day_key(since)}}
+
+
+async def fetch_daily(db, user_id: str, since: datetime) -> List[dict]:
+    cursor = db[DAILY_COLLECTION].find(
+        daily_rollup_query(user_id, since), DAILY_PROJECTION
+    ).sort("day", 1)
+    return await cursor.to_list(length=None)
+
+
+# -------------------------------
+# Folding rollup rows back into analytics payloads
+# -------------------------------
+def _merge(rows: List[dict]) -> dict:
+    total = {"count": 0, "sums": defaultdict(float), "risk": defaultdict(int), "cluster": defaultdict(int)}
+    for row in rows:
+        total["count"] += row.get("count", 0)
+        for key in ("sums", "risk", "cluster"):
+            for name, value in row.get(key, {}).items():
+                total[key][name] += value
+    return total
+
+
+def _mean(total: dict, field: str) -> float:
+    return total["sums"][field] / total["count"] if total["count"] else 0.0
+
+
+def overview_from_rollups(rows: List[dict], screen_time_trend: List[dict]) -> dict:
+    """AnalyticsOverview fields from daily rollups plus the last raw trend points"""
+    total = _merge(rows)
+    clusters = total["cluster"]
+    return {
+        "average_screen_time": _mean(total, "daily_screen_time_hours"),
+        "average_mood": _mean(total, "mood_rating"),
+        "average_sleep": _mean(total, "sleep_duration_hours"),
+        # Most frequent first, like value_counts()
+        "risk_level_distribution": dict(sorted(total["risk"].items(), key=lambda kv: -kv[1])),
+        # Ties resolve to the smallest label, like pandas Series.mode()[0]
+        "most_common_cluster": min(clusters, key=lambda label: (-clusters[label], label)),
+        "screen_time_trend": screen_time_trend,
+        "category_distribution": {
+            "social_media": _mean(total, "social_media_hours"),
+            "gaming": _mean(total, "gaming_hours"),
+            "entertainment": _mean(total, "entertainment_hours"),
+            "work": _mean(total, "work_related_hours"),
+        },
+    }
+
+
+def period_averages(rows: List[dict], key_name: str, key_fn) -> List[dict]:
+    """Weighted per-period means of PERIOD_FIELDS, keyed and sorted like the pandas groupby"""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[key_fn(row["day"])].append(row)
+    averages = []
+    for key in sorted(groups):
+        total = _merge(groups[key])
+        averages.append({key_name: key, **{field: _mean(total, field) for field in PERIOD_FIELDS}})
+    return averages
+
+
+def weekly_averages(rows: List[dict]) -> List[dict]:
+    return period_averages(rows, "week", lambda day: day.isocalendar()[1])
+
+
+def monthly_averages(rows: List[dict]) -> List[dict]:
+    return period_averages(rows, "month", lambda day: day.month)
+
+
+# -------------------------------
+# Backfill
+# -------------------------------
+def _accumulate(buckets: dict, key, doc: dict):
+    bucket = buckets.setdefault(key, {"count": 0, "sums": defaultdict(float),
+                                      "risk": defaultdict(int), "cluster": defaultdict(int)})
+    bucket["count"] += 1
+    for field in SUM_FIELDS:
+        bucket["sums"][field] += float(doc[field])
+    bucket["risk"][_label_key(doc["risk_level"])] += 1
+    bucket["cluster"][_label_key(doc["cluster_label"])] += 1
+
+
+async def _write_user_rollups(db, user_id: str, daily: dict):
+    from pymongo import ReplaceOne
+
+    now = datetime.now()
+
+    def doc(query, bucket):
+        return {**query, "count": bucket["count"], "sums": dict(bucket["sums"]),
+                "risk": dict(bucket["risk"]), "cluster": dict(bucket["cluster"]), "updated_at": now}
+
+    daily_ops = []
+    for day, bucket in daily.items():
+        query = {"user_id": user_id, "day": day}
+        daily_ops.append(ReplaceOne(query, doc(query, bucket), upsert=True))
+    if daily_ops:
+        await db[DAILY_COLLECTION].bulk_write(daily_ops, ordered=False)
+
+
+async def backfill(db, user_id: Optional[str] = None, batch_size: int = 1000) -> int:
+    """
+    Rebuild rollups from raw user_data, one user at a time.
+
+    Buckets are recomputed from scratch and written with upserting
+    replaces, so the backfill is idempotent. Run it before relying on
+    rollups, or while writes are paused, since a concurrent $inc on a
+    bucket being replaced can be lost.
+    """
+    query = {"user_id": user_id} if user_id else {}
+    cursor = db.user_data.find(query).sort([("user_id", 1), ("timestamp", 1)]).batch_size(batch_size)
+
+    processed = 0
+    current_user, daily = None, {}
+    async for doc in cursor:
+        if doc["user_id"] != current_user:
+            if current_user is not None:
+                await _write_user_rollups(db, current_user, daily)
+            current_user, daily = doc["user_id"], {}
+        _accumulate(daily, day_key(doc["timestamp"]), doc)
+        processed += 1
+    if current_user is not None:
+        await _write_user_rollups(db, current_user, daily)
+    return processed
+
+
+async def _run_backfill(user_id: Optional[str], batch_size: int) -> int:
+    from .database import close_client, get_db
+
+    try:
+        return await backfill(get_db(), user_id, batch_size)
+    finally:
+        close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill user_data rollups")
+    parser.add_argument("--user-id", help="Only rebuild rollups for this user")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    processed = asyncio.run(_run_backfill(args.user_id, args.batch_size))
+    print(f"✅ Rebuilt rollups from {processed} user_data documents")
+
+
+if __name__ == "__main__":
+    main()
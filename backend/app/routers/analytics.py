@@ -1,131 +1,238 @@
-from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
-from typing import List
-import pandas as pd
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
+from typing import TYPE_CHECKING, List
 from ..models.user_data import (
     UserDataPoint,
     UserDataResponse,
     AnalyticsOverview,
-    DetailedAnalytics,
-    db
+    DetailedAnalytics
 )
+from ..database import get_db
+from .. import http_cache, ingest, queries, rollups
+from ..logging_config import get_logger
+from ..metrics import analytics_stage
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 router = APIRouter()
+logger = get_logger("analytics")
+
+# "rollups" answers analytics from the pre-aggregated daily rollups (falling
+# back to raw documents for users that have none yet); "raw" always
+# recomputes from user_data with pandas.
+ANALYTICS_SOURCE = os.getenv("ANALYTICS_SOURCE", "rollups")
+
+# How the overview summarizes raw user_data: "aggregate" runs a MongoDB
+# pipeline so only the summary crosses the wire; "pandas" fetches the
+# documents and computes it in-process.
+OVERVIEW_ENGINE = os.getenv("ANALYTICS_OVERVIEW_ENGINE", "aggregate")
+
+async def fetch_raw_window(db, user_id: str, since: datetime, fields: List[str]) -> List[dict]:
+    cursor = db.user_data.find(
+        queries.user_window(user_id, since),
+        queries.projection(fields)
+    ).sort(queries.NEWEST_FIRST)
+    
+    with analytics_stage("fetch_raw"):
+        data = await cursor.to_list(length=None)
+    if not data:
+        raise HTTPException(status_code=404, detail="No data found for user")
+    
+    # Convert _id to string for all documents
+    for d in data:
+        if "_id" in d:
+            d["_id"] = str(d["_id"])
+    return data
+
+async def fetch_screen_time_trend(db, user_id: str, since: datetime, points: int = 7) -> List[dict]:
+    """Last `points` raw screen-time readings in the window, oldest first"""
+    cursor = db.user_data.find(
+        queries.user_window(user_id, since),
+        queries.projection(queries.TREND_FIELDS)
+    ).sort(queries.NEWEST_FIRST).limit(points)
+    trend = await cursor.to_list(length=None)
+    return trend[::-1]
+
+def _dataframe(data: List[dict]) -> "pd.DataFrame":
+    # pandas is only needed on the raw/fallback paths; importing it here keeps
+    # it (~0.25 s) out of the API's import time
+    import pandas as pd
+    return pd.DataFrame(data)
+
+async def overview_from_pandas(db, user_id: str, since: datetime) -> dict:
+    """Overview computed in-process from the raw documents (reference implementation)"""
+    data = await fetch_raw_window(db, user_id, since, queries.OVERVIEW_FIELDS)
+    with analytics_stage("dataframe"):
+        df = _dataframe(data)
+
+    # Calculate analytics
+    with analytics_stage("overview_pandas"):
+        overview = _overview_from_frame(df)
+    return overview
+
+def _overview_from_frame(df: "pd.DataFrame") -> dict:
+    return {
+        "average_screen_time": df["daily_screen_time_hours"].mean(),
+        "average_mood": df["mood_rating"].mean(),
+        "average_sleep": df["sleep_duration_hours"].mean(),
+        "risk_level_distribution": df["risk_level"].value_counts().to_dict(),
+        "most_common_cluster": df["cluster_label"].mode()[0],
+        "screen_time_trend": df[["timestamp", "daily_screen_time_hours"]]
+            .sort_values("timestamp")
+            .tail(7)
+            .to_dict("records"),
+        "category_distribution": {
+            "social_media": df["social_media_hours"].mean(),
+            "gaming": df["gaming_hours"].mean(),
+            "entertainment": df["entertainment_hours"].mean(),
+            "work": df["work_related_hours"].mean()
+        }
+    }
+
+async def overview_from_aggregation(db, user_id: str, since: datetime) -> dict:
+    """Overview computed by MongoDB; one summary document comes back"""
+    cursor = db.user_data.aggregate(queries.overview_pipeline(user_id, since))
+    with analytics_stage("overview_aggregate"):
+        results = await cursor.to_list(length=1)
+    # An empty window comes back as empty facets from MongoDB, but as no
+    # document at all or a count-0 summary from mongomock
+    summaries = results[0]["summary"] if results else []
+    if not summaries or not summaries[0]["count"]:
+        raise HTTPException(status_code=404, detail="No data found for user")
+    facets, summary = results[0], summaries[0]
+    return {
+        "average_screen_time": summary["average_screen_time"],
+        "average_mood": summary["average_mood"],
+        "average_sleep": summary["average_sleep"],
+        "risk_level_distribution": {row["_id"]: row["count"] for row in facets["risk_levels"]},
+        "most_common_cluster": facets["clusters"][0]["_id"],
+        "screen_time_trend": facets["trend"][::-1],
+        "category_distribution": {
+            "social_media": summary["social_media"],
+            "gaming": summary["gaming"],
+            "entertainment": summary["entertainment"],
+            "work": summary["work"]
+        }
+    }
 
 @router.post("/user-data", response_model=UserDataResponse)
-async def store_user_data(data: UserDataPoint):
-    import traceback
+async def store_user_data(data: UserDataPoint, db=Depends(get_db)):
     try:
-        user_data = data.dict(by_alias=True)
-        result = db.user_data.insert_one(user_data)
-        stored_data = db.user_data.find_one({"_id": result.inserted_id})
-        if stored_data and "_id" in stored_data:
-            stored_data["_id"] = str(stored_data["_id"])
-        return UserDataResponse(**stored_data)
+        return await ingest.persist(db, data)
+    except ingest.IngestQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print("Error in /api/user-data:")
-        traceback.print_exc()
+        logger.exception("Error in /api/user-data")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analytics/overview/{user_id}", response_model=AnalyticsOverview)
-async def get_user_analytics_overview(user_id: str):
+async def get_user_analytics_overview(user_id: str, request: Request, db=Depends(get_db)):
     try:
-        # Get last 30 days of data
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        cursor = db.user_data.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": thirty_days_ago}
-        }).sort("timestamp", -1)
-        
-        data = list(cursor)
-        if not data:
-            raise HTTPException(status_code=404, detail="No data found for user")
-        
-        # Convert _id to string for all documents
-        for d in data:
-            if "_id" in d:
-                d["_id"] = str(d["_id"])
-        df = pd.DataFrame(data)
-
-        # Calculate analytics
-        overview = {
-            "average_screen_time": df["daily_screen_time_hours"].mean(),
-            "average_mood": df["mood_rating"].mean(),
-            "average_sleep": df["sleep_duration_hours"].mean(),
-            "risk_level_distribution": df["risk_level"].value_counts().to_dict(),
-            "most_common_cluster": df["cluster_label"].mode()[0],
-            "screen_time_trend": df[["timestamp", "daily_screen_time_hours"]]
-                .sort_values("timestamp")
-                .tail(7)
-                .to_dict("records"),
-            "category_distribution": {
-                "social_media": df["social_media_hours"].mean(),
-                "gaming": df["gaming_hours"].mean(),
-                "entertainment": df["entertainment_hours"].mean(),
-                "work": df["work_related_hours"].mean()
-            }
-        }
+        # Last 30 days of data, from midnight: one boundary for every query below
+        thirty_days_ago = queries.analytics_window_start()
+
+        with analytics_stage("validators"):
+            validators = await http_cache.validators(
+                db, user_id, thirty_days_ago, "overview", ANALYTICS_SOURCE, OVERVIEW_ENGINE,
+                with_rollups=ANALYTICS_SOURCE == "rollups"
+            )
+        headers = validators.headers() if validators else None
+        if validators and validators.matches(request):
+            return validators.not_modified()
+
+        if ANALYTICS_SOURCE == "rollups":
+            with analytics_stage("fetch_rollups"):
+                rows = await rollups.fetch_daily(db, user_id, thirty_days_ago)
+            if rows:
+                with analytics_stage("fetch_trend"):
+                    trend = await fetch_screen_time_trend(db, user_id, thirty_days_ago)
+                overview = rollups.overview_from_rollups(rows, trend)
+                with analytics_stage("serialize"):
+                    return http_cache.json_response(AnalyticsOverview, overview, request, headers)
+
+        if OVERVIEW_ENGINE == "pandas":
+            overview = await overview_from_pandas(db, user_id, thirty_days_ago)
+        else:
+            overview = await overview_from_aggregation(db, user_id, thirty_days_ago)
 
-        return AnalyticsOverview(**overview)
+        with analytics_stage("serialize"):
+            return http_cache.json_response(AnalyticsOverview, overview, request, headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def period_averages_from_frame(df: "pd.DataFrame"):
+    """Weekly and monthly averages from raw documents (used when a user has no rollups)"""
+    # Weekly averages
+    df["week"] = df["timestamp"].dt.isocalendar().week
+    weekly_avg = df.groupby("week").agg({
+        "daily_screen_time_hours": "mean",
+        "mood_rating": "mean",
+        "sleep_duration_hours": "mean"
+    }).reset_index().to_dict("records")
+
+    # Monthly averages
+    df["month"] = df["timestamp"].dt.month
+    monthly_avg = df.groupby("month").agg({
+        "daily_screen_time_hours": "mean",
+        "mood_rating": "mean",
+        "sleep_duration_hours": "mean"
+    }).reset_index().to_dict("records")
+    return weekly_avg, monthly_avg
+
 @router.get("/analytics/detailed/{user_id}", response_model=DetailedAnalytics)
-async def get_detailed_analytics(user_id: str):
+async def get_detailed_analytics(user_id: str, request: Request, db=Depends(get_db)):
     try:
-        # Get last 30 days of data
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        cursor = db.user_data.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": thirty_days_ago}
-        }).sort("timestamp", -1)
-        
-        data = list(cursor)
-        if not data:
-            raise HTTPException(status_code=404, detail="No data found for user")
-        
-        # Convert _id to string for all documents
-        for d in data:
-            if "_id" in d:
-                d["_id"] = str(d["_id"])
-        df = pd.DataFrame(data)
-
-        # Daily data
-        daily_data = [UserDataResponse(**d) for d in data]
-
-        # Weekly averages
-        df["week"] = df["timestamp"].dt.isocalendar().week
-        weekly_avg = df.groupby("week").agg({
-            "daily_screen_time_hours": "mean",
-            "mood_rating": "mean",
-            "sleep_duration_hours": "mean"
-        }).reset_index().to_dict("records")
-
-        # Monthly averages
-        df["month"] = df["timestamp"].dt.month
-        monthly_avg = df.groupby("month").agg({
-            "daily_screen_time_hours": "mean",
-            "mood_rating": "mean",
-            "sleep_duration_hours": "mean"
-        }).reset_index().to_dict("records")
-
-        return DetailedAnalytics(
-            daily_data=daily_data,
-            weekly_averages=weekly_avg,
-            monthly_averages=monthly_avg
-        )
+        # Last 30 days of data, from midnight: one boundary for every query below
+        thirty_days_ago = queries.analytics_window_start()
+
+        with analytics_stage("validators"):
+            validators = await http_cache.validators(
+                db, user_id, thirty_days_ago, "detailed", ANALYTICS_SOURCE, with_rollups=ANALYTICS_SOURCE == "rollups"
+            )
+        if validators and validators.matches(request):
+            return validators.not_modified()
+
+        data = await fetch_raw_window(db, user_id, thirty_days_ago, queries.RESPONSE_FIELDS)
+
+        rows = []
+        if ANALYTICS_SOURCE == "rollups":
+            with analytics_stage("fetch_rollups"):
+                rows = await rollups.fetch_daily(db, user_id, thirty_days_ago)
+        if rows:
+            weekly_avg = rollups.weekly_averages(rows)
+            monthly_avg = rollups.monthly_averages(rows)
+        else:
+            with analytics_stage("groupby"):
+                weekly_avg, monthly_avg = period_averages_from_frame(_dataframe(data))
+
+        # Daily data: validated once, together with the averages
+        payload = {"daily_data": data, "weekly_averages": weekly_avg, "monthly_averages": monthly_avg}
+        with analytics_stage("serialize"):
+            return http_cache.json_response(
+                DetailedAnalytics, payload, request, validators.headers() if validators else None
+            )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/user-data/{user_id}/latest", response_model=UserDataResponse)
-async def get_latest_user_data(user_id: str):
+async def get_latest_user_data(user_id: str, db=Depends(get_db)):
     try:
-        data = db.user_data.find_one(
+        data = await db.user_data.find_one(
             {"user_id": user_id},
-            sort=[("timestamp", -1)]
+            queries.projection(queries.RESPONSE_FIELDS),
+            sort=queries.NEWEST_FIRST
         )
         if not data:
             raise HTTPException(status_code=404, detail="No data found for user")
+        data["_id"] = str(data["_id"])
         return UserDataResponse(**data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Population-wide analytics endpoints (see cohorts.py for how they are computed and cached).
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from .. import cohorts
+from ..database import get_db
+
+router = APIRouter()
+
+
+@router.get("/cohorts/screen-time-percentiles")
+async def get_screen_time_percentiles(db=Depends(get_db)):
+    """Percentiles of per-user mean daily screen time, overall and per cluster_label"""
+    await cohorts.engine.ensure_fresh(db)
+    percentiles = await run_in_threadpool(cohorts.engine.screen_time_percentiles)
+    return {"window_days": cohorts.engine.window_days, **percentiles}
+
+
+@router.get("/cohorts/risk-over-time")
+async def get_risk_over_time(period: str = Query("day", pattern="^(day|week)$"), db=Depends(get_db)):
+    """Risk-level counts across all users per day or ISO week"""
+    await cohorts.engine.ensure_fresh(db)
+    return {"period": period, "series": await run_in_threadpool(cohorts.engine.risk_over_time, period)}
+
+
+@router.get("/cohorts/users/{user_id}")
+async def get_user_cohort_position(user_id: str, db=Depends(get_db)):
+    """Where a user's window averages fall within their cluster cohort and the whole population"""
+    await cohorts.engine.ensure_fresh(db)
+    position = await run_in_threadpool(cohorts.engine.user_position, user_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="No data found for user")
+    return position
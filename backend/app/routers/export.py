@@ -0,0 +1,127 @@
+"""
+Streaming export of a user's raw user_data history as NDJSON or CSV.
+
+    GET /api/user-data/{user_id}/export?format=ndjson|csv&start=...&end=...&limit=...&cursor=...
+
+Documents are read from the cursor EXPORT_BATCH_SIZE at a time and each
+batch is serialized and written to the response before the next one is
+fetched, so memory stays flat however much history a user has. Rows come
+oldest first in (timestamp, _id) order. With `limit` the response is one
+page and, when more rows follow, carries an opaque X-Next-Cursor header
+(and a Link rel="next") to pass back as `cursor`.
+"""
+import base64
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from .. import queries
+from ..database import get_db
+from ..logging_config import get_logger
+
+router = APIRouter()
+logger = get_logger("export")
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MAX_PAGE_SIZE = int(os.getenv("EXPORT_MAX_PAGE_SIZE", "100000"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# -------------------------------
+# Cursors and serialization
+# -------------------------------
+def encode_cursor(timestamp: datetime, _id: ObjectId) -> str:
+    raw = json.dumps({"t": timestamp.isoformat(), "i": str(_id)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> tuple:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(raw["t"]), ObjectId(raw["i"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid export cursor")
+
+def _plain(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _values(doc: dict) -> list:
+    return [_plain(doc.get(field)) for field in queries.RESPONSE_FIELDS]
+
+def _ndjson_line(doc: dict) -> str:
+    return json.dumps(dict(zip(queries.RESPONSE_FIELDS, _values(doc)))) + "\n"
+
+def _csv_line(values: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+async def stream_documents(cursor, fmt: str):
+    """Serialized chunks of EXPORT_BATCH_SIZE documents each, pulled from the cursor as they are sent"""
+    try:
+        if fmt == "csv":
+            yield _csv_line(queries.RESPONSE_FIELDS)
+        encode = _ndjson_line if fmt == "ndjson" else (lambda doc: _csv_line(_values(doc)))
+        chunk = []
+        async for doc in cursor:
+            chunk.append(encode(doc))
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+    except Exception:
+        # Headers are already sent; all we can do is cut the stream short
+        logger.exception("Export stream failed")
+        raise
+    finally:
+        await cursor.close()
+
+# -------------------------------
+# Endpoint
+# -------------------------------
+@router.get("/user-data/{user_id}/export")
+async def export_user_data(
+    user_id: str,
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound on timestamp"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound on timestamp"),
+    limit: Optional[int] = Query(None, ge=1, le=EXPORT_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db=Depends(get_db)
+):
+    resume = decode_cursor(cursor) if cursor else None
+    headers = {}
+    stop = None
+    if limit is not None:
+        # First key of the next page; the index answers this without touching documents
+        following = await db.user_data.find(
+            queries.export_filter(user_id, start, end, resume), {"timestamp": 1}
+        ).sort(queries.EXPORT_ORDER).skip(limit).limit(1).to_list(length=1)
+        if following:
+            stop = (following[0]["timestamp"], following[0]["_id"])
+            token = encode_cursor(*stop)
+            headers["X-Next-Cursor"] = token
+            headers["Link"] = f'<{request.url.include_query_params(cursor=token)}>; rel="next"'
+
+    documents = db.user_data.find(
+        queries.export_filter(user_id, start, end, resume, stop),
+        queries.projection(queries.RESPONSE_FIELDS)
+    ).sort(queries.EXPORT_ORDER).batch_size(EXPORT_BATCH_SIZE)
+
+    if format == "csv":
+        safe_name = "".join(c for c in user_id if c.isalnum() or c in "-_") or "user"
+        headers["Content-Disposition"] = f'attachment; filename="{safe_name}-user-data.csv"'
+    return StreamingResponse(stream_documents(documents, format), media_type=MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,243 @@
+"""
+Seeded, vectorized synthetic user_data for demos and scale tests.
+
+    python -m backend.app.synthetic [--users 1000] [--days 365] [--per-day 3] [--seed 42]
+                                    [--end YYYY-MM-DD] [--user-prefix synthetic-user] [--no-rollups]
+
+Distributions are fitted from the ml4 training CSV as a Gaussian copula:
+each feature keeps its empirical marginal (sampled through the inverse of
+its sorted values) and the features keep their rank correlations. Every
+user gets a profile row drawn from it; each reading blends the profile
+with a fresh draw (SYNTHETIC_PERSISTENCE), so users stay recognisable
+from day to day, with leisure screen time up and work down on weekends.
+risk_level, mood_rating (on the API's 1-5 scale) and cluster_label are
+derived the way the models would label such a row, without running them.
+
+The same (seed, users, days, per_day, end) always produces the same rows:
+users are generated in fixed blocks, each from its own seeded stream, so
+the output doesn't depend on how it is consumed. The CLI bulk-loads into
+MONGODB_URI with unordered insert_many batches; point it at a local mongod
+for millions of rows (mongomock:// works too, but slows down quickly past
+a few hundred thousand documents).
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from .features import CLUSTER_LABELS, RAW_FEATURES, assign_risk
+from .inference import map_to_1_5_scale_array
+from .ingest import stamp_ingested
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SYNTHETIC_CSV = os.getenv(
+    "SYNTHETIC_CSV", os.path.join(REPO_ROOT, "ml_training", "ml4", "digital_diet_mental_health.csv")
+)
+SYNTHETIC_PERSISTENCE = float(os.getenv("SYNTHETIC_PERSISTENCE", "0.7"))
+SYNTHETIC_INSERT_BATCH = int(os.getenv("SYNTHETIC_INSERT_BATCH", "10000"))
+MOCK_DATA_SEED = int(os.getenv("MOCK_DATA_SEED", "42"))
+
+COLUMNS = RAW_FEATURES + ["mood_rating"]
+# Columns recorded as whole numbers in the CSV
+INTEGER_COLUMNS = {"stress_level", "sleep_quality", "mood_rating"}
+# Weekend multipliers; everything else is unchanged
+WEEKEND_FACTORS = {
+    "daily_screen_time_hours": 1.15,
+    "social_media_hours": 1.2,
+    "gaming_hours": 1.3,
+    "entertainment_hours": 1.25,
+    "work_related_hours": 0.4,
+}
+CLUSTER_COLUMNS = list(CLUSTER_LABELS)
+
+# Users per independently seeded block (fixed, so output never depends on chunking)
+BLOCK_USERS = 256
+
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    """Standard normal CDF via the Abramowitz-Stegun 7.1.26 erf approximation (|error| < 1.5e-7)"""
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
+
+
+def _average_ranks(values: np.ndarray) -> np.ndarray:
+    """Ranks with ties sharing their average rank (the CSV has many repeated integers)"""
+    unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    return (ends - (counts - 1) / 2)[inverse]
+
+
+class SyntheticGenerator:
+    """Gaussian copula over COLUMNS fitted from the training CSV"""
+
+    def __init__(self, table: np.ndarray, persistence: float = SYNTHETIC_PERSISTENCE):
+        n = len(table)
+        self.sorted = np.sort(table, axis=0)
+        self.grid = (np.arange(n) + 0.5) / n
+        # Spearman correlation -> the Gaussian copula's correlation, 2 sin(pi rho / 6)
+        ranks = np.column_stack([_average_ranks(table[:, j]) for j in range(table.shape[1])])
+        correlation = 2 * np.sin(np.pi * np.corrcoef(ranks, rowvar=False) / 6)
+        self.cholesky = np.linalg.cholesky(correlation + 1e-9 * np.eye(table.shape[1]))
+        self.low, self.high = self.sorted[0], self.sorted[-1]
+        self.persistence = persistence
+        self.index = {name: i for i, name in enumerate(COLUMNS)}
+
+    @classmethod
+    def from_csv(cls, path: str = SYNTHETIC_CSV, **kwargs) -> "SyntheticGenerator":
+        with open(path, newline="") as f:
+            rows = [[float(row[name]) for name in COLUMNS] for row in csv.DictReader(f)]
+        return cls(np.asarray(rows, dtype=np.float64), **kwargs)
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """n independent (n, len(COLUMNS)) rows with the fitted marginals and correlations"""
+        u = _normal_cdf(rng.standard_normal((n, len(COLUMNS))) @ self.cholesky.T)
+        return np.column_stack([np.interp(u[:, j], self.grid, self.sorted[:, j]) for j in range(len(COLUMNS))])
+
+    def block(self, seed: int, first_user: int, users: int, days: int, per_day: int, end: date) -> Dict[str, np.ndarray]:
+        """Columns for `users` users from first_user on, days x per_day readings each, oldest first"""
+        rng = np.random.default_rng([seed, first_user // BLOCK_USERS])
+        per_user = days * per_day
+        profiles = np.repeat(self.sample(rng, users), per_user, axis=0)
+        values = self.persistence * profiles + (1 - self.persistence) * self.sample(rng, users * per_user)
+
+        day_offsets = np.tile(np.repeat(np.arange(days - 1, -1, -1), per_day), users)
+        days_ = np.datetime64(end, "D") - day_offsets.astype("timedelta64[D]")
+        weekend = ((days_.astype(np.int64) + 3) % 7) >= 5  # 1970-01-01 was a Thursday
+        for name, factor in WEEKEND_FACTORS.items():
+            values[weekend, self.index[name]] *= factor
+        values = np.clip(values, self.low, self.high)
+        for name in INTEGER_COLUMNS:
+            values[:, self.index[name]] = np.rint(values[:, self.index[name]])
+        values = np.round(values, 1)
+
+        # Readings spread over the waking day, a few minutes of jitter each
+        slot = np.tile(np.arange(per_day), users * days)
+        minutes = 8 * 60 + slot * (14 * 60 // max(per_day, 1)) + rng.integers(0, 45, len(values))
+        timestamps = days_.astype("datetime64[m]") + minutes.astype("timedelta64[m]")
+
+        columns = {name: values[:, self.index[name]] for name in RAW_FEATURES}
+        columns["risk_level"] = assign_risk(values[:, :len(RAW_FEATURES)])
+        columns["mood_rating"] = map_to_1_5_scale_array(
+            values[:, self.index["mood_rating"]], self.low[self.index["mood_rating"]],
+            self.high[self.index["mood_rating"]],
+        ).astype(np.float64)
+        dominant = np.argmax(np.column_stack([columns[name] for name in CLUSTER_COLUMNS]), axis=1)
+        columns["cluster_label"] = np.array([CLUSTER_LABELS[name] for name in CLUSTER_COLUMNS])[dominant]
+        columns["user_index"] = np.repeat(np.arange(first_user, first_user + users), per_user)
+        columns["timestamp"] = timestamps
+        return columns
+
+    def blocks(self, seed: int, users: int, days: int, per_day: int, end: date) -> Iterator[Dict[str, np.ndarray]]:
+        for first in range(0, users, BLOCK_USERS):
+            yield self.block(seed, first, min(BLOCK_USERS, users - first), days, per_day, end)
+
+    def documents(self, seed: int, users: int, days: int, per_day: int, end: date,
+                  user_prefix: str = "synthetic-user") -> Iterator[List[dict]]:
+        """UserDataPoint-shaped documents (without _id), one list per block of users"""
+        fields = RAW_FEATURES + ["risk_level", "mood_rating", "cluster_label"]
+        for columns in self.blocks(seed, users, days, per_day, end):
+            user_ids = [f"{user_prefix}-{i}" for i in columns["user_index"].tolist()]
+            timestamps = columns["timestamp"].astype(datetime).tolist()
+            values = zip(*(columns[name].tolist() for name in fields))
+            yield [
+                {"user_id": user_id, "timestamp": ts, **dict(zip(fields, row))}
+                for user_id, ts, row in zip(user_ids, timestamps, values)
+            ]
+
+
+@lru_cache(maxsize=1)
+def default_generator() -> SyntheticGenerator:
+    return SyntheticGenerator.from_csv()
+
+
+# -------------------------------
+# Demo analytics data
+# -------------------------------
+@lru_cache(maxsize=8)
+def mock_daily_data(days: int, end: date, seed: int = MOCK_DATA_SEED) -> tuple:
+    """One synthetic user's daily summaries for the demo /analytics endpoints, oldest first"""
+    columns = default_generator().block(seed, 0, 1, days, 1, end)
+    return tuple(
+        {
+            "date": str(day),
+            "screen_time": round(screen, 1),
+            "mood_rating": round(mood, 1),
+            "social_media": round(social, 1),
+            "gaming": round(gaming, 1),
+            "entertainment": round(entertainment, 1),
+            "work": round(work, 1),
+        }
+        for day, screen, mood, social, gaming, entertainment, work in zip(
+            columns["timestamp"].astype("datetime64[D]").tolist(),
+            columns["daily_screen_time_hours"].tolist(),
+            columns["mood_rating"].tolist(),
+            columns["social_media_hours"].tolist(),
+            columns["gaming_hours"].tolist(),
+            columns["entertainment_hours"].tolist(),
+            columns["work_related_hours"].tolist(),
+        )
+    )
+
+# -------------------------------
+# Bulk loading
+# -------------------------------
+async def bulk_load(db, users: int, days: int, per_day: int, seed: int = MOCK_DATA_SEED, end: date = None,
+                    user_prefix: str = "synthetic-user", batch_size: int = SYNTHETIC_INSERT_BATCH,
+                    generator: SyntheticGenerator = None) -> int:
+    """Insert users x days x per_day synthetic user_data documents; returns how many"""
+    generator = generator or default_generator()
+    # The last full day, so no reading lies in the future
+    end = end or date.today() - timedelta(days=1)
+    inserted = 0
+    for docs in generator.documents(seed, users, days, per_day, end, user_prefix):
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            stamp_ingested(batch)
+            await db.user_data.insert_many(batch, ordered=False)
+        inserted += len(docs)
+    return inserted
+
+
+async def _main(args):
+    from . import rollups
+    from .database import close_client, get_db
+    from .indexes import ensure_indexes
+
+    db = get_db()
+    try:
+        await ensure_indexes(db)
+        started = time.perf_counter()
+        inserted = await bulk_load(db, args.users, args.days, args.per_day, args.seed, args.end, args.user_prefix)
+        loaded = time.perf_counter() - started
+        print(f"✅ Inserted {inserted} user_data documents in {loaded:.1f}s ({inserted / max(loaded, 1e-9):.0f}/s)")
+        if not args.no_rollups:
+            started = time.perf_counter()
+            await rollups.backfill(db)
+            print(f"✅ Backfilled rollups in {time.perf_counter() - started:.1f}s")
+    finally:
+        close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load seeded synthetic user_data into MONGODB_URI")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=MOCK_DATA_SEED)
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day of data (default: yesterday)")
+    parser.add_argument("--user-prefix", default="synthetic-user")
+    parser.add_argument("--no-rollups", action="store_true", help="Skip the rollup backfill")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Run the whole benchmark suite and write one JSON file per suite:
+
+    python -m backend.benchmarks [--quick] [--output-dir DIR]
+
+Compare two runs (e.g. from two commits) with:
+
+    python -m backend.benchmarks.compare OLD.json NEW.json
+"""
+import argparse
+import asyncio
+import os
+
+from . import analytics, cold_start, endpoints, import_time, micro, worker_memory
+from .common import RESULTS_DIR, git_commit, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ScreenAware backend benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Small run for smoke-testing the suite")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    commit = git_commit()
+    scale = 0.1 if args.quick else 1.0
+
+    def output(name):
+        return os.path.join(args.output_dir, f"{name}-{commit}.json")
+
+    results = micro.run(int(500 * scale), [1, 100])
+    print(f"Wrote {write_results('micro', results, output('micro'))}")
+
+    results = asyncio.run(endpoints.run_async(int(1000 * scale), 8, 100, False, None))
+    print(f"Wrote {write_results('endpoints', results, output('endpoints'))}")
+
+    results = asyncio.run(analytics.run_async(20, 30, 3, int(200 * scale), 42, 4))
+    print(f"Wrote {write_results('analytics', results, output('analytics'))}")
+
+    results = cold_start.run(1 if args.quick else 3)
+    print(f"Wrote {write_results('cold_start', results, output('cold_start'))}")
+
+    results = import_time.run(2 if args.quick else 5)
+    print(f"Wrote {write_results('import_time', results, output('import_time'))}")
+
+    results = worker_memory.run(2 if args.quick else 4, int(2000 * scale))
+    print(f"Wrote {write_results('worker_memory', results, output('worker_memory'))}")
+
+
+if __name__ == "__main__":
+    main()
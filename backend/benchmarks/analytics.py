@@ -0,0 +1,100 @@
+"""
+Analytics endpoint benchmarks against a seeded in-process MongoDB stand-in (mongomock-motor).
+
+    python -m backend.benchmarks.analytics [--users 20] [--days 30] [--per-day 3] [--requests 200]
+                                          [--seed 42] [--output FILE]
+
+Seeds user_data with --users x --days x --per-day synthetic documents
+(backend/app/synthetic.py, fitted from the ml4 CSV), backfills the rollups, then times every analytics source of
+backend/app/main.py (rollups, raw + aggregation pipeline, raw + pandas),
+its demo /analytics endpoints, the cohort endpoints, and the stub analytics of backend/simple_main.py.
+"""
+import argparse
+import asyncio
+import os
+
+from .common import drive, ml4_model_dir, write_results
+from .endpoints import load_main_app
+
+# (label, ANALYTICS_SOURCE, ANALYTICS_OVERVIEW_ENGINE)
+SOURCES = [
+    ("rollups", "rollups", "aggregate"),
+    ("raw_aggregate", "raw", "aggregate"),
+    ("raw_pandas", "raw", "pandas"),
+]
+
+
+async def seed_database(db, users: int, days: int, per_day: int, seed: int) -> int:
+    from backend.app import rollups, synthetic
+    from backend.app.indexes import ensure_indexes
+
+    await ensure_indexes(db)
+    seeded = await synthetic.bulk_load(db, users, days, per_day, seed, user_prefix="bench-user")
+    await rollups.backfill(db)
+    return seeded
+
+
+async def run_async(users: int, days: int, per_day: int, requests: int, seed: int, concurrency: int) -> dict:
+    os.environ["MONGODB_URI"] = "mongomock://benchmark"
+    from backend.app import database
+    from backend.app.routers import analytics
+    from backend.simple_main import app as simple_app
+
+    main_app = load_main_app(ml4_model_dir(), cache=False)
+    database.set_client(database.create_client("mongomock://benchmark"))
+    seeded = await seed_database(database.get_db(), users, days, per_day, seed)
+
+    user_ids = [f"bench-user-{i % users}" for i in range(requests)]
+    paths = {
+        "overview": [f"/api/analytics/overview/{u}" for u in user_ids],
+        "detailed": [f"/api/analytics/detailed/{u}" for u in user_ids],
+        "latest": [f"/api/user-data/{u}/latest" for u in user_ids],
+    }
+
+    results = {"seeded_documents": seeded, "main": {}, "simple_main": {}}
+    for label, source, engine in SOURCES:
+        analytics.ANALYTICS_SOURCE = source
+        analytics.OVERVIEW_ENGINE = engine
+        results["main"][label] = {
+            name: await drive(main_app, gets(urls), concurrency) for name, urls in paths.items()
+            if not (name == "latest" and label != "rollups")
+        }
+    results["main"]["demo"] = {
+        "overview": await drive(main_app, gets(["/analytics/overview"] * requests), concurrency),
+        "detailed": await drive(main_app, gets(["/analytics/detailed"] * requests), concurrency),
+    }
+    results["main"]["cohorts"] = {
+        "screen_time_percentiles": await drive(main_app, gets(["/api/cohorts/screen-time-percentiles"] * requests),
+                                               concurrency),
+        "risk_over_time": await drive(main_app, gets(["/api/cohorts/risk-over-time"] * requests), concurrency),
+        "user_position": await drive(main_app, gets(f"/api/cohorts/users/{u}" for u in user_ids), concurrency),
+    }
+    results["simple_main"] = {
+        "overview": await drive(simple_app, gets(f"/api/analytics/overview/{u}" for u in user_ids), concurrency),
+        "detailed": await drive(simple_app, gets(f"/api/analytics/detailed/{u}" for u in user_ids), concurrency),
+    }
+    return results
+
+
+def gets(urls):
+    return [("GET", url, None) for url in urls]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics benchmarks on a seeded Mongo stand-in")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--per-day", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_async(args.users, args.days, args.per_day, args.requests, args.seed, args.concurrency))
+    results["config"] = vars(args)
+    print(f"Wrote {write_results('analytics', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
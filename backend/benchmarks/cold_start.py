@@ -0,0 +1,79 @@
+"""
+Cold start and memory of loading the models in each on-disk format.
+
+    python -m backend.benchmarks.cold_start [--runs 3] [--compiled-dir DIR] [--output FILE]
+
+Every run is a fresh interpreter that imports the registry, loads the
+bundle and scores one row; reported are the wall time of that, the
+process RSS afterwards and whether scikit-learn/XGBoost/pandas got imported.
+Without --compiled-dir the ml4 artifacts are exported to a temp directory first.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from .common import REPO_ROOT, ml4_model_dir, summarize, write_results
+
+PROBE = r"""
+import json, sys, time, warnings
+warnings.filterwarnings("ignore")
+started = time.perf_counter()
+import numpy as np
+from backend.app.inference import predict_arrays
+from backend.app.model_registry import load_bundle
+bundle = load_bundle(sys.argv[1], sys.argv[2])
+predict_arrays(bundle, np.ones((1, 9)))
+elapsed = time.perf_counter() - started
+rss_kb = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmRSS:"))
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "heavy_modules": sorted(m for m in ("sklearn", "xgboost", "pandas", "joblib") if m in sys.modules),
+}))
+"""
+
+
+def probe(model_dir: str, model_format: str) -> dict:
+    output = subprocess.check_output([sys.executable, "-c", PROBE, model_dir, model_format], cwd=REPO_ROOT)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def measure(model_dir: str, model_format: str, runs: int) -> dict:
+    samples = [probe(model_dir, model_format) for _ in range(runs)]
+    rss = [s["rss_mb"] for s in samples]
+    return {
+        "model_dir": model_dir,
+        "load_and_first_prediction": summarize([s["seconds"] for s in samples]),
+        "rss_mb": round(max(rss), 1),
+        "heavy_modules": samples[-1]["heavy_modules"],
+    }
+
+
+def run(runs: int, compiled_dir: str = None) -> dict:
+    pickle_dir = ml4_model_dir()
+    if compiled_dir is None:
+        from backend.app.compiled_models import export_bundle
+        from backend.app.model_registry import load_components
+
+        compiled_dir = tempfile.mkdtemp(prefix="screenaware-compiled-")
+        export_bundle(load_components(pickle_dir, "pickle"), compiled_dir)
+
+    return {
+        "pickle": measure(pickle_dir, "pickle", runs),
+        "compiled": measure(compiled_dir, "compiled", runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model cold start and RSS per format")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--compiled-dir", help="Existing compiled export to measure")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+    print(f"Wrote {write_results('cold_start', run(args.runs, args.compiled_dir), args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Shared helpers for the benchmark scripts: inputs, model overlay, timing and JSON output"""
+import asyncio
+import csv
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ML4_DIR = os.path.join(REPO_ROOT, "ml_training", "ml4")
+BACKEND_MODEL_DIR = os.path.join(REPO_ROOT, "backend", "app", "models")
+CSV_PATH = os.path.join(ML4_DIR, "digital_diet_mental_health.csv")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+INPUT_FIELDS = [
+    "daily_screen_time_hours", "sleep_duration_hours", "stress_level", "sleep_quality",
+    "physical_activity_hours_per_week", "social_media_hours", "gaming_hours",
+    "entertainment_hours", "work_related_hours",
+]
+
+
+def load_inputs(limit: int = None):
+    """UserInput dicts from the ml4 training CSV, cycled to `limit` rows"""
+    with open(CSV_PATH, newline="") as f:
+        rows = [{name: float(row[name]) for name in INPUT_FIELDS} for row in csv.DictReader(f)]
+    if limit is None:
+        return rows
+    return [rows[i % len(rows)] for i in range(limit)]
+
+
+def ml4_model_dir() -> str:
+    """
+    Model directory with the ml4 notebook outputs, completed from backend/app/models.
+
+    ml4 ships the scalers, KMeans, the mood model and artifacts but not the
+    risk classifier or label encoder, so those two come from the backend copy.
+    """
+    from backend.app.model_registry import overlay_model_dir
+
+    return overlay_model_dir([ML4_DIR, BACKEND_MODEL_DIR])
+
+
+def summarize(samples_s) -> dict:
+    """Latency percentiles in milliseconds from per-call samples in seconds"""
+    arr = np.asarray(samples_s) * 1000
+    return {
+        "n": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+        "max_ms": round(float(arr.max()), 4),
+    }
+
+
+def time_calls(fn, repeats: int, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def drive(app, calls, concurrency: int) -> dict:
+    """
+    Send (method, path, json_body) calls to an ASGI app through httpx with
+    `concurrency` requests in flight; per-request latency plus throughput.
+    """
+    import httpx
+
+    samples, statuses = [], {}
+    queue = asyncio.Queue()
+    for call in calls:
+        queue.put_nowait(call)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                method, path, body = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                samples.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        **summarize(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "statuses": {str(code): count for code, count in statuses.items()},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def write_results(name: str, results: dict, output: str = None) -> str:
+    """Write {"benchmark", "environment", "results"} JSON; defaults to results/<name>-<commit>.json"""
+    payload = {"benchmark": name, "environment": environment(), "results": results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{payload['environment']['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(payload, f, indent=2)
+    return output
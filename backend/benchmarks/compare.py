@@ -0,0 +1,59 @@
+"""
+Compare two benchmark JSON files and flag latency regressions.
+
+    python -m backend.benchmarks.compare OLD.json NEW.json [--metric p99_ms] [--threshold 0.10]
+
+Exits 1 if any shared measurement got slower by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def measurements(node, path=()):
+    """(path, stats) for every leaf dict that carries latency percentiles"""
+    if isinstance(node, dict):
+        if "p50_ms" in node:
+            yield path, node
+            return
+        for key, value in node.items():
+            yield from measurements(value, path + (str(key),))
+
+
+def compare(old: dict, new: dict, metric: str, threshold: float):
+    old_stats = dict(measurements(old["results"]))
+    rows, regressions = [], []
+    for path, stats in measurements(new["results"]):
+        if path not in old_stats or metric not in stats:
+            continue
+        before, after = old_stats[path][metric], stats[metric]
+        change = (after - before) / before if before else 0.0
+        rows.append((" / ".join(path), before, after, change))
+        if change > threshold:
+            regressions.append(rows[-1])
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--metric", default="p99_ms")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows, regressions = compare(old, new, args.metric, args.threshold)
+    print(f"{old['environment']['commit']} -> {new['environment']['commit']} ({args.metric})")
+    for name, before, after, change in rows:
+        flag = "  REGRESSION" if change > args.threshold else ""
+        print(f"{name:70s} {before:10.3f} {after:10.3f} {change:+8.1%}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Endpoint throughput and latency through an in-process ASGI client (no network, no uvicorn).
+
+    python -m backend.benchmarks.endpoints [--requests 1000] [--concurrency 8] [--batch-rows 100]
+                                          [--cache] [--model-dir DIR] [--output FILE]
+
+Covers the prediction endpoints of backend/app/main.py (loaded with the
+ml4 artifacts) and backend/simple_main.py. Inputs cycle through the ml4
+CSV; the prediction cache is off unless --cache is given.
+"""
+import argparse
+import asyncio
+import os
+
+from .common import drive, load_inputs, ml4_model_dir, write_results
+
+MAIN_ENDPOINTS = ["/predict_report", "/predict_risk", "/predict_mood", "/predict_cluster"]
+SIMPLE_ENDPOINTS = ["/predict_report"]
+
+
+def load_main_app(model_dir: str, cache: bool):
+    # MODEL_DIR is read when main is imported
+    os.environ["MODEL_DIR"] = model_dir
+    from backend.app import main
+
+    main.prediction_cache.enabled = cache
+    return main.app
+
+
+async def run_async(requests: int, concurrency: int, batch_rows: int, cache: bool, model_dir: str) -> dict:
+    inputs = load_inputs(requests)
+    main_app = load_main_app(model_dir or ml4_model_dir(), cache)
+    from backend.simple_main import app as simple_app
+
+    results = {"main": {}, "simple_main": {}}
+    for path in MAIN_ENDPOINTS:
+        await drive(main_app, [("POST", path, payload) for payload in inputs[:20]], 1)
+        results["main"][path] = await drive(main_app, [("POST", path, payload) for payload in inputs], concurrency)
+
+    batches = [inputs[start:start + batch_rows] for start in range(0, len(inputs), batch_rows)]
+    batch_result = await drive(main_app, [("POST", "/predict_report/batch", batch) for batch in batches], concurrency)
+    batch_result["rows_per_second"] = round(batch_result["throughput_rps"] * batch_rows, 2)
+    results["main"][f"/predict_report/batch ({batch_rows} rows)"] = batch_result
+
+    for path in SIMPLE_ENDPOINTS:
+        results["simple_main"][path] = await drive(simple_app, [("POST", path, payload) for payload in inputs], concurrency)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process endpoint load test")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--cache", action="store_true", help="Leave the prediction cache enabled")
+    parser.add_argument("--model-dir", help="Defaults to the ml4 artifacts (see common.ml4_model_dir)")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_async(args.requests, args.concurrency, args.batch_rows, args.cache, args.model_dir))
+    results["config"] = {"requests": args.requests, "concurrency": args.concurrency, "cache": args.cache}
+    print(f"Wrote {write_results('endpoints', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
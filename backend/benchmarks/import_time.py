@@ -0,0 +1,104 @@
+"""
+Import time of backend.app.main per MODEL_STARTUP mode, from `python -X importtime`.
+
+    python -m backend.benchmarks.import_time [--runs 5] [--top 15] [--budget-ms MS] [--output FILE]
+
+Every run is a fresh interpreter importing backend.app.main. Reported per
+mode are the cumulative import time of backend.app.main (with eager
+startup that includes loading the models), the top-level packages whose
+modules spent the most time executing and which heavy modules ended up
+imported. Track regressions with
+`python -m backend.benchmarks.compare OLD.json NEW.json --metric p50_ms`;
+--budget-ms additionally exits 1 when the lazy import's p50 exceeds MS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+from .common import REPO_ROOT, ml4_model_dir, summarize, write_results
+
+HEAVY_MODULES = ("sklearn", "xgboost", "pandas", "joblib", "scipy", "motor", "mongomock_motor")
+
+PROBE = "import sys, json, backend.app.main; print(json.dumps(sorted(m for m in %r if m in sys.modules)))" % (
+    HEAVY_MODULES,
+)
+
+
+def parse_importtime(stderr: str):
+    """({module: cumulative_us}, {top-level package: summed self_us}) from -X importtime output"""
+    cumulative, packages = {}, defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        cumulative[name] = int(cumulative_us)
+        packages[name.split(".")[0]] += int(self_us)
+    return cumulative, packages
+
+
+def probe(env: dict):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=REPO_ROOT, env={**os.environ, **env}, capture_output=True, text=True, check=True,
+    )
+    cumulative, packages = parse_importtime(result.stderr)
+    return cumulative["backend.app.main"] / 1e6, packages, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(env: dict, runs: int, top: int) -> dict:
+    samples, package_totals = [], defaultdict(int)
+    for _ in range(runs):
+        seconds, packages, heavy = probe(env)
+        samples.append(seconds)
+        for name, us in packages.items():
+            package_totals[name] += us
+    slowest = sorted(package_totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "env": env,
+        "import_main": summarize(samples),
+        "top_packages_ms": {name: round(us / runs / 1000, 1) for name, us in slowest},
+        "heavy_modules": heavy,
+    }
+
+
+def run(runs: int, top: int = 15, compiled_dir: str = None) -> dict:
+    pickle_dir = ml4_model_dir()
+    if compiled_dir is None:
+        from backend.app.compiled_models import export_bundle
+        from backend.app.model_registry import load_components
+
+        compiled_dir = tempfile.mkdtemp(prefix="screenaware-compiled-")
+        export_bundle(load_components(pickle_dir, "pickle"), compiled_dir)
+
+    modes = {
+        "eager_pickle": {"MODEL_STARTUP": "eager", "MODEL_FORMAT": "pickle", "MODEL_DIR": pickle_dir},
+        "eager_compiled": {"MODEL_STARTUP": "eager", "MODEL_FORMAT": "compiled", "MODEL_DIR": compiled_dir},
+        "lazy": {"MODEL_STARTUP": "lazy", "MODEL_FORMAT": "pickle", "MODEL_DIR": pickle_dir},
+    }
+    return {label: measure(env, runs, top) for label, env in modes.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of backend.app.main per startup mode")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level packages to report")
+    parser.add_argument("--compiled-dir", help="Existing compiled export for the eager_compiled mode")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the lazy import p50 exceeds this")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.top, args.compiled_dir)
+    print(f"Wrote {write_results('import_time', results, args.output)}")
+    lazy_ms = results["lazy"]["import_main"]["p50_ms"]
+    if args.budget_ms is not None and lazy_ms > args.budget_ms:
+        print(f"❌ Lazy import of backend.app.main took {lazy_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Per-stage micro-benchmarks of the prediction pipeline against the ml4 artifacts.
+
+    python -m backend.benchmarks.micro [--repeats 500] [--batch-sizes 1,100] [--model-dir DIR] [--output FILE]
+
+Times every step predict_arrays runs (feature plan, each model's predict
+and post-processing) plus the end-to-end call for each endpoint's target
+set (/predict_report, /predict_risk, /predict_mood, /predict_cluster).
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.app.inference import map_to_1_5_scale_array, predict_arrays
+from backend.app.model_registry import load_bundle
+
+from .common import load_inputs, ml4_model_dir, summarize, time_calls, write_results
+
+ENDPOINT_TARGETS = {
+    "predict_report": ("risk", "mood", "cluster"),
+    "predict_risk": ("risk",),
+    "predict_mood": ("mood",),
+    "predict_cluster": ("cluster",),
+}
+
+
+def stage_benchmarks(models, users, repeats: int) -> dict:
+    raw = models.plan.raw_matrix(users)
+    features = models.plan.build(raw)
+    risk_encoded = models.clf_model.predict(features.risk)
+    mood_raw = models.reg_model.predict(features.mood)
+    cluster_id = models.cluster_model.predict(features.cluster)
+
+    stages = {
+        "raw_matrix": lambda: models.plan.raw_matrix(users),
+        "features": lambda: models.plan.build(raw),
+        "risk_predict": lambda: models.clf_model.predict(features.risk),
+        "risk_decode": lambda: models.le.classes_[risk_encoded],
+        "mood_predict": lambda: models.reg_model.predict(features.mood),
+        "mood_scale": lambda: map_to_1_5_scale_array(mood_raw, models.mood_min_range, models.mood_max_range),
+        "cluster_predict": lambda: models.cluster_model.predict(features.cluster),
+        "cluster_label": lambda: np.array(
+            [models.cluster_name_map.get(c, "Unknown") for c in cluster_id], dtype=object
+        ),
+    }
+    return {name: time_calls(fn, repeats) for name, fn in stages.items()}
+
+
+def endpoint_benchmarks(models, users, repeats: int) -> dict:
+    raw = models.plan.raw_matrix(users)
+    return {
+        endpoint: time_calls(lambda targets=targets: predict_arrays(models, raw, targets), repeats)
+        for endpoint, targets in ENDPOINT_TARGETS.items()
+    }
+
+
+def load_benchmark(model_dir: str, repeats: int = 3) -> dict:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        load_bundle(model_dir)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def run(repeats: int, batch_sizes, model_dir: str = None) -> dict:
+    model_dir = model_dir or ml4_model_dir()
+    models = load_bundle(model_dir)
+    inputs = load_inputs()
+
+    results = {"model_dir": model_dir, "model_version": models.version, "load": load_benchmark(model_dir)}
+    for batch_size in batch_sizes:
+        users = [SimpleNamespace(**row) for row in inputs[:batch_size]]
+        # Large batches take much longer per call; keep the total work comparable
+        batch_repeats = max(20, repeats // max(1, batch_size // 10))
+        results[f"batch_{batch_size}"] = {
+            "stages": stage_benchmarks(models, users, batch_repeats),
+            "endpoints": endpoint_benchmarks(models, users, batch_repeats),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction pipeline micro-benchmarks")
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--batch-sizes", default="1,100", help="Comma-separated rows per call")
+    parser.add_argument("--model-dir", help="Defaults to the ml4 artifacts (see common.ml4_model_dir)")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    results = run(args.repeats, batch_sizes, args.model_dir)
+    print(f"Wrote {write_results('micro', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
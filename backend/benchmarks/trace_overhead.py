@@ -0,0 +1,65 @@
+"""
+p50/p99 latency of POST /predict_report with prediction tracing off, sampled and on for every request.
+
+    python -m backend.benchmarks.trace_overhead [--requests 2000] [--log-file /dev/null] [--output FILE]
+
+Inputs are rows of the ml4 training CSV and the prediction cache is
+disabled, so every request runs the full pipeline.
+"""
+import argparse
+import os
+import time
+
+from .common import load_inputs, ml4_model_dir, summarize, write_results
+from .endpoints import load_main_app
+
+# (label, PREDICTION_TRACE_SAMPLE, PREDICTION_TRACE_SLOW_MS)
+MODES = [
+    ("tracing_off", 0, 0),
+    ("sampled_1_in_100", 100, 0),
+    ("slow_only_50ms", 0, 50),
+    ("every_request", 1, 0),
+]
+
+
+def run(requests: int, log_file: str) -> dict:
+    from fastapi.testclient import TestClient
+
+    from backend.app import logging_config
+
+    app = load_main_app(ml4_model_dir(), cache=False)
+    stream = open(log_file, "w")
+    logging_config.configure_logging(stream=stream)
+    client = TestClient(app)
+    inputs = load_inputs(requests)
+
+    for payload in inputs[:50]:
+        client.post("/predict_report", json=payload)
+
+    results = {}
+    for label, sample_every, slow_ms in MODES:
+        logging_config.tracer.sample_every = sample_every
+        logging_config.tracer.slow_ms = slow_ms
+        samples = []
+        for payload in inputs:
+            started = time.perf_counter()
+            client.post("/predict_report", json=payload)
+            samples.append(time.perf_counter() - started)
+        results[label] = summarize(samples)
+
+    logging_config.shutdown_logging()
+    stream.close()
+    return {"requests_per_mode": requests, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction trace logging overhead")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--log-file", default=os.devnull, help="Where trace records are written")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+    print(f"Wrote {write_results('trace_overhead', run(args.requests, args.log_file), args.output)}")
+
+
+if __name__ == "__main__":
+    main()
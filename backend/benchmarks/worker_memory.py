@@ -0,0 +1,135 @@
+"""
+Per-worker memory of N processes serving the same models, like uvicorn --workers N.
+
+    python -m backend.benchmarks.worker_memory [--workers 4] [--rows 2000] [--compiled-dir DIR] [--output FILE]
+
+For each mode (pickle, compiled read into memory, compiled memory-mapped)
+--workers processes are started together; each loads the bundle, scores
+--rows rows of the ml4 CSV so every model page is touched, and waits. While
+all of them are alive /proc/<pid>/smaps_rollup is read for each: RSS counts
+shared pages in every process, PSS splits them between the processes that
+map them, so the PSS total is what the whole set of workers really costs.
+Linux only. Without --compiled-dir the ml4 artifacts are exported to a temp
+directory first.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from .common import REPO_ROOT, load_inputs, ml4_model_dir, write_results
+
+# (label, MODEL_FORMAT, MODEL_MMAP)
+MODES = [
+    ("pickle", "pickle", False),
+    ("compiled", "compiled", False),
+    ("compiled_mmap", "compiled", True),
+]
+
+WORKER = r"""
+import json, sys, warnings
+warnings.filterwarnings("ignore")
+import numpy as np
+from backend.app.features import RAW_FEATURES
+from backend.app.inference import predict_arrays
+from backend.app.model_registry import load_bundle
+bundle = load_bundle(sys.argv[1], sys.argv[2], mmap=sys.argv[3] == "1")
+rows = json.loads(sys.stdin.readline())
+predict_arrays(bundle, np.array([[row[f] for f in RAW_FEATURES] for row in rows], dtype=np.float64))
+print("ready", flush=True)
+sys.stdin.readline()
+"""
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def smaps_rollup(pid: int) -> dict:
+    """kB values of SMAPS_FIELDS for one process"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in SMAPS_FIELDS:
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def measure(model_dir: str, model_format: str, mmap: bool, workers: int, rows: list) -> dict:
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, model_dir, model_format, "1" if mmap else "0"],
+            cwd=REPO_ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        payload = json.dumps(rows) + "\n"
+        for proc in procs:
+            proc.stdin.write(payload)
+            proc.stdin.flush()
+        for proc in procs:
+            if proc.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"worker {proc.pid} failed to load {model_dir} ({model_format})")
+        samples = [smaps_rollup(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+    def mb(kb):
+        return round(kb / 1024, 1)
+
+    return {
+        "model_dir": model_dir,
+        "per_worker": [
+            {
+                "rss_mb": mb(s["Rss"]),
+                "pss_mb": mb(s["Pss"]),
+                "shared_mb": mb(s["Shared_Clean"] + s["Shared_Dirty"]),
+                "private_mb": mb(s["Private_Clean"] + s["Private_Dirty"]),
+            }
+            for s in samples
+        ],
+        "mean_rss_mb": mb(sum(s["Rss"] for s in samples) / workers),
+        "mean_private_mb": mb(sum(s["Private_Clean"] + s["Private_Dirty"] for s in samples) / workers),
+        "total_pss_mb": mb(sum(s["Pss"] for s in samples)),
+    }
+
+
+def run(workers: int, rows: int, compiled_dir: str = None) -> dict:
+    pickle_dir = ml4_model_dir()
+    if compiled_dir is None:
+        from backend.app.compiled_models import export_bundle
+        from backend.app.model_registry import load_components
+
+        compiled_dir = tempfile.mkdtemp(prefix="screenaware-compiled-")
+        export_bundle(load_components(pickle_dir, "pickle"), compiled_dir)
+
+    inputs = load_inputs(rows)
+    results = {
+        "workers": workers,
+        "rows_scored": len(inputs),
+        "compiled_arrays_mb": round(
+            sum(os.path.getsize(os.path.join(compiled_dir, f)) for f in os.listdir(compiled_dir)) / 2**20, 2
+        ),
+    }
+    for label, model_format, mmap in MODES:
+        model_dir = pickle_dir if model_format == "pickle" else compiled_dir
+        results[label] = measure(model_dir, model_format, mmap, workers, inputs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker RSS/PSS for each model format")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=2000, help="CSV rows each worker scores after loading")
+    parser.add_argument("--compiled-dir", help="Existing compiled export to measure")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/)")
+    args = parser.parse_args()
+    print(f"Wrote {write_results('worker_memory', run(args.workers, args.rows, args.compiled_dir), args.output)}")
+
+
+if __name__ == "__main__":
+    main()
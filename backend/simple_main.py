@@ -2,6 +2,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+try:
+    from backend.app.logging_config import RequestIdMiddleware, configure_logging, get_logger, tracer
+except ImportError:
+    # Started from inside backend/ (uvicorn simple_main:app)
+    from app.logging_config import RequestIdMiddleware, configure_logging, get_logger, tracer
+
+configure_logging()
+report_logger = get_logger("simple.predict_report")
+data_logger = get_logger("simple.user_data")
+
 app = FastAPI()
 
 # Enable CORS
@@ -11,7 +21,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.add_middleware(RequestIdMiddleware)
 
 class UserInput(BaseModel):
     daily_screen_time_hours: float
@@ -30,7 +42,7 @@ def read_root():
 
 @app.post("/predict_report")
 def predict_report(user: UserInput):
-    print(f"Received data: {user}")
+    trace = tracer.start(report_logger)
     
     screen_time = user.daily_screen_time_hours
     
@@ -64,7 +76,7 @@ def predict_report(user: UserInput):
         "cluster_label": cluster_label
     }
     
-    print(f"Sending response: {response}")
+    trace.finish(input=user.dict, response=response)
     return response
 
 @app.get("/api/analytics/overview/{user_id}")
@@ -111,5 +123,5 @@ def get_analytics_detailed(user_id: str):
 @app.post("/api/user-data")
 def store_user_data(data: dict):
     """Store user data - currently just returns success"""
-    print(f"Storing user data: {data}")
+    data_logger.debug("Storing user data", extra={"fields": {"data": data}})
     return {"status": "success", "message": "Data stored successfully"}
\ No newline at end of file
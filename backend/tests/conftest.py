@@ -0,0 +1,99 @@
+"""Shared fixtures; run from the repo root with `python -m pytest backend/tests`"""
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from backend.benchmarks.common import BACKEND_MODEL_DIR, CSV_PATH, ml4_model_dir  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def csv_path():
+    return CSV_PATH
+
+
+@pytest.fixture(scope="session", params=["ml4", "backend"])
+def model_dir(request):
+    """Each shipped model directory: the ml4 overlay and backend/app/models"""
+    if request.param == "backend":
+        yield BACKEND_MODEL_DIR
+        return
+    overlay = ml4_model_dir()
+    try:
+        yield overlay
+    finally:
+        shutil.rmtree(overlay, ignore_errors=True)
+
+
+@pytest.fixture
+def mongo_db():
+    """A fresh in-process MongoDB stand-in (mongomock-motor) as the application database"""
+    from backend.app import database
+
+    database.set_client(database.create_client(database.MOCK_URI_PREFIX + "tests"))
+    try:
+        yield database.get_db()
+    finally:
+        database.close_client()
+
+
+@pytest.fixture
+def seeded_db(mongo_db):
+    """mongo_db with 3 synthetic users x 20 days x 2 readings, ending yesterday, plus their rollups"""
+    import asyncio
+
+    from backend.app import rollups, synthetic
+    from backend.app.indexes import ensure_indexes
+
+    async def seed():
+        await ensure_indexes(mongo_db)
+        await synthetic.bulk_load(mongo_db, users=3, days=20, per_day=2, user_prefix="test-user")
+        await rollups.backfill(mongo_db)
+
+    asyncio.run(seed())
+    return mongo_db
+
+
+@pytest.fixture
+def api(mongo_db):
+    """TestClient for the data routers, without loading any models"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.app.routers import analytics, cohorts, export
+
+    app = FastAPI()
+    for router in (analytics.router, cohorts.router, export.router):
+        app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def main_app(mongo_db):
+    """backend.app.main with the served models, on mongo_db"""
+    from backend.app import main
+
+    return main
+
+
+@pytest.fixture
+def client(main_app):
+    """TestClient for the full API, lifespan included"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(main_app.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def inputs():
+    """UserInput dicts from the ml4 training CSV"""
+    from backend.benchmarks.common import load_inputs
+
+    return load_inputs()
@@ -0,0 +1,147 @@
+import pytest
+
+from backend.app.routers import analytics
+
+READING = {
+    "user_id": "posted-user",
+    "daily_screen_time_hours": 6.5,
+    "sleep_duration_hours": 7.0,
+    "stress_level": 5,
+    "sleep_quality": 6,
+    "physical_activity_hours_per_week": 3,
+    "social_media_hours": 2.5,
+    "gaming_hours": 1.0,
+    "entertainment_hours": 1.5,
+    "work_related_hours": 1.5,
+    "risk_level": "Medium",
+    "mood_rating": 3.0,
+    "cluster_label": "Social Media Dominant",
+}
+
+
+def test_store_then_latest(api):
+    stored = api.post("/api/user-data", json=READING)
+    assert stored.status_code == 200
+
+    latest = api.get("/api/user-data/posted-user/latest")
+    assert latest.status_code == 200
+    assert latest.json()["_id"] == stored.json()["_id"]
+    assert latest.json()["daily_screen_time_hours"] == 6.5
+
+
+@pytest.mark.parametrize("source, engine", [("rollups", "aggregate"), ("raw", "aggregate"), ("raw", "pandas")])
+def test_overview(api, seeded_db, monkeypatch, source, engine):
+    monkeypatch.setattr(analytics, "ANALYTICS_SOURCE", source)
+    monkeypatch.setattr(analytics, "OVERVIEW_ENGINE", engine)
+
+    response = api.get("/api/analytics/overview/test-user-0")
+    assert response.status_code == 200
+    overview = response.json()
+    assert sum(overview["risk_level_distribution"].values()) == 40
+    assert len(overview["screen_time_trend"]) == 7
+    assert set(overview["category_distribution"]) == {"social_media", "gaming", "entertainment", "work"}
+
+
+@pytest.mark.parametrize("source", ["rollups", "raw"])
+def test_detailed(api, seeded_db, monkeypatch, source):
+    monkeypatch.setattr(analytics, "ANALYTICS_SOURCE", source)
+
+    response = api.get("/api/analytics/detailed/test-user-1")
+    assert response.status_code == 200
+    detailed = response.json()
+    assert len(detailed["daily_data"]) == 40
+    assert {row["user_id"] for row in detailed["daily_data"]} == {"test-user-1"}
+    assert detailed["weekly_averages"] and detailed["monthly_averages"]
+
+
+def test_overview_revalidates_with_304(api, seeded_db):
+    first = api.get("/api/analytics/overview/test-user-2")
+    etag = first.headers["etag"]
+
+    again = api.get("/api/analytics/overview/test-user-2", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_rollups_and_raw_agree(api, seeded_db, monkeypatch):
+    overviews = {}
+    for source in ("rollups", "raw"):
+        monkeypatch.setattr(analytics, "ANALYTICS_SOURCE", source)
+        overviews[source] = api.get("/api/analytics/overview/test-user-0").json()
+
+    for key in ("average_screen_time", "average_mood", "average_sleep"):
+        assert overviews["rollups"][key] == pytest.approx(overviews["raw"][key])
+    assert overviews["rollups"]["risk_level_distribution"] == overviews["raw"]["risk_level_distribution"]
+
+
+def test_window_starts_at_midnight_for_every_source(api, mongo_db, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from backend.app import queries
+
+    start = queries.analytics_window_start()
+    assert start == (datetime.now() - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # One reading in the first minute of the window's first day, one just before it
+    for timestamp in (start, start - timedelta(minutes=1)):
+        assert api.post("/api/user-data", json={**READING, "timestamp": timestamp.isoformat()}).status_code == 200
+
+    counts = {}
+    for source in ("rollups", "raw"):
+        monkeypatch.setattr(analytics, "ANALYTICS_SOURCE", source)
+        overview = api.get("/api/analytics/overview/posted-user").json()
+        counts[source] = sum(overview["risk_level_distribution"].values())
+        assert len(api.get("/api/analytics/detailed/posted-user").json()["daily_data"]) == 1
+    assert counts == {"rollups": 1, "raw": 1}
+
+
+@pytest.mark.parametrize("source, engine", [("rollups", "aggregate"), ("raw", "aggregate"), ("raw", "pandas")])
+def test_unknown_user_is_404(api, seeded_db, monkeypatch, source, engine):
+    monkeypatch.setattr(analytics, "ANALYTICS_SOURCE", source)
+    monkeypatch.setattr(analytics, "OVERVIEW_ENGINE", engine)
+
+    for path in ("analytics/overview", "analytics/detailed"):
+        assert api.get(f"/api/{path}/nobody").status_code == 404
+    assert api.get("/api/user-data/nobody/latest").status_code == 404
+
+
+@pytest.mark.parametrize("user_id", ["test-user-0", "test-user-1", "test-user-2"])
+def test_aggregation_matches_pandas(seeded_db, user_id):
+    import asyncio
+
+    from backend.app import queries
+
+    since = queries.analytics_window_start()
+    aggregated = asyncio.run(analytics.overview_from_aggregation(seeded_db, user_id, since))
+    computed = asyncio.run(analytics.overview_from_pandas(seeded_db, user_id, since))
+
+    for key in ("average_screen_time", "average_mood", "average_sleep"):
+        assert aggregated[key] == pytest.approx(computed[key])
+    assert aggregated["category_distribution"] == pytest.approx(computed["category_distribution"])
+    assert aggregated["risk_level_distribution"] == computed["risk_level_distribution"]
+    assert list(aggregated["risk_level_distribution"]) == list(computed["risk_level_distribution"])
+    assert aggregated["most_common_cluster"] == computed["most_common_cluster"]
+    assert aggregated["screen_time_trend"] == computed["screen_time_trend"]
+
+
+def test_aggregation_of_empty_window_is_404(seeded_db):
+    import asyncio
+
+    from fastapi import HTTPException
+
+    from backend.app import queries
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(analytics.overview_from_aggregation(seeded_db, "nobody", queries.analytics_window_start()))
+    assert raised.value.status_code == 404
+
+
+def test_store_writes_only_daily_rollups(api, mongo_db):
+    import asyncio
+
+    assert api.post("/api/user-data", json=READING).status_code == 200
+
+    names = asyncio.run(mongo_db.list_collection_names())
+    assert "user_weekly_rollups" not in names
+    daily = asyncio.run(mongo_db["user_daily_rollups"].find_one({"user_id": "posted-user"}))
+    assert daily["count"] == 1
@@ -0,0 +1,125 @@
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from backend.app import cohorts, ingest, rollups
+from backend.app.models.user_data import UserDataPoint
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """A fresh engine behind the router that refreshes on every request"""
+    fresh = cohorts.CohortEngine(refresh_interval_s=0)
+    monkeypatch.setattr(cohorts, "engine", fresh)
+    return fresh
+
+
+def raw_documents(db):
+    return asyncio.run(db.user_data.find({}, {"_id": 0}).to_list(length=None))
+
+
+def dominant_clusters(docs):
+    """Most frequent cluster_label per user, ties to the smallest label"""
+    by_user = defaultdict(Counter)
+    for doc in docs:
+        by_user[doc["user_id"]][doc["cluster_label"]] += 1
+    return {user: min(counts, key=lambda label: (-counts[label], label)) for user, counts in by_user.items()}
+
+
+def test_user_position_is_ranked_within_the_cluster_cohort(api, seeded_db, engine):
+    docs = raw_documents(seeded_db)
+    clusters = dominant_clusters(docs)
+    means = {
+        user: np.mean([doc["daily_screen_time_hours"] for doc in docs if doc["user_id"] == user])
+        for user in clusters
+    }
+
+    response = api.get("/api/cohorts/users/test-user-0")
+    assert response.status_code == 200
+    position = response.json()
+    cohort = [user for user, cluster in clusters.items() if cluster == clusters["test-user-0"]]
+    assert position["cluster_label"] == clusters["test-user-0"]
+    assert position["cohort_size"] == len(cohort)
+    assert position["population_size"] == 3
+
+    screen_time = position["metrics"]["screen_time"]
+    assert screen_time["value"] == pytest.approx(means["test-user-0"])
+    assert screen_time["cohort_median"] == pytest.approx(np.median([means[user] for user in cohort]))
+    assert screen_time["population_percentile"] == cohorts.percentile_rank(
+        np.array(list(means.values())), means["test-user-0"]
+    )
+
+    assert api.get("/api/cohorts/users/nobody").status_code == 404
+
+
+def test_screen_time_percentiles_cover_every_user(api, seeded_db, engine):
+    docs = raw_documents(seeded_db)
+    clusters = dominant_clusters(docs)
+
+    body = api.get("/api/cohorts/screen-time-percentiles").json()
+    assert body["all"]["users"] == 3
+    assert {cluster: summary["users"] for cluster, summary in body["by_cluster"].items()} == Counter(clusters.values())
+
+
+def test_risk_over_time_matches_the_raw_documents(api, seeded_db, engine):
+    expected = defaultdict(Counter)
+    for doc in raw_documents(seeded_db):
+        expected[doc["timestamp"].strftime("%Y-%m-%d")][doc["risk_level"]] += 1
+
+    daily = api.get("/api/cohorts/risk-over-time").json()["series"]
+    assert [point["period"] for point in daily] == sorted(expected)
+    for point in daily:
+        assert point["total"] == 6
+        assert {level: n for level, n in point["risk_levels"].items() if n} == expected[point["period"]]
+
+    weekly = api.get("/api/cohorts/risk-over-time", params={"period": "week"}).json()["series"]
+    assert sum(point["total"] for point in weekly) == 120
+    assert all(datetime.strptime(point["period"], "%Y-%m-%d").weekday() == 0 for point in weekly)
+    assert api.get("/api/cohorts/risk-over-time", params={"period": "month"}).status_code == 422
+
+
+def test_refresh_fetches_only_changed_rollups(seeded_db):
+    engine = cohorts.CohortEngine(refresh_interval_s=0, overlap_s=5)
+    collection = seeded_db[rollups.DAILY_COLLECTION]
+
+    async def run():
+        # Spread the backfilled rows a minute apart, all well in the past
+        rows = await collection.find({}, {"_id": 1}).to_list(length=None)
+        start = datetime.now() - timedelta(hours=2)
+        for i, row in enumerate(rows):
+            await collection.update_one({"_id": row["_id"]}, {"$set": {"updated_at": start + timedelta(minutes=i)}})
+
+        first = await engine.refresh(seeded_db)
+        # Only the row at the high-water mark falls inside the overlap
+        unchanged = await engine.refresh(seeded_db)
+        before = int(engine.users().loc["test-user-1", "count"])
+
+        doc = ingest.prepare_document(UserDataPoint(
+            user_id="test-user-1", daily_screen_time_hours=5, sleep_duration_hours=7, stress_level=5,
+            sleep_quality=6, physical_activity_hours_per_week=3, social_media_hours=2, gaming_hours=1,
+            entertainment_hours=1, work_related_hours=1, risk_level="Low", mood_rating=3,
+            cluster_label="Balanced",
+        ))
+        await ingest.persist_document(seeded_db, doc)
+        changed = await engine.refresh(seeded_db)
+        return len(rows), first, unchanged, changed, before, int(engine.users().loc["test-user-1", "count"])
+
+    total, first, unchanged, changed, before, after = asyncio.run(run())
+    assert first == total == 60
+    assert unchanged == 1
+    # The new reading's rollup, plus the previous high-water row again
+    assert changed == 2
+    assert after == before + 1
+    assert engine.stats()["fetched_rows"] == 63
+
+
+def test_rows_outside_the_window_are_dropped(seeded_db):
+    engine = cohorts.CohortEngine(window_days=10)
+    asyncio.run(engine.refresh(seeded_db))
+
+    # Seeded data ends yesterday, so days 1..10 back are inside the window
+    assert engine.stats()["rows"] == 30
+    assert int(engine.users()["count"].sum()) == 60
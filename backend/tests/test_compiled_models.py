@@ -0,0 +1,56 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from backend.app.compiled_models import ForestClassifier, export_bundle, export_forest
+from backend.app.inference import predict_arrays
+from backend.app.model_registry import load_bundle, load_components
+from backend.benchmarks.common import BACKEND_MODEL_DIR, ml4_model_dir
+from ml_training.ml4.export_models import check_parity
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_compiled_export_matches_served_pickles(tmp_path):
+    source = load_bundle(BACKEND_MODEL_DIR)
+    export_bundle(load_components(BACKEND_MODEL_DIR), str(tmp_path), source_version=source.version)
+    assert check_parity(BACKEND_MODEL_DIR, str(tmp_path))
+
+    compiled = load_bundle(str(tmp_path), "compiled")
+    assert compiled.cluster_name_map == source.cluster_name_map
+    raw = np.array([[5.0, 7.0, 5.0, 6.0, 3.0, 2.0, 1.0, 1.0, 1.0]])
+    label = predict_arrays(compiled, raw)["cluster_label"][0]
+    assert label in source.cluster_name_map.values()
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_parity_check_rejects_unnamed_clusters(tmp_path):
+    # The ml4 notebook's artifacts.pkl carries no cluster_name_map
+    overlay = ml4_model_dir()
+    try:
+        export_bundle(load_components(overlay), str(tmp_path))
+        assert not check_parity(overlay, str(tmp_path))
+    finally:
+        shutil.rmtree(overlay, ignore_errors=True)
+
+
+def test_forest_export_normalizes_leaf_counts():
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = np.digitize(X[:, 0] + 0.5 * X[:, 1], [-0.5, 0.5])
+    forest = RandomForestClassifier(n_estimators=7, max_depth=4, random_state=0).fit(X, y)
+    expected = forest.predict_proba(X)
+
+    # scikit-learn < 1.4 pickles hold per-class sample counts instead of fractions
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        tree.value[:] *= tree.weighted_n_node_samples[:, None, None]
+
+    arrays, depth = export_forest(forest)
+    compiled = ForestClassifier(
+        arrays["roots"], arrays["feature"], arrays["threshold"], arrays["children"], depth,
+        arrays["value"], arrays["classes"],
+    )
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, atol=1e-6)
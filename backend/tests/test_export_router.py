@@ -0,0 +1,102 @@
+import asyncio
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from backend.app import queries
+from backend.app.routers import export
+
+
+def ndjson_rows(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def export_pages(api, user_id, limit):
+    """Every page of a keyset-paginated export, following X-Next-Cursor"""
+    pages, params = [], {"limit": limit}
+    while True:
+        response = api.get(f"/api/user-data/{user_id}/export", params=params)
+        assert response.status_code == 200
+        pages.append(ndjson_rows(response))
+        token = response.headers.get("x-next-cursor")
+        if token is None:
+            return pages
+        assert f"cursor={token}" in response.headers["link"]
+        params = {"limit": limit, "cursor": token}
+
+
+def test_ndjson_streams_every_document_oldest_first(api, seeded_db, monkeypatch):
+    # Several chunks per response
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 7)
+
+    response = api.get("/api/user-data/test-user-0/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = ndjson_rows(response)
+    assert len(rows) == 40
+    assert list(rows[0]) == queries.RESPONSE_FIELDS
+    assert {row["user_id"] for row in rows} == {"test-user-0"}
+    keys = [(row["timestamp"], row["_id"]) for row in rows]
+    assert keys == sorted(keys)
+
+
+def test_csv_matches_ndjson(api, seeded_db, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 7)
+
+    response = api.get("/api/user-data/test-user-1/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="test-user-1-user-data.csv"'
+    table = list(csv.reader(io.StringIO(response.text)))
+    assert table[0] == queries.RESPONSE_FIELDS
+
+    rows = ndjson_rows(api.get("/api/user-data/test-user-1/export"))
+    assert [line[0] for line in table[1:]] == [row["_id"] for row in rows]
+    assert [float(line[3]) for line in table[1:]] == [row["daily_screen_time_hours"] for row in rows]
+
+
+def test_start_and_end_bound_the_export(api, seeded_db):
+    rows = ndjson_rows(api.get("/api/user-data/test-user-2/export"))
+    start, end = rows[10]["timestamp"], rows[30]["timestamp"]
+
+    bounded = ndjson_rows(api.get("/api/user-data/test-user-2/export", params={"start": start, "end": end}))
+    assert [row["_id"] for row in bounded] == [row["_id"] for row in rows[10:30]]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 40, 100])
+def test_pages_cover_the_export_without_repeats_or_gaps(api, seeded_db, limit):
+    everything = [row["_id"] for row in ndjson_rows(api.get("/api/user-data/test-user-0/export"))]
+
+    pages = export_pages(api, "test-user-0", limit)
+    assert all(len(page) == limit for page in pages[:-1])
+    assert [row["_id"] for page in pages for row in page] == everything
+
+
+def test_pages_split_documents_with_equal_timestamps(api, mongo_db):
+    # Page boundaries fall inside runs of identical timestamps; _id breaks the ties
+    stamps = [datetime(2024, 5, 1, 9)] * 5 + [datetime(2024, 5, 1, 10)] * 4
+    docs = [{"_id": ObjectId(), "user_id": "tie-user", "timestamp": ts, "daily_screen_time_hours": 1.0}
+            for ts in stamps]
+    asyncio.run(mongo_db.user_data.insert_many(list(reversed(docs))))
+
+    pages = export_pages(api, "tie-user", 2)
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+    exported = [row["_id"] for page in pages for row in page]
+    assert exported == [str(doc["_id"]) for doc in sorted(docs, key=lambda d: (d["timestamp"], d["_id"]))]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b'{"t": "2024-05-01T09:00:00"}').decode(),
+    base64.urlsafe_b64encode(b'{"t": "2024-05-01T09:00:00", "i": "xyz"}').decode(),
+    base64.urlsafe_b64encode(b'{"t": "yesterday", "i": "' + b"0" * 24 + b'"}').decode(),
+])
+def test_malformed_cursor_is_400(api, seeded_db, cursor):
+    response = api.get("/api/user-data/test-user-0/export", params={"limit": 5, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid export cursor"
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.features import RAW_FEATURES
+from backend.app.model_registry import load_bundle
+
+
+def pandas_frame(csv_path):
+    """The CSV with the engineered columns added the way the ml4 notebook does"""
+    df = pd.read_csv(csv_path)[RAW_FEATURES]
+    df["screen_sleep_ratio"] = df["daily_screen_time_hours"] / (df["sleep_duration_hours"] + 1)
+    df["stress_x_sleep"] = df["stress_level"] * df["sleep_quality"]
+    df["activity_balance"] = df["physical_activity_hours_per_week"] / (df["daily_screen_time_hours"] + 1)
+    df["wellness_score"] = (
+        (df["sleep_quality"] + df["physical_activity_hours_per_week"]) / 2
+        - (df["stress_level"] + df["daily_screen_time_hours"] / 2)
+    )
+    return df
+
+
+@pytest.fixture(scope="module")
+def bundle(model_dir):
+    return load_bundle(model_dir)
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_feature_plan_matches_scaler_transform(bundle, csv_path):
+    df = pandas_frame(csv_path)
+    planned = bundle.plan.build(df[RAW_FEATURES].to_numpy(dtype=np.float64))
+
+    np.testing.assert_array_equal(planned.risk, bundle.scaler_clf.transform(df[bundle.clf_features]))
+    np.testing.assert_array_equal(planned.mood, bundle.scaler_reg.transform(df[bundle.reg_features]))
+    np.testing.assert_array_equal(planned.cluster, bundle.scaler_cluster.transform(df[bundle.cluster_features]))
+    assert len(planned.risk) == len(df)
+
+
+def test_dominant_category_keeps_first_on_ties(bundle):
+    raw = np.zeros((1, len(RAW_FEATURES)))
+    assert bundle.plan.build(raw).dominant_category.tolist() == ["Social Media"]
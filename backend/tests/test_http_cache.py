@@ -0,0 +1,64 @@
+import asyncio
+import time
+from datetime import timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import pytest
+
+from backend.app import http_cache, queries, rollups
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    """Run with a non-UTC local time zone"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def validators(db, user_id):
+    return asyncio.run(http_cache.validators(db, user_id, queries.analytics_window_start(), "test"))
+
+
+def test_back_dated_reading_changes_the_etag(seeded_db):
+    before = validators(seeded_db, "test-user-0")
+    newest = asyncio.run(seeded_db.user_data.find_one({"user_id": "test-user-0"}, sort=queries.NEWEST_FIRST))
+
+    # Between the oldest and newest readings: neither end of the window moves
+    late = {key: value for key, value in newest.items() if key != "_id"}
+    late["timestamp"] = newest["timestamp"] - timedelta(days=3)
+    asyncio.run(seeded_db.user_data.insert_one(late))
+
+    after = validators(seeded_db, "test-user-0")
+    assert after.last_modified == before.last_modified
+    assert after.etag != before.etag
+
+
+def test_last_modified_is_the_newest_local_timestamp_in_utc(seeded_db, new_york):
+    newest = asyncio.run(seeded_db.user_data.find_one({"user_id": "test-user-1"}, sort=queries.NEWEST_FIRST))
+    header = validators(seeded_db, "test-user-1").headers()["Last-Modified"]
+
+    # New York wall-clock time is 4 (EDT) or 5 (EST) hours behind UTC
+    wall_clock = newest["timestamp"].replace(tzinfo=timezone.utc, microsecond=0)
+    assert parsedate_to_datetime(header) - wall_clock in (timedelta(hours=4), timedelta(hours=5))
+
+
+def test_rollup_update_after_the_raw_insert_changes_the_etag(seeded_db):
+    since = queries.analytics_window_start()
+    newest = asyncio.run(seeded_db.user_data.find_one({"user_id": "test-user-2"}, sort=queries.NEWEST_FIRST))
+    doc = {key: value for key, value in newest.items() if key != "_id"}
+
+    # A request between the raw insert and its rollup update sees stale rollups
+    asyncio.run(seeded_db.user_data.insert_one(doc))
+    between = asyncio.run(http_cache.validators(seeded_db, "test-user-2", since, "test", with_rollups=True))
+    time.sleep(0.01)
+    asyncio.run(rollups.record(seeded_db, doc))
+    after = asyncio.run(http_cache.validators(seeded_db, "test-user-2", since, "test", with_rollups=True))
+    assert after.etag != between.etag
+
+    # Raw-only responses don't depend on the rollups
+    raw_before = asyncio.run(http_cache.validators(seeded_db, "test-user-2", since, "test"))
+    asyncio.run(rollups.record(seeded_db, doc))
+    assert asyncio.run(http_cache.validators(seeded_db, "test-user-2", since, "test")).etag == raw_before.etag
@@ -0,0 +1,74 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from backend.app import inference_executor
+from backend.app.model_registry import MODEL_FILES, ModelRegistry
+
+
+@pytest.fixture
+def worker_registry(model_dir, tmp_path, monkeypatch):
+    """A process worker's registry over a private copy of model_dir"""
+    for filename in MODEL_FILES.values():
+        shutil.copy(os.path.join(model_dir, filename), tmp_path / filename)
+    registry = ModelRegistry(str(tmp_path))
+    registry.load()
+    monkeypatch.setattr(inference_executor, "_worker_registry", registry)
+    return registry
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_worker_catches_up_once_when_files_changed(worker_registry):
+    before = worker_registry.get().version
+    artifacts = os.path.join(worker_registry.model_dir, MODEL_FILES["artifacts"])
+    os.utime(artifacts, ns=(0, 0))
+    current = ModelRegistry(worker_registry.model_dir).load().version
+    assert current != before
+
+    results = inference_executor._score_in_process(current, np.ones((2, 9)))
+    assert len(results["risk_level"]) == 2
+    assert worker_registry.get().version == current
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_worker_refuses_an_unknown_version_without_reloading(worker_registry, monkeypatch):
+    from backend.app import model_registry
+
+    loads = []
+    monkeypatch.setattr(model_registry, "load_bundle", lambda *args: loads.append(args))
+    monkeypatch.setattr(inference_executor, "predict_arrays", lambda models, raw: pytest.fail("scored"))
+
+    for _ in range(3):
+        with pytest.raises(inference_executor.ModelVersionMismatch):
+            inference_executor._score_in_process("not-on-disk", np.ones((1, 9)))
+    # Nothing changed on disk, so each call is a stat, not a reload
+    assert loads == []
+
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_close_racing_a_submit_still_answers_it(model_dir):
+    import threading
+
+    models = ModelRegistry(model_dir).load()
+    executor = inference_executor.InferenceExecutor("thread", workers=1, batch_window_ms=0)
+    executor.start()
+    closer = threading.Thread(target=executor.close)
+    enqueue = executor._queue.put_nowait
+
+    def close_between_check_and_put(request):
+        # Unguarded, close() would finish here and the request would sit behind the stop marker
+        closer.start()
+        closer.join(timeout=0.5)
+        enqueue(request)
+
+    executor._queue.put_nowait = close_between_check_and_put
+    future = executor.submit(models, np.ones((1, 9)))
+    closer.join()
+
+    assert future.done()
+    assert len(future.result()["risk_level"]) == 1
+    with pytest.raises(inference_executor.InferenceOverloaded):
+        executor.submit(models, np.ones((1, 9)))
@@ -0,0 +1,100 @@
+import asyncio
+
+from backend.app import ingest
+from backend.app.models.user_data import UserDataPoint
+
+READING = {
+    "user_id": "buffered-user",
+    "daily_screen_time_hours": 6.5,
+    "sleep_duration_hours": 7.0,
+    "stress_level": 5,
+    "sleep_quality": 6,
+    "physical_activity_hours_per_week": 3,
+    "social_media_hours": 2.5,
+    "gaming_hours": 1.0,
+    "entertainment_hours": 1.5,
+    "work_related_hours": 1.5,
+    "risk_level": "Medium",
+    "mood_rating": 3.0,
+    "cluster_label": "Social Media Dominant",
+}
+
+
+def documents(n):
+    return [ingest.prepare_document(UserDataPoint(**READING)) for _ in range(n)]
+
+
+def stored_count(db):
+    return asyncio.run(db.user_data.count_documents({"user_id": "buffered-user"}))
+
+
+def test_full_batch_flushes_before_the_interval(mongo_db):
+    async def run():
+        buffer = ingest.WriteBehindBuffer(lambda: mongo_db, batch_size=3, flush_interval_ms=60_000)
+        buffer.start()
+        for doc in documents(3):
+            await buffer.submit(doc)
+        for _ in range(100):
+            if buffer.flushes:
+                break
+            await asyncio.sleep(0.01)
+        flushed = buffer.stats()
+        await buffer.drain()
+        return flushed
+
+    flushed = asyncio.run(run())
+    assert flushed["flushes"] == 1
+    assert flushed["flushed_documents"] == 3
+    assert stored_count(mongo_db) == 3
+
+
+def test_partial_batch_flushes_after_the_interval(mongo_db):
+    async def run():
+        buffer = ingest.WriteBehindBuffer(lambda: mongo_db, batch_size=100, flush_interval_ms=50)
+        buffer.start()
+        for doc in documents(2):
+            await buffer.submit(doc)
+        assert buffer.flushes == 0
+        await asyncio.sleep(0.3)
+        flushed = buffer.stats()
+        await buffer.drain()
+        return flushed
+
+    flushed = asyncio.run(run())
+    assert flushed["flushes"] == 1
+    assert flushed["flushed_documents"] == 2
+    assert stored_count(mongo_db) == 2
+
+
+def test_drain_writes_everything_queued(mongo_db):
+    async def run():
+        buffer = ingest.WriteBehindBuffer(lambda: mongo_db, batch_size=4, flush_interval_ms=60_000)
+        buffer.start()
+        for doc in documents(10):
+            await buffer.submit(doc)
+        await buffer.drain()
+        try:
+            await buffer.submit(documents(1)[0])
+        except ingest.IngestQueueFull:
+            return buffer.stats(), True
+        return buffer.stats(), False
+
+    drained, rejected_after = asyncio.run(run())
+    assert drained["flushed_documents"] == 10
+    assert drained["queue_depth"] == 0
+    assert rejected_after
+    assert stored_count(mongo_db) == 10
+    rollup = asyncio.run(mongo_db["user_daily_rollups"].find_one({"user_id": "buffered-user"}))
+    assert rollup["count"] == 10
+
+
+def test_full_queue_returns_503(api, mongo_db, monkeypatch):
+    # Never started, so nothing frees the single slot
+    buffer = ingest.WriteBehindBuffer(lambda: mongo_db, max_queue=1, enqueue_timeout_ms=10)
+    buffer._queue.put_nowait(documents(1)[0])
+    monkeypatch.setattr(ingest, "buffer", buffer)
+
+    response = api.post("/api/user-data", json=READING)
+    assert response.status_code == 503
+    assert "queue full" in response.json()["detail"]
+    assert stored_count(mongo_db) == 0
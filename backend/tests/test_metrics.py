@@ -0,0 +1,53 @@
+from backend.app import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.histogram("test_seconds", "Test latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.labels("score").observe(value)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP screenaware_test_seconds Test latency", "# TYPE screenaware_test_seconds histogram"]
+    assert 'screenaware_test_seconds_bucket{stage="score",le="0.1"} 1' in lines
+    assert 'screenaware_test_seconds_bucket{stage="score",le="1.0"} 3' in lines
+    assert 'screenaware_test_seconds_bucket{stage="score",le="+Inf"} 4' in lines
+    assert 'screenaware_test_seconds_count{stage="score"} 4' in lines
+    assert 'screenaware_test_seconds_sum{stage="score"} 6.05' in lines
+
+
+def test_callback_metrics_skip_missing_values_and_failures():
+    registry = metrics.Registry()
+    registry.callback("entries", "gauge", "Entries", lambda: None)
+    registry.callback("broken", "gauge", "Broken", lambda: 1 / 0)
+    registry.callback("lookups_total", "counter", "Lookups", lambda: {("hit",): 3, ("miss",): 1}, ("result",))
+
+    rendered = registry.render()
+    samples = [line for line in rendered.splitlines() if not line.startswith("#")]
+    assert not [line for line in samples if line.startswith(("screenaware_entries", "screenaware_broken"))]
+    assert 'screenaware_lookups_total{result="hit"} 3.0' in rendered
+    assert 'screenaware_lookups_total{result="miss"} 1.0' in rendered
+
+
+def test_metrics_endpoint_exposes_the_registry(client, inputs):
+    client.post("/predict_report", json=inputs[0])
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE screenaware_http_request_duration_seconds histogram" in body
+    assert 'endpoint="predict_report",method="POST",status="200"' in body
+    assert "screenaware_prediction_cache_lookups_total" in body
+
+
+def test_requests_are_labelled_by_endpoint_function(client):
+    latest = metrics.HTTP_REQUEST_SECONDS.labels("get_latest_user_data", "GET", 404)
+    unmatched = metrics.HTTP_REQUEST_SECONDS.labels("unmatched", "GET", 404)
+    before = latest.count, unmatched.count
+
+    assert client.get("/api/user-data/label-check-user/latest").status_code == 404
+    assert client.get("/no/such/route").status_code == 404
+
+    assert (latest.count, unmatched.count) == (before[0] + 1, before[1] + 1)
+    assert "label-check-user" not in client.get("/metrics").text
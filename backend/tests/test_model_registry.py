@@ -0,0 +1,118 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+from backend.app import model_registry
+from backend.app.inference import predict_arrays
+from backend.app.model_registry import MODEL_FILES, ModelRegistry
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """A registry over a private copy of backend/app/models"""
+    from backend.benchmarks.common import BACKEND_MODEL_DIR
+
+    for filename in MODEL_FILES.values():
+        shutil.copy(os.path.join(BACKEND_MODEL_DIR, filename), tmp_path / filename)
+    registry = ModelRegistry(str(tmp_path))
+    registry.load()
+    return registry
+
+
+def touch(registry, name="artifacts"):
+    path = os.path.join(registry.model_dir, MODEL_FILES[name])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_if_changed_only_reloads_on_mtime_change(registry):
+    before = registry.get()
+    assert registry.reload_if_changed() is False
+    assert registry.get() is before
+
+    touch(registry)
+    assert registry.reload_if_changed() is True
+    assert registry.get() is not before
+    assert registry.get().version != before.version
+
+
+def test_polling_picks_up_changes(registry, monkeypatch):
+    registry.check_interval = 0.001
+    before = registry.get()
+    touch(registry, "scaler_cluster")
+    monkeypatch.setattr(registry, "_last_check", 0.0)
+    assert registry.get().version != before.version
+
+
+def test_in_flight_requests_keep_their_bundle_during_a_swap(registry, monkeypatch):
+    old = registry.get()
+    loading, release = threading.Event(), threading.Event()
+    load_bundle = model_registry.load_bundle
+
+    def slow_load(*args):
+        loading.set()
+        release.wait(5)
+        return load_bundle(*args)
+
+    monkeypatch.setattr(model_registry, "load_bundle", slow_load)
+    touch(registry)
+    reload = threading.Thread(target=registry.reload_if_changed)
+    reload.start()
+    assert loading.wait(5)
+
+    # Mid-load: new requests still get the old bundle, and it still scores
+    assert registry.get() is old
+    raw = np.ones((3, 9))
+    before = predict_arrays(old, raw)
+
+    release.set()
+    reload.join(5)
+    new = registry.get()
+    assert new is not old
+    # The bundle an in-flight request holds is never mutated by the swap
+    after = predict_arrays(old, raw)
+    assert all(np.array_equal(before[key], after[key]) for key in before)
+
+
+def test_failed_reload_keeps_serving(registry, monkeypatch):
+    old = registry.get()
+
+    def broken(*args):
+        raise EOFError("half-written pickle")
+
+    monkeypatch.setattr(model_registry, "load_bundle", broken)
+    touch(registry)
+    assert registry.reload_if_changed() is False
+    assert registry.get() is old
+
+
+def test_admin_reload_is_404_without_a_token(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/reload-models").status_code == 404
+
+
+def test_admin_reload_requires_the_token(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/reload-models").status_code == 403
+    assert client.post("/admin/reload-models", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/admin/reload-models", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"previous_version", "model_version"}
+
+
+def test_admin_reload_failure_hides_the_error(client, main_app, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+
+    def broken():
+        raise EOFError("/secret/path/mood_model.pkl is truncated")
+
+    monkeypatch.setattr(main_app.registry, "load", broken)
+    response = client.post("/admin/reload-models", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 500
+    assert "secret" not in response.text
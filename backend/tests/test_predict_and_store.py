@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+
+@pytest.mark.parametrize("persist", ["sync", "background"])
+def test_stored_document_matches_the_prediction(client, mongo_db, inputs, persist):
+    payload = {**inputs[0], "user_id": f"store-{persist}"}
+
+    response = client.post("/predict_and_store", params={"persist": persist}, json=payload)
+    assert response.status_code == 200
+    body = response.json()
+    prediction, stored = body["prediction"], body["stored"]
+    assert prediction == client.post("/predict_report", json=inputs[0]).json()
+
+    # TestClient runs background tasks before handing back the response
+    doc = asyncio.run(mongo_db.user_data.find_one({"_id": ObjectId(stored["_id"])}))
+    assert doc is not None
+    assert doc["user_id"] == payload["user_id"]
+    for field in ("risk_level", "mood_rating", "cluster_label"):
+        assert doc[field] == prediction[field] == stored[field]
+    for field, value in inputs[0].items():
+        assert doc[field] == pytest.approx(value)
+    assert "ingested_at" in doc
+
+    rollup = asyncio.run(mongo_db["user_daily_rollups"].find_one({"user_id": payload["user_id"]}))
+    assert rollup["count"] == 1
+    assert rollup["risk"] == {prediction["risk_level"]: 1}
+
+
+def test_unknown_persist_mode_is_422(client, inputs):
+    response = client.post("/predict_and_store", params={"persist": "later"}, json={**inputs[0], "user_id": "u"})
+    assert response.status_code == 422
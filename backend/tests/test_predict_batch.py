@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+
+def test_json_ndjson_and_csv_agree_with_single_predictions(client, inputs):
+    rows = inputs[:20]
+    singles = [client.post("/predict_report", json=row).json() for row in rows]
+
+    as_json = client.post("/predict_report/batch", json=rows)
+    ndjson = client.post(
+        "/predict_report/batch", content="\n".join(json.dumps(row) for row in rows),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    table = io.StringIO()
+    writer = csv.DictWriter(table, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    as_csv = client.post("/predict_report/batch", content=table.getvalue(), headers={"Content-Type": "text/csv"})
+
+    for response in (as_json, ndjson, as_csv):
+        assert response.status_code == 200
+        assert response.json() == {"count": 20, "results": singles}
+
+
+def test_empty_batch(client):
+    assert client.post("/predict_report/batch", json=[]).json() == {"count": 0, "results": []}
+
+
+def test_unparseable_body_is_400(client):
+    response = client.post("/predict_report/batch", content="[{", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+
+
+def test_invalid_rows_are_422_with_their_index(client, inputs):
+    missing = {k: v for k, v in inputs[0].items() if k != "stress_level"}
+    response = client.post("/predict_report/batch", json=[inputs[0], missing])
+    assert response.status_code == 422
+    assert response.json()["detail"]["index"] == 1
+
+    response = client.post("/predict_report/batch", json=[inputs[0], inputs[1], 7])
+    assert response.status_code == 422
+    assert response.json()["detail"] == {"index": 2, "error": "Row must be an object"}
+
+
+def test_too_many_rows_is_413(client, main_app, inputs, monkeypatch):
+    monkeypatch.setattr(main_app, "PREDICT_BATCH_MAX_SIZE", 3)
+    assert client.post("/predict_report/batch", json=inputs[:3]).status_code == 200
+    assert client.post("/predict_report/batch", json=inputs[:4]).status_code == 413
+
+
+def test_oversized_body_is_refused_while_reading(client, main_app, inputs, monkeypatch):
+    monkeypatch.setattr(main_app, "PREDICT_BATCH_MAX_BYTES", 1000)
+    body = json.dumps(inputs[:50]).encode()
+
+    # Declared length over the limit: refused before reading
+    assert client.post("/predict_report/batch", content=body,
+                       headers={"Content-Type": "application/json"}).status_code == 413
+
+    # No Content-Length (chunked upload): refused once the limit is crossed
+    def chunks():
+        for start in range(0, len(body), 256):
+            yield body[start:start + 256]
+
+    response = client.post("/predict_report/batch", content=chunks(), headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
@@ -0,0 +1,91 @@
+import time
+from types import SimpleNamespace
+
+from backend.app.prediction_cache import (
+    InProcessKV, LRUTTLCache, PredictionCache, RedisCache, canonical_inputs,
+)
+
+
+class Counter:
+    """compute() stand-in that records how often it ran"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"call": self.calls}
+
+
+def test_entries_expire_after_the_ttl():
+    cache = LRUTTLCache(max_size=10, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=0)
+    assert cache.get("a") == 1
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(max_size=2, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_quantized_inputs_share_an_entry(inputs):
+    near = {**inputs[0], "daily_screen_time_hours": inputs[0]["daily_screen_time_hours"] + 0.1}
+    far = {**inputs[0], "daily_screen_time_hours": inputs[0]["daily_screen_time_hours"] + 2}
+    user, near_user, far_user = (SimpleNamespace(**row) for row in (inputs[0], near, far))
+    assert canonical_inputs(user) != canonical_inputs(near_user)
+    assert canonical_inputs(user, 0.5) == canonical_inputs(near_user, 0.5)
+
+    cache = PredictionCache(LRUTTLCache(100, 0), quantum=0.5)
+    compute = Counter()
+    first = cache.get_or_compute("report", user, "v1", compute)
+    assert cache.get_or_compute("report", near_user, "v1", compute) == first
+    cache.get_or_compute("report", far_user, "v1", compute)
+    assert compute.calls == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_keys_include_endpoint_and_model_version(inputs):
+    user = SimpleNamespace(**inputs[0])
+    cache = PredictionCache(LRUTTLCache(100, 0))
+    compute = Counter()
+
+    cache.get_or_compute("report", user, "v1", compute)
+    cache.get_or_compute("report", user, "v2", compute)
+    cache.get_or_compute("risk", user, "v2", compute)
+    cache.get_or_compute("report", user, "v1", compute)
+    assert compute.calls == 3
+    assert cache.stats()["size"] == 3
+
+
+def test_disabled_cache_always_computes(inputs):
+    user = SimpleNamespace(**inputs[0])
+    cache = PredictionCache(LRUTTLCache(100, 0), enabled=False)
+    compute = Counter()
+
+    cache.get_or_compute("report", user, "v1", compute)
+    cache.get_or_compute("report", user, "v1", compute)
+    assert compute.calls == 2
+
+
+def test_redis_backend_round_trips_without_reporting_a_size(inputs):
+    user = SimpleNamespace(**inputs[0])
+    cache = PredictionCache(RedisCache(InProcessKV(), ttl=60), backend_name="redis")
+    compute = Counter()
+
+    first = cache.get_or_compute("report", user, "v1", compute)
+    assert cache.get_or_compute("report", user, "v1", compute) == first
+    assert compute.calls == 1
+    assert cache.stats()["size"] is None
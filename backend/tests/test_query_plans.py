@@ -0,0 +1,33 @@
+"""
+Every router query must use an index. explain() needs a real MongoDB, so
+this only runs when MONGODB_URI points at one (not mongomock://):
+
+    MONGODB_URI=mongodb://localhost:27017 MONGODB_DB=screenaware_test python -m pytest backend/tests/test_query_plans.py
+"""
+import asyncio
+import os
+
+import pytest
+
+from backend.app import database
+from backend.app.indexes import collection_scans, ensure_indexes
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+
+pytestmark = pytest.mark.skipif(
+    not MONGODB_URI or MONGODB_URI.startswith(database.MOCK_URI_PREFIX),
+    reason="needs MONGODB_URI pointing at a real MongoDB server",
+)
+
+
+def test_router_queries_never_scan_the_collection():
+    async def check():
+        client = database.create_client(MONGODB_URI)
+        try:
+            db = client[database.settings()["db_name"]]
+            await ensure_indexes(db)
+            return await collection_scans(db)
+        finally:
+            client.close()
+
+    assert asyncio.run(check()) == []
@@ -0,0 +1,78 @@
+import asyncio
+import shutil
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from backend.app.ingest import stamp_ingested
+from backend.benchmarks.common import load_inputs, ml4_model_dir
+from ml_training.ml4.refresh import refresh
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+ROWS = load_inputs()
+
+
+def documents(rows):
+    return [{"_id": ObjectId(), "user_id": "refresh-user", **row} for row in rows]
+
+
+def insert(db, docs, ingested_at):
+    stamp_ingested(docs, ingested_at)
+    asyncio.run(db.user_data.insert_many(docs))
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def run(db, source, out, **kwargs):
+    return asyncio.run(refresh(db, source, str(out), overlap_s=60, **kwargs))
+
+
+@pytest.fixture
+def ml4_source():
+    overlay = ml4_model_dir()
+    try:
+        yield overlay
+    finally:
+        shutil.rmtree(overlay, ignore_errors=True)
+
+
+def test_late_writes_inside_the_overlap_are_consumed_once(mongo_db, ml4_source, tmp_path):
+    now = utcnow()
+    # _ids are assigned when a request arrives, so a slow write can carry an older one
+    late = documents(ROWS[300:310])
+    insert(mongo_db, documents(ROWS[:300]), now)
+    first = run(mongo_db, ml4_source, tmp_path)
+    assert first["refresh"]["documents"] == 300
+    assert first["refresh"]["high_water"] == now.isoformat()
+
+    # Committed after the first run but stamped before its high-water mark
+    insert(mongo_db, late, now - timedelta(seconds=30))
+    insert(mongo_db, documents(ROWS[310:320]), now + timedelta(seconds=5))
+    second = run(mongo_db, tmp_path / "latest", tmp_path)
+    assert second["refresh"]["documents"] == 20
+    assert second["parent"] == first["version"]
+    assert second["refresh"]["total_rows_seen"] == first["refresh"]["total_rows_seen"] + 20
+
+    assert run(mongo_db, tmp_path / "latest", tmp_path) is None
+
+
+def test_max_docs_resumes_where_it_stopped(mongo_db, ml4_source, tmp_path):
+    insert(mongo_db, documents(ROWS[:50]), utcnow())
+    assert run(mongo_db, ml4_source, tmp_path, max_docs=20)["refresh"]["documents"] == 20
+    assert run(mongo_db, tmp_path / "latest", tmp_path, max_docs=20)["refresh"]["documents"] == 20
+    assert run(mongo_db, tmp_path / "latest", tmp_path)["refresh"]["documents"] == 10
+    assert run(mongo_db, tmp_path / "latest", tmp_path) is None
+
+
+def test_documents_without_ingested_at_are_read_once(mongo_db, ml4_source, tmp_path):
+    asyncio.run(mongo_db.user_data.insert_many(documents(ROWS[:40])))
+    assert run(mongo_db, ml4_source, tmp_path, max_docs=25)["refresh"]["documents"] == 25
+    manifest = run(mongo_db, tmp_path / "latest", tmp_path)
+    assert manifest["refresh"]["documents"] == 15
+    assert run(mongo_db, tmp_path / "latest", tmp_path) is None
+    assert np.isfinite(manifest["refresh"]["center_shift"]).all()
@@ -0,0 +1,42 @@
+import logging
+
+from backend.app.logging_config import Trace
+
+
+class Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def traced(sampled: bool):
+    logger = logging.getLogger(f"test-trace-{sampled}")
+    logger.setLevel(logging.INFO)
+    recorder = Recorder()
+    logger.addHandler(recorder)
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return {"stress_level": 5.0}
+
+    trace = Trace(logger, sampled=sampled, slow_ms=0)
+    trace.add(input=expensive, cache="hit")
+    trace.finish(model_version="v1")
+    logger.removeHandler(recorder)
+    return recorder.records, calls
+
+
+def test_callable_fields_are_resolved_when_logged():
+    records, calls = traced(sampled=True)
+    assert calls == [1]
+    assert records[0].fields["input"] == {"stress_level": 5.0}
+    assert records[0].fields["model_version"] == "v1"
+
+
+def test_callable_fields_are_skipped_when_not_logged():
+    records, calls = traced(sampled=False)
+    assert records == [] and calls == []
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from backend.app.features import RAW_INDEX
+
+REPORT_FIELDS = ("risk_level", "mood_rating", "cluster_label")
+
+
+def test_grid_shape_and_cells_match_single_predictions(client, inputs):
+    base = inputs[0]
+    body = {
+        "base": base,
+        "axes": [
+            {"field": "stress_level", "start": 2, "stop": 8, "steps": 3},
+            {"field": "sleep_duration_hours", "start": -1, "stop": 1, "steps": 4, "relative": True},
+        ],
+    }
+    response = client.post("/predict_what_if", json=body)
+    assert response.status_code == 200
+    grid = response.json()
+
+    assert grid["shape"] == [3, 4]
+    assert grid["axes"][0] == {"field": "stress_level", "values": [2.0, 5.0, 8.0]}
+    assert grid["axes"][1]["values"] == pytest.approx(np.linspace(-1, 1, 4) + base["sleep_duration_hours"])
+    for field in (*REPORT_FIELDS, "mood_score"):
+        assert np.asarray(grid[field]).shape == (3, 4)
+
+    single = client.post("/predict_report", json=base).json()
+    assert {field: grid["base"][field] for field in REPORT_FIELDS} == {field: single[field] for field in REPORT_FIELDS}
+    for i, stress in enumerate(grid["axes"][0]["values"]):
+        for j, sleep in enumerate(grid["axes"][1]["values"]):
+            point = client.post(
+                "/predict_report", json={**base, "stress_level": stress, "sleep_duration_hours": sleep}
+            ).json()
+            assert [grid[field][i][j] for field in REPORT_FIELDS] == [point[field] for field in REPORT_FIELDS]
+
+
+@pytest.mark.parametrize("shift", [True, False])
+def test_category_changes_shift_screen_time(main_app, inputs, shift):
+    base = {**inputs[0], "gaming_hours": 1.0, "daily_screen_time_hours": 5.0}
+    request = main_app.WhatIfInput(
+        base=base,
+        axes=[{"field": "gaming_hours", "start": -2, "stop": 2, "steps": 5, "relative": True}],
+        shift_screen_time=shift,
+    )
+
+    values, raw = main_app.what_if_grid(main_app.registry.get(), request)
+    # Gaming can't go below zero; the base row comes last, unchanged
+    np.testing.assert_allclose(values[0], [0, 0, 1, 2, 3])
+    np.testing.assert_allclose(raw[:, RAW_INDEX["gaming_hours"]], [0, 0, 1, 2, 3, 1])
+    screen_time = raw[:, RAW_INDEX["daily_screen_time_hours"]]
+    expected = [4, 4, 5, 6, 7, 5] if shift else [5] * 6
+    np.testing.assert_allclose(screen_time, expected)
+
+
+def test_grid_above_the_point_limit_is_413(client, inputs, main_app):
+    steps = int(np.sqrt(main_app.WHAT_IF_MAX_GRID)) + 1
+    body = {
+        "base": inputs[0],
+        "axes": [
+            {"field": "stress_level", "start": 1, "stop": 10, "steps": steps},
+            {"field": "sleep_quality", "start": 1, "stop": 10, "steps": steps},
+        ],
+    }
+    response = client.post("/predict_what_if", json=body)
+    assert response.status_code == 413
+    assert str(main_app.WHAT_IF_MAX_GRID) in response.json()["detail"]
+
+
+def test_duplicate_axes_are_422(client, inputs):
+    axis = {"field": "stress_level", "start": 1, "stop": 10, "steps": 3}
+    response = client.post("/predict_what_if", json={"base": inputs[0], "axes": [axis, axis]})
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Each field can only be varied by one axis"
+
+
+def test_screen_time_axis_with_a_shifted_category_is_422(client, inputs):
+    axes = [
+        {"field": "daily_screen_time_hours", "start": 2, "stop": 8, "steps": 3},
+        {"field": "gaming_hours", "start": 0, "stop": 3, "steps": 3},
+    ]
+    assert client.post("/predict_what_if", json={"base": inputs[0], "axes": axes}).status_code == 422
+    unshifted = {"base": inputs[0], "axes": axes, "shift_screen_time": False}
+    assert client.post("/predict_what_if", json=unshifted).status_code == 200
@@ -64,19 +64,10 @@ const DataForm = ({ onNavigate }) => {
 
       console.log('Sending payload:', payload);
 
-      // Get predictions from ML endpoint
-      const predictRes = await axios.post('http://localhost:8000/predict_report', payload);
-      const predictions = predictRes.data;
-
-      // Combine predictions with user data
-      const userDataPayload = {
-        ...payload,
-        ...predictions
-      };
-
-      // Store in MongoDB through the new endpoint
-      const storeRes = await axios.post('http://localhost:8000/api/user-data', userDataPayload);
-      const storedData = storeRes.data;
+      // Predict and store in MongoDB in a single round-trip
+      const res = await axios.post('http://localhost:8000/predict_and_store', payload);
+      const predictions = res.data.prediction;
+      const storedData = res.data.stored;
 
       console.log('Stored data:', storedData);
 
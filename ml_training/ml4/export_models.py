@@ -0,0 +1,90 @@
+"""
+Export the trained models to the compiled NumPy format served with MODEL_FORMAT=compiled.
+
+    python -m ml_training.ml4.export_models [--model-dir DIR ...] [--out DIR] [--skip-check]
+
+Each file in backend.app.model_registry.MODEL_FILES is taken from the first
+--model-dir that has it (default: backend/app/models, the set the API serves).
+Pickles without a cluster_name_map are refused, since every cluster would be
+labelled "Unknown". After exporting, every row of digital_diet_mental_health.csv
+is scored with both the pickled estimators and the compiled runtime, and the
+export fails unless risk level, mood rating and cluster label agree on every row.
+"""
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from backend.app.compiled_models import export_bundle
+from backend.app.features import RAW_FEATURES
+from backend.app.inference import predict_arrays
+from backend.app.model_registry import load_bundle, load_components, overlay_model_dir
+
+ML4_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(ML4_DIR, "..", ".."))
+DEFAULT_MODEL_DIRS = [os.path.join(REPO_ROOT, "backend", "app", "models")]
+DEFAULT_OUT = os.path.join(REPO_ROOT, "backend", "app", "models", "compiled")
+CSV_PATH = os.path.join(ML4_DIR, "digital_diet_mental_health.csv")
+
+
+def check_parity(pickle_dir: str, compiled_dir: str) -> bool:
+    """Score the training CSV with both formats, as one batch and row by row"""
+    reference = load_bundle(pickle_dir, "pickle")
+    compiled = load_bundle(compiled_dir, "compiled")
+    raw = pd.read_csv(CSV_PATH)[RAW_FEATURES].to_numpy(dtype=np.float64)
+
+    expected = predict_arrays(reference, raw)
+    actual = predict_arrays(compiled, raw)
+    singles = [predict_arrays(compiled, raw[i:i + 1]) for i in range(0, len(raw), 50)]
+
+    unlabelled = sum(cluster_id not in reference.cluster_name_map for cluster_id in expected["cluster_id"])
+    print(f"{'cluster names':18s} {unlabelled} / {len(raw)} rows have no cluster name")
+    ok = unlabelled == 0
+    for key in ("risk_level", "mood_rating", "cluster_id", "cluster_label", "dominant_category"):
+        mismatches = int(np.sum(np.asarray(expected[key]) != np.asarray(actual[key])))
+        print(f"{key:18s} {mismatches} / {len(raw)} rows differ")
+        ok &= mismatches == 0
+    mood_error = float(np.max(np.abs(expected["mood_raw"] - actual["mood_raw"])))
+    print(f"{'mood_raw':18s} max abs difference {mood_error:.3g}")
+    ok &= mood_error <= 1e-5
+
+    single_ok = all(
+        single["risk_level"][0] == expected["risk_level"][i * 50]
+        and single["mood_rating"][0] == expected["mood_rating"][i * 50]
+        and single["cluster_id"][0] == expected["cluster_id"][i * 50]
+        for i, single in enumerate(singles)
+    )
+    print(f"single-row calls   {'match' if single_ok else 'DIFFER'}")
+    return ok and single_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export models to the compiled NumPy format")
+    parser.add_argument("--model-dir", action="append", help="Pickled model directory (repeatable, first wins)")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--skip-check", action="store_true", help="Don't run the parity check")
+    args = parser.parse_args()
+
+    # Pickles from a slightly different scikit-learn version still load fine
+    warnings.filterwarnings("ignore", category=UserWarning)
+    pickle_dir = overlay_model_dir(args.model_dir or DEFAULT_MODEL_DIRS)
+    source = load_bundle(pickle_dir, "pickle")
+    if not source.cluster_name_map:
+        print(f"❌ artifacts.pkl in {args.model_dir or DEFAULT_MODEL_DIRS} has no cluster_name_map")
+        sys.exit(1)
+    manifest = export_bundle(load_components(pickle_dir, "pickle"), args.out, source_version=source.version)
+    print(f"✅ Exported {len(manifest['arrays'])} arrays to {args.out} (from models version {source.version})")
+
+    if args.skip_check:
+        return
+    if not check_parity(pickle_dir, args.out):
+        print("❌ Compiled models do not match the pickled estimators")
+        sys.exit(1)
+    print("✅ Compiled models match the pickled estimators on every row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Incrementally refresh the cluster model from stored user_data, without retraining.
+
+    python -m ml_training.ml4.refresh [--out DIR] [--source VERSION_DIR] [--batch-size 5000]
+                                      [--overlap-s 300] [--max-docs N] [--relabel] [--no-latest]
+
+Starts from a version written by train.py (or a previous refresh; default
+<out>/latest) and streams only the user_data documents ingested since that
+version was built, in (ingested_at, _id) order and --batch-size documents
+at a time, so a run costs O(new documents) however much history is stored.
+
+ingested_at is stamped by the writer (backend/app/ingest.py, synthetic.py)
+just before each insert, so it is not the order documents become visible:
+a slow write, a write-behind flush or a skewed clock can commit a document
+stamped earlier than one already consumed. Each run therefore re-reads the
+last --overlap-s seconds before the previous high-water mark and skips the
+_ids it already consumed there (kept in the manifest). Writes that take
+longer than the overlap to land would still be missed; keep it above the
+ingest retry budget and clock skew. For every batch:
+
+- scaler_cluster absorbs the batch with StandardScaler.partial_fit, which
+  merges running mean/variance (Chan et al.) with what it was fitted on;
+- each row is assigned to its nearest center under the updated scaler and
+  every center moves to the running mean of all rows assigned to it so far
+  (MiniBatchKMeans' per-center learning rate 1/count). Centers are kept in
+  unscaled units while streaming so a changing scaler never invalidates
+  them, and converted to the new scaled space at the end.
+
+Cluster ids never change, so cluster_name_map keeps its labels; clusters
+whose dominant activity drifted are listed in the manifest (--relabel
+renames them instead). The risk and mood models and their scalers are
+copied unchanged: they were fit on scaled inputs and updating their
+scalers without retraining them would shift every prediction.
+
+The result is a new <out>/<version>/ with a manifest.json recording the
+parent version and where to resume, and <out>/latest is repointed
+at it. The API picks it up with MODEL_DIR=<out>/latest and
+MODEL_RELOAD_INTERVAL, or POST /admin/reload-models.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from bson import ObjectId
+
+from backend.app.features import CLUSTER_LABELS
+from backend.app.model_registry import MODEL_FILES, load_components
+
+from .train import DEFAULT_OUT, MANIFEST, file_sha256, make_version, publish_latest
+
+REFRESH_BATCH_SIZE = 5000
+# Seconds re-read before the previous high-water mark, for writes that landed late
+REFRESH_OVERLAP_S = 300
+
+# Files a refresh rewrites; everything else is hard-linked from the parent version
+REFRESHED = ("scaler_cluster", "cluster_model", "artifacts")
+
+
+def read_manifest(version_dir: str) -> dict:
+    path = os.path.join(version_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+class OnlineClusters:
+    """Running StandardScaler statistics and KMeans centers, updated one batch at a time"""
+
+    def __init__(self, scaler, cluster_model, counts):
+        self.scaler = copy.deepcopy(scaler)
+        self.centers = scaler.inverse_transform(np.asarray(cluster_model.cluster_centers_, dtype=np.float64))
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.initial = self.centers.copy()
+        self.rows = 0
+
+    def partial_fit(self, X: np.ndarray):
+        self.scaler.partial_fit(X)
+        scaled = self.scaler.transform(X)
+        centers = self.scaler.transform(self.centers)
+        distances = ((scaled[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        assigned = np.argmin(distances, axis=1)
+
+        k = len(self.centers)
+        batch_counts = np.bincount(assigned, minlength=k).astype(np.float64)
+        batch_sums = np.zeros_like(self.centers)
+        np.add.at(batch_sums, assigned, X)
+        touched = batch_counts > 0
+        # Running mean: new = old + (batch_sum - batch_n * old) / (old_n + batch_n)
+        total = self.counts + batch_counts
+        self.centers[touched] += (
+            batch_sums[touched] - batch_counts[touched, None] * self.centers[touched]
+        ) / total[touched, None]
+        self.counts = total
+        self.rows += len(X)
+
+    def cluster_model(self, template):
+        """Copy of the fitted model with centers in the updated scaled space"""
+        model = copy.deepcopy(template)
+        model.cluster_centers_ = self.scaler.transform(self.centers)
+        return model
+
+    def dominant(self, features) -> list:
+        return [features[j] for j in np.argmax(self.centers, axis=1)]
+
+    def center_shift(self) -> list:
+        return np.linalg.norm(self.centers - self.initial, axis=1).round(4).tolist()
+
+
+class Resume:
+    """Where a refresh picks up: the newest ingested_at consumed, and the _ids consumed near it"""
+
+    def __init__(self, high_water: datetime = None, seen=(), overlap_s: float = REFRESH_OVERLAP_S):
+        self.high_water = high_water
+        self.overlap = timedelta(seconds=overlap_s)
+        self.seen = set(seen)
+        # (ingested_at, _id) of every document read this run, to carry the seen set forward
+        self.read = []
+        self.started = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    @classmethod
+    def from_manifest(cls, parent: dict, overlap_s: float = REFRESH_OVERLAP_S) -> "Resume":
+        state = parent.get("refresh", {})
+        high_water = state.get("high_water")
+        return cls(
+            datetime.fromisoformat(high_water) if high_water else None,
+            (ObjectId(i) for i in state.get("seen_ids", [])),
+            overlap_s,
+        )
+
+    def query(self) -> dict:
+        if self.high_water is None:
+            return {}
+        return {"ingested_at": {"$gte": self.high_water - self.overlap}}
+
+    def is_new(self, doc: dict) -> bool:
+        self.read.append((doc.get("ingested_at"), doc["_id"]))
+        return doc["_id"] not in self.seen
+
+    def advance(self, complete: bool = True) -> dict:
+        """
+        Manifest entry for the next run: the new high-water mark and the _ids
+        it will re-read. After a partial run (--max-docs) the consumed _ids
+        that weren't reached again stay in the set, since the next run will.
+        """
+        stamps = [ingested for ingested, _ in self.read if ingested is not None]
+        high_water = max(stamps + ([self.high_water] if self.high_water else []), default=None)
+        if high_water is None:
+            # Only documents written before ingested_at existed
+            if not complete:
+                return {"high_water": None, "seen_ids": sorted(str(_id) for _id in self.seen | {i for _, i in self.read})}
+            high_water = self.started
+        start = high_water - self.overlap
+        seen = {_id for ingested, _id in self.read if ingested is not None and ingested >= start}
+        if not complete:
+            seen |= self.seen - {_id for _, _id in self.read}
+        return {"high_water": high_water.isoformat(), "seen_ids": sorted(str(_id) for _id in seen)}
+
+
+async def stream_batches(db, features, resume: Resume, batch_size=REFRESH_BATCH_SIZE, max_docs=None):
+    """
+    (new documents read, (n, len(features)) matrix) per batch of user_data
+    ingested since `resume`; documents missing a feature are skipped. Stops
+    after max_docs new documents.
+    """
+    cursor = db.user_data.find(resume.query(), {"ingested_at": 1, **{name: 1 for name in features}})
+    cursor = cursor.sort([("ingested_at", 1), ("_id", 1)]).batch_size(batch_size)
+    rows, read, total = [], 0, 0
+    try:
+        async for doc in cursor:
+            if max_docs and total >= max_docs:
+                break
+            if not resume.is_new(doc):
+                continue
+            read += 1
+            total += 1
+            values = [doc.get(name) for name in features]
+            if all(isinstance(value, (int, float)) for value in values):
+                rows.append(values)
+            if len(rows) >= batch_size:
+                yield read, np.asarray(rows, dtype=np.float64)
+                rows, read = [], 0
+        if read:
+            yield read, np.asarray(rows, dtype=np.float64).reshape(-1, len(features))
+    finally:
+        await cursor.close()
+
+
+async def refresh(db, source_dir: str, out_dir: str, batch_size: int = REFRESH_BATCH_SIZE,
+                  max_docs: int = None, relabel: bool = False, latest: bool = True,
+                  overlap_s: float = REFRESH_OVERLAP_S):
+    """Publish a refreshed version from the user_data after source_dir's; returns its manifest (None if no new data)"""
+    import joblib
+
+    source_dir = os.path.realpath(source_dir)
+    parent = read_manifest(source_dir)
+    components = load_components(source_dir, "pickle")
+    artifacts = dict(components["artifacts"])
+    features = artifacts["cluster_features"]
+    cluster_model, scaler = components["cluster_model"], components["scaler_cluster"]
+    k = len(cluster_model.cluster_centers_)
+
+    counts = artifacts.get("cluster_counts")
+    if counts is None:
+        # Built before cluster counts were recorded: weigh the centers evenly by the training rows
+        counts = np.full(k, scaler.n_samples_seen_ / k)
+    online = OnlineClusters(scaler, cluster_model, counts)
+
+    resume = Resume.from_manifest(parent, overlap_s)
+    start = time.perf_counter()
+    documents = 0
+    async for read, X in stream_batches(db, features, resume, batch_size, max_docs):
+        documents += read
+        if len(X):
+            online.partial_fit(X)
+    if documents == 0:
+        return None
+    position = resume.advance(complete=not (max_docs and documents >= max_docs))
+
+    names = dict(artifacts.get("cluster_name_map", {}))
+    dominant = online.dominant(features)
+    drifted = [i for i in range(k) if names.get(i) != CLUSTER_LABELS[dominant[i]]]
+    if relabel:
+        names.update({i: CLUSTER_LABELS[dominant[i]] for i in drifted})
+    artifacts.update({
+        "cluster_name_map": names,
+        "cluster_counts": online.counts.round().astype(int).tolist(),
+    })
+
+    version = make_version(parent.get("version", source_dir), {"high_water": position["high_water"]})
+    version_dir = os.path.join(out_dir, version)
+    os.makedirs(version_dir)
+    refreshed = {
+        "scaler_cluster": online.scaler,
+        "cluster_model": online.cluster_model(cluster_model),
+        "artifacts": artifacts,
+    }
+    for name, filename in MODEL_FILES.items():
+        target = os.path.join(version_dir, filename)
+        if name in REFRESHED:
+            joblib.dump(refreshed[name], target)
+        else:
+            try:
+                os.link(os.path.join(source_dir, filename), target)
+            except OSError:
+                shutil.copy2(os.path.join(source_dir, filename), target)
+
+    manifest = {
+        **{key: value for key, value in parent.items() if key in ("data", "params", "environment")},
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "parent": parent.get("version"),
+        "refresh": {
+            **position,
+            "overlap_s": overlap_s,
+            "documents": documents,
+            "rows": online.rows,
+            "batch_size": batch_size,
+            "total_rows_seen": int(online.scaler.n_samples_seen_),
+            "cluster_counts": artifacts["cluster_counts"],
+            "center_shift": online.center_shift(),
+            "label_drift": {str(i): CLUSTER_LABELS[dominant[i]] for i in drifted},
+            "relabelled": relabel and bool(drifted),
+            "seconds": round(time.perf_counter() - start, 3),
+        },
+        "artifacts": {key: value for key, value in artifacts.items() if key != "cluster_name_map"},
+        "cluster_name_map": {str(i): label for i, label in names.items()},
+        "files": {filename: file_sha256(os.path.join(version_dir, filename)) for filename in MODEL_FILES.values()},
+    }
+    with open(os.path.join(version_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if latest:
+        publish_latest(out_dir, version)
+    return manifest
+
+
+async def _main(args):
+    from backend.app.database import close_client, get_db
+
+    try:
+        return await refresh(
+            get_db(), args.source or os.path.join(args.out, "latest"), args.out,
+            args.batch_size, args.max_docs, args.relabel, not args.no_latest, args.overlap_s,
+        )
+    finally:
+        close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the cluster scaler and centers from new user_data")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Directory with the train.py versions and latest")
+    parser.add_argument("--source", help="Version directory to start from (default: <out>/latest)")
+    parser.add_argument("--batch-size", type=int, default=REFRESH_BATCH_SIZE)
+    parser.add_argument("--overlap-s", type=float, default=REFRESH_OVERLAP_S,
+                        help="Seconds before the previous high-water mark to re-read for late writes")
+    parser.add_argument("--max-docs", type=int, help="Consume at most this many new documents")
+    parser.add_argument("--relabel", action="store_true", help="Rename clusters whose dominant activity changed")
+    parser.add_argument("--no-latest", action="store_true", help="Don't repoint <out>/latest")
+    args = parser.parse_args()
+
+    manifest = asyncio.run(_main(args))
+    if manifest is None:
+        print("✅ No new user_data since the source version; nothing to publish")
+        return
+    refreshed = manifest["refresh"]
+    print(f"✅ Refreshed version {manifest['version']} from {refreshed['rows']} new rows "
+          f"(parent {manifest['parent']})")
+    if refreshed["label_drift"] and not refreshed["relabelled"]:
+        print(f"⚠️  Dominant activity changed for clusters {refreshed['label_drift']}; labels kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Train every model the backend serves from digital_diet_mental_health.csv (the ml4 notebook, scripted).
+
+    python -m ml_training.ml4.train [--csv FILE] [--out DIR] [--jobs N] [--k-min 2] [--k-max 6]
+                                    [--silhouette-sample 10000] [--minibatch-threshold 100000]
+                                    [--search-sample 200000] [--folds 3] [--no-search] [--no-cache]
+
+One run writes a new version directory <out>/<version>/ holding every
+backend.app.model_registry.MODEL_FILES entry plus manifest.json (data hash,
+parameters, search scores, metrics, file checksums), then points
+<out>/latest at it. Serve it with MODEL_DIR=<out>/latest.
+
+The CSV is parsed and the feature matrices built once per CSV content;
+later runs load them from --cache-dir. The cluster k search and the
+cross-validated risk/mood hyperparameter searches are one flat list of
+independent tasks run on --jobs processes (joblib memory-maps the shared
+matrices instead of copying them to every worker). Silhouette scores come
+from a --silhouette-sample row sample instead of the O(n²) full matrix,
+KMeans becomes MiniBatchKMeans from --minibatch-threshold rows on, and the
+hyperparameter search runs on at most --search-sample rows; the winners
+are refit on every row.
+
+Unlike the notebook, GaussianMixture and DBSCAN are not tried: the served
+cluster model (and the compiled export) needs KMeans centers.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backend.app.features import CLUSTER_LABELS, ENGINEERED_FEATURES, RAW_FEATURES, RAW_INDEX, assign_risk
+from backend.app.model_registry import MODEL_FILES
+
+ML4_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(ML4_DIR, "digital_diet_mental_health.csv")
+DEFAULT_OUT = os.path.join(ML4_DIR, "builds")
+DEFAULT_CACHE_DIR = os.path.join(ML4_DIR, ".cache")
+
+# Bump when the preprocessing below changes, so stale caches are not reused
+FEATURE_CACHE_VERSION = 1
+MANIFEST = "manifest.json"
+SEED = 42
+
+# -------------------------------
+# Features (SAME AS SERVING)
+# -------------------------------
+CLF_FEATURES = [
+    "daily_screen_time_hours",
+    "sleep_duration_hours",
+    "stress_level",
+    "sleep_quality",
+    "physical_activity_hours_per_week",
+]
+REG_FEATURES = CLF_FEATURES + ["screen_sleep_ratio", "stress_x_sleep", "activity_balance", "wellness_score"]
+CLUSTER_FEATURES = ["social_media_hours", "gaming_hours", "entertainment_hours", "work_related_hours"]
+TARGET = "mood_rating"
+
+# -------------------------------
+# Search spaces (the notebook's settings come first)
+# -------------------------------
+RISK_GRID = [
+    {"n_estimators": n_estimators, "max_depth": max_depth}
+    for n_estimators in (200, 100) for max_depth in (None, 12)
+]
+MOOD_GRID = [
+    {"n_estimators": 300, "learning_rate": learning_rate, "max_depth": max_depth}
+    for learning_rate in (0.05, 0.1) for max_depth in (5, 3, 7)
+]
+
+
+def feature_matrix(raw: np.ndarray, names) -> np.ndarray:
+    """Columns `names` of the raw (n, 9) matrix, engineered ones computed like features.py"""
+    columns = [
+        ENGINEERED_FEATURES[name](raw) if name in ENGINEERED_FEATURES else raw[:, RAW_INDEX[name]]
+        for name in names
+    ]
+    return np.column_stack(columns).astype(np.float64)
+
+
+# -------------------------------
+# Preprocessed data, cached per CSV content
+# -------------------------------
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def preprocess(csv_path: str) -> dict:
+    import pandas as pd
+
+    frame = pd.read_csv(csv_path, usecols=RAW_FEATURES + [TARGET]).dropna()
+    raw = frame[RAW_FEATURES].to_numpy(dtype=np.float64)
+    return {
+        "X_clf": feature_matrix(raw, CLF_FEATURES),
+        "X_reg": feature_matrix(raw, REG_FEATURES),
+        "X_cluster": feature_matrix(raw, CLUSTER_FEATURES),
+        "y_risk": assign_risk(raw),
+        "y_mood": frame[TARGET].to_numpy(dtype=np.float64),
+    }
+
+
+def load_dataset(csv_path: str, csv_hash: str, cache_dir: str = None):
+    """(matrices, cache hit) — from cache_dir when this CSV was preprocessed before"""
+    if cache_dir is None:
+        return preprocess(csv_path), False
+    cache_path = os.path.join(cache_dir, f"features-v{FEATURE_CACHE_VERSION}-{csv_hash[:16]}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cached:
+            return {name: cached[name] for name in cached.files}, True
+
+    data = preprocess(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{cache_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **data)
+    os.replace(tmp, cache_path)
+    return data, False
+
+# -------------------------------
+# Search tasks (run in worker processes; each estimator is single-threaded)
+# -------------------------------
+def fit_kmeans(X: np.ndarray, k: int, minibatch_threshold: int, silhouette_sample: int, seed: int = SEED):
+    """Fit one candidate k; returns (k, model, sampled silhouette, seconds)"""
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+
+    start = time.perf_counter()
+    if len(X) >= minibatch_threshold:
+        model = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3, batch_size=4096)
+    else:
+        model = KMeans(n_clusters=k, random_state=seed, n_init=10)
+    labels = model.fit_predict(X)
+    sample_size = silhouette_sample if len(X) > silhouette_sample else None
+    score = silhouette_score(X, labels, sample_size=sample_size, random_state=seed)
+    return k, model, float(score), time.perf_counter() - start
+
+
+def risk_model(params: dict):
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(**params, class_weight="balanced", random_state=SEED, n_jobs=1)
+
+
+def mood_model(params: dict):
+    from xgboost import XGBRegressor
+
+    return XGBRegressor(**params, subsample=0.8, colsample_bytree=0.8, random_state=SEED, n_jobs=1)
+
+
+def score_fold(kind: str, params: dict, X: np.ndarray, y: np.ndarray, train, test) -> float:
+    """Held-out score of one candidate on one fold: macro F1 (risk) or negated MAE (mood)"""
+    from sklearn.metrics import f1_score, mean_absolute_error
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X[train])
+    if kind == "risk":
+        model = risk_model(params).fit(scaler.transform(X[train]), y[train])
+        return float(f1_score(y[test], model.predict(scaler.transform(X[test])), average="macro"))
+    model = mood_model(params).fit(scaler.transform(X[train]), y[train])
+    return -float(mean_absolute_error(y[test], model.predict(scaler.transform(X[test]))))
+
+
+def fit_final(kind: str, params: dict, X: np.ndarray, y: np.ndarray, n_jobs: int = 1):
+    """Scaler and model refit on every row"""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X)
+    model = (risk_model(params) if kind == "risk" else mood_model(params)).set_params(n_jobs=n_jobs)
+    return kind, scaler, model.fit(scaler.transform(X), y)
+
+# -------------------------------
+# Pipeline
+# -------------------------------
+def search(data: dict, y_risk_encoded: np.ndarray, args) -> dict:
+    """k search plus cross-validated hyperparameter search, all as one parallel batch"""
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import KFold, StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+
+    X_cluster = StandardScaler().fit_transform(data["X_cluster"])
+    tasks = [
+        delayed(fit_kmeans)(X_cluster, k, args.minibatch_threshold, args.silhouette_sample)
+        for k in range(args.k_min, args.k_max + 1)
+    ]
+
+    grids = {"risk": RISK_GRID, "mood": MOOD_GRID} if args.search else {"risk": RISK_GRID[:1], "mood": MOOD_GRID[:1]}
+    candidates = []
+    if args.search:
+        rng = np.random.default_rng(SEED)
+        n = len(y_risk_encoded)
+        rows = np.sort(rng.choice(n, args.search_sample, replace=False)) if n > args.search_sample else np.arange(n)
+        inputs = {
+            "risk": (data["X_clf"][rows], y_risk_encoded[rows]),
+            "mood": (data["X_reg"][rows], data["y_mood"][rows]),
+        }
+        for kind, grid in grids.items():
+            X, y = inputs[kind]
+            splitter = StratifiedKFold if kind == "risk" else KFold
+            folds = list(splitter(n_splits=args.folds, shuffle=True, random_state=SEED).split(X, y))
+            for index, params in enumerate(grid):
+                for train, test in folds:
+                    candidates.append((kind, index))
+                    tasks.append(delayed(score_fold)(kind, params, X, y, train, test))
+
+    start = time.perf_counter()
+    results = Parallel(n_jobs=args.jobs)(tasks)
+    n_k = args.k_max - args.k_min + 1
+
+    best = {kind: grid[0] for kind, grid in grids.items()}
+    scores = {kind: [[] for _ in grid] for kind, grid in grids.items()}
+    for (kind, index), score in zip(candidates, results[n_k:]):
+        scores[kind][index].append(score)
+    summary = {}
+    for kind, grid in grids.items():
+        means = [float(np.mean(s)) if s else None for s in scores[kind]]
+        if args.search:
+            best[kind] = grid[int(np.argmax(means))]
+        summary[kind] = [{"params": params, "cv_score": mean} for params, mean in zip(grid, means)]
+
+    k_results = results[:n_k]
+    k, cluster_model, silhouette, _ = max(k_results, key=lambda result: result[2])
+    return {
+        "cluster_model": cluster_model,
+        "k": k,
+        "silhouette": silhouette,
+        "k_search": [
+            {"k": k_, "silhouette": round(score, 4), "seconds": round(seconds, 3)}
+            for k_, _, score, seconds in k_results
+        ],
+        "best": best,
+        "hyperparameter_search": summary,
+        "search_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def cluster_name_map(cluster_model, scaler_cluster) -> dict:
+    """Cluster id -> label of the activity that dominates its (unscaled) center"""
+    centers = scaler_cluster.inverse_transform(cluster_model.cluster_centers_)
+    return {i: CLUSTER_LABELS[CLUSTER_FEATURES[j]] for i, j in enumerate(np.argmax(centers, axis=1))}
+
+
+def make_version(source: str, params: dict) -> str:
+    """Sortable version name: UTC timestamp plus a digest of what the models were built from"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    digest = hashlib.sha1(f"{source}{json.dumps(params, sort_keys=True, default=str)}".encode()).hexdigest()
+    return f"{stamp}-{digest[:8]}"
+
+
+def publish_latest(out_dir: str, version: str):
+    """Point <out>/latest at the new version (a symlink swapped atomically)"""
+    latest = os.path.join(out_dir, "latest")
+    tmp = f"{latest}.{os.getpid()}.tmp"
+    os.symlink(version, tmp)
+    os.replace(tmp, latest)
+
+
+def train(args) -> dict:
+    import joblib
+    import sklearn
+    import xgboost
+    from sklearn.metrics import f1_score, mean_absolute_error
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    timings = {}
+    start = time.perf_counter()
+    csv_hash = file_sha256(args.csv)
+    data, cache_hit = load_dataset(args.csv, csv_hash, None if args.no_cache else args.cache_dir)
+    timings["load_seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Loaded {len(data['y_mood'])} rows ({'feature cache hit' if cache_hit else 'preprocessed'})")
+
+    le = LabelEncoder().fit(data["y_risk"])
+    y_risk = le.transform(data["y_risk"])
+    found = search(data, y_risk, args)
+    timings["search_seconds"] = found["search_seconds"]
+    print(f"KMeans k={found['k']} (sampled silhouette {found['silhouette']:.3f}); "
+          f"risk {found['best']['risk']}; mood {found['best']['mood']}")
+
+    from joblib import Parallel, delayed
+
+    # Both refits at once, splitting the cores between them
+    threads = max(1, (args.jobs if args.jobs > 0 else os.cpu_count() or 1) // 2)
+    start = time.perf_counter()
+    finals = dict(
+        (kind, (scaler, model)) for kind, scaler, model in Parallel(n_jobs=2)([
+            delayed(fit_final)("risk", found["best"]["risk"], data["X_clf"], y_risk, threads),
+            delayed(fit_final)("mood", found["best"]["mood"], data["X_reg"], data["y_mood"], threads),
+        ])
+    )
+    timings["refit_seconds"] = round(time.perf_counter() - start, 3)
+    scaler_clf, clf_model = finals["risk"]
+    scaler_reg, reg_model = finals["mood"]
+    scaler_cluster = StandardScaler().fit(data["X_cluster"])
+    cluster_model = found["cluster_model"]
+
+    mood_pred = reg_model.predict(scaler_reg.transform(data["X_reg"]))
+    risk_pred = clf_model.predict(scaler_clf.transform(data["X_clf"]))
+    artifacts = {
+        "clf_features": CLF_FEATURES,
+        "reg_features": REG_FEATURES,
+        "cluster_features": CLUSTER_FEATURES,
+        "best_cluster_method": f"{type(cluster_model).__name__}(k={found['k']})",
+        "cluster_name_map": cluster_name_map(cluster_model, scaler_cluster),
+        # Rows per cluster, the weight of each center in incremental refreshes (refresh.py)
+        "cluster_counts": np.bincount(
+            cluster_model.predict(scaler_cluster.transform(data["X_cluster"])), minlength=found["k"]
+        ).tolist(),
+        "clf_target_labels": le.classes_.tolist(),
+        "mood_min_range": float(mood_pred.min()),
+        "mood_max_range": float(mood_pred.max()),
+    }
+
+    params = {
+        "k_range": [args.k_min, args.k_max],
+        "silhouette_sample": args.silhouette_sample,
+        "minibatch_threshold": args.minibatch_threshold,
+        "search": args.search,
+        "search_sample": args.search_sample,
+        "folds": args.folds,
+        "risk": found["best"]["risk"],
+        "mood": found["best"]["mood"],
+    }
+    version = make_version(csv_hash, params)
+    version_dir = os.path.join(args.out, version)
+    os.makedirs(version_dir)
+    components = {
+        "clf_model": clf_model, "scaler_clf": scaler_clf,
+        "reg_model": reg_model, "scaler_reg": scaler_reg,
+        "cluster_model": cluster_model, "scaler_cluster": scaler_cluster,
+        "le": le, "artifacts": artifacts,
+    }
+    for name, filename in MODEL_FILES.items():
+        joblib.dump(components[name], os.path.join(version_dir, filename))
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "data": {"csv": os.path.basename(args.csv), "sha256": csv_hash, "rows": int(len(y_risk))},
+        "params": params,
+        "metrics": {
+            "train_risk_macro_f1": round(float(f1_score(y_risk, risk_pred, average="macro")), 4),
+            "train_mood_mae": round(float(mean_absolute_error(data["y_mood"], mood_pred)), 4),
+            "silhouette": round(found["silhouette"], 4),
+        },
+        "k_search": found["k_search"],
+        "hyperparameter_search": found["hyperparameter_search"],
+        "artifacts": {key: value for key, value in artifacts.items() if key != "cluster_name_map"},
+        "cluster_name_map": {str(k): v for k, v in artifacts["cluster_name_map"].items()},
+        "files": {filename: file_sha256(os.path.join(version_dir, filename)) for filename in MODEL_FILES.values()},
+        "timings": timings,
+        "environment": {
+            "python": platform.python_version(),
+            "scikit-learn": sklearn.__version__,
+            "xgboost": xgboost.__version__,
+            "numpy": np.__version__,
+            "jobs": args.jobs,
+        },
+    }
+    with open(os.path.join(version_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if not args.no_latest:
+        publish_latest(args.out, version)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the risk, mood and cluster models")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Directory that receives <version>/ and latest")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Preprocessed feature matrix cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-read the CSV")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel search processes")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=6)
+    parser.add_argument("--silhouette-sample", type=int, default=10000, help="Rows per silhouette score")
+    parser.add_argument("--minibatch-threshold", type=int, default=100000, help="Use MiniBatchKMeans from N rows")
+    parser.add_argument("--search-sample", type=int, default=200000, help="Rows used by the hyperparameter search")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--no-search", dest="search", action="store_false",
+                        help="Skip the hyperparameter search and use the notebook's settings")
+    parser.add_argument("--no-latest", action="store_true", help="Don't repoint <out>/latest")
+    args = parser.parse_args()
+    if args.k_min < 2 or args.k_max < args.k_min:
+        parser.error("need 2 <= --k-min <= --k-max")
+
+    start = time.perf_counter()
+    manifest = train(args)
+    print(f"✅ Trained version {manifest['version']} in {time.perf_counter() - start:.1f}s "
+          f"→ {os.path.join(args.out, manifest['version'])}")
+
+
+if __name__ == "__main__":
+    main()